@@ -0,0 +1,122 @@
+"""
+Agrégation en une seule passe des monitors par environnement, service et statut
+Les monitors sont lus au fil de l'eau (pages search ou bulk) et seuls les compteurs
+et les alertes actives sont conservés, pour un nombre quelconque d'environnements
+"""
+
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from models import ACTIVE_STATUSES, MonitorRecord, Status
+
+
+class EnvironmentSummary:
+    """Compteurs et buckets d'alertes d'un environnement"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.total = 0
+        # Monitors couverts par un downtime en cours: ni opérationnels ni down
+        self.paused = 0
+        self.status_counts: Counter = Counter()
+        self.alerts: List[MonitorRecord] = []
+        # service -> alertes, toutes / Alert+Warn / No Data
+        self.by_service: Dict[str, List[MonitorRecord]] = defaultdict(list)
+        self.regular_by_service: Dict[str, List[MonitorRecord]] = defaultdict(list)
+        self.no_data_by_service: Dict[str, List[MonitorRecord]] = defaultdict(list)
+
+    @property
+    def down(self) -> int:
+        return len(self.alerts)
+
+    def count(self, monitor: MonitorRecord) -> None:
+        self.total += 1
+        self.status_counts[monitor.status] += 1
+
+    def add_alert(self, monitor: MonitorRecord, service: str) -> None:
+        self.alerts.append(monitor)
+        self.by_service[service].append(monitor)
+        if monitor.status == Status.NO_DATA:
+            self.no_data_by_service[service].append(monitor)
+        else:
+            self.regular_by_service[service].append(monitor)
+
+    def pause(self, keys: Set[int]) -> None:
+        """Retire des alertes et des buckets les monitors dont id() est dans `keys`, comptés en pause"""
+        kept = [monitor for monitor in self.alerts if id(monitor) not in keys]
+        self.paused += len(self.alerts) - len(kept)
+        self.alerts = kept
+        for buckets in (self.by_service, self.regular_by_service, self.no_data_by_service):
+            for service in list(buckets):
+                remaining = [monitor for monitor in buckets[service] if id(monitor) not in keys]
+                if remaining:
+                    buckets[service] = remaining
+                else:
+                    del buckets[service]
+
+
+class SummaryAggregator:
+    """Répartit les monitors dans les environnements configurés en une passe"""
+
+    def __init__(self, environments: Iterable[str], classify: Callable[[MonitorRecord], Tuple[Optional[str], str]],
+                 on_add: Optional[Callable[[MonitorRecord], None]] = None,
+                 is_paused: Optional[Callable[[MonitorRecord], Optional[bool]]] = None):
+        self.environments: Dict[str, EnvironmentSummary] = {name: EnvironmentSummary(name) for name in environments}
+        self.classify = classify
+        # Appelé pour chaque monitor de l'inventaire (état local du mode incrémental)
+        self.on_add = on_add
+        # Monitor entièrement muté par un downtime (True): compté en pause, hors des alertes
+        # None: dépend de ses groupes, l'alerte est gardée dans pause_candidates jusqu'à pause()
+        self.is_paused = is_paused
+        self.pause_candidates: List[MonitorRecord] = []
+        self.total = 0
+        self.unclassified = 0
+
+    def add(self, monitor: MonitorRecord, alerts: bool = True) -> Optional[EnvironmentSummary]:
+        """
+        Compte un monitor de l'inventaire et, si `alerts`, le range dans les buckets quand il est actif
+        Retourne l'environnement du monitor (None s'il n'est pas suivi)
+        """
+        self.total += 1
+        if self.on_add is not None:
+            self.on_add(monitor)
+        env, service = self.classify(monitor)
+        summary = self.environments.get(env)
+        if summary is None:
+            self.unclassified += 1
+            return None
+
+        summary.count(monitor)
+        paused = self.is_paused(monitor) if self.is_paused is not None else False
+        if paused:
+            summary.paused += 1
+        elif alerts and monitor.status in ACTIVE_STATUSES:
+            self._add_alert(summary, monitor, service, paused)
+        return summary
+
+    def _add_alert(self, summary: EnvironmentSummary, monitor: MonitorRecord, service: str,
+                   paused: Optional[bool]) -> None:
+        summary.add_alert(monitor, service)
+        if paused is None:
+            self.pause_candidates.append(monitor)
+
+    def add_alert(self, monitor: MonitorRecord) -> None:
+        """Range une alerte issue d'une recherche séparée (FETCH_MODE=split) sans la recompter"""
+        env, service = self.classify(monitor)
+        summary = self.environments.get(env)
+        if summary is None:
+            return
+        paused = self.is_paused(monitor) if self.is_paused is not None else False
+        if not paused:
+            self._add_alert(summary, monitor, service, paused)
+
+    def pause(self, monitors: Iterable[MonitorRecord]) -> None:
+        """Passe en pause des alertes de pause_candidates, une fois leurs groupes connus"""
+        keys = {id(monitor) for monitor in monitors}
+        if keys:
+            for summary in self.environments.values():
+                summary.pause(keys)
+
+    def alerts(self) -> List[MonitorRecord]:
+        """Toutes les alertes actives, environnement par environnement"""
+        return [monitor for summary in self.environments.values() for monitor in summary.alerts]
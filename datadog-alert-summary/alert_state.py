@@ -0,0 +1,96 @@
+"""
+État local des alertes envoyées sur Slack (par environnement)
+Permet de n'envoyer que les changements depuis le run précédent: nouvelles alertes,
+alertes résolues, changements de statut ou de groupes, plus un digest complet périodique
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+
+def snapshot_alert(name: str, status: str, groups: List[str]) -> Dict[str, Any]:
+    """Représentation d'une alerte dans le store (id -> nom, statut, groupes)"""
+    return {"name": name, "status": status, "groups": sorted(groups)}
+
+
+def diff_alerts(previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Différence entre deux ensembles d'alertes (clés = monitor id en str)
+    Retourne {"new": [...], "resolved": [...], "changed": [...]}, chaque entrée avec son id
+    """
+    new = [dict(alert, id=monitor_id) for monitor_id, alert in current.items() if monitor_id not in previous]
+    resolved = [dict(alert, id=monitor_id) for monitor_id, alert in previous.items() if monitor_id not in current]
+
+    changed = []
+    for monitor_id, alert in current.items():
+        before = previous.get(monitor_id)
+        if before is None:
+            continue
+        before_groups = set(before.get("groups", []))
+        after_groups = set(alert.get("groups", []))
+        if before.get("status") != alert["status"] or before_groups != after_groups:
+            changed.append(dict(
+                alert,
+                id=monitor_id,
+                previous_status=before.get("status"),
+                added_groups=sorted(after_groups - before_groups),
+                removed_groups=sorted(before_groups - after_groups)
+            ))
+
+    return {"new": new, "resolved": resolved, "changed": changed}
+
+
+def payload_hash(message: Dict[str, Any]) -> str:
+    """Hash du contenu d'un message Slack, sans le footer horodaté (blocs context)"""
+    blocks = [block for block in message.get("blocks", []) if block.get("type") != "context"]
+    return hashlib.sha256(json.dumps(blocks, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class AlertStateStore:
+    """Store JSON des alertes du dernier envoi, du dernier digest et du hash du dernier message"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._state: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    self._state = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Could not read alert state {path}, starting fresh: {e}", file=sys.stderr)
+
+    def _env(self, environment: str) -> Dict[str, Any]:
+        return self._state.setdefault(environment, {"alerts": {}, "last_digest_ts": 0, "last_hash": None})
+
+    def previous_alerts(self, environment: str) -> Dict[str, Dict[str, Any]]:
+        return self._env(environment)["alerts"]
+
+    def digest_due(self, environment: str, interval: float) -> bool:
+        """Un digest complet est dû au premier run ou après `interval` secondes"""
+        return time.time() - self._env(environment)["last_digest_ts"] >= interval
+
+    def is_duplicate(self, environment: str, message_hash: str) -> bool:
+        return self._env(environment)["last_hash"] == message_hash
+
+    def record(self, environment: str, alerts: Dict[str, Dict[str, Any]], message_hash: Optional[str] = None, digest: bool = False) -> None:
+        """Enregistre l'état envoyé (ou inchangé) pour le prochain run"""
+        state = self._env(environment)
+        state["alerts"] = alerts
+        if message_hash is not None:
+            state["last_hash"] = message_hash
+        if digest:
+            state["last_digest_ts"] = time.time()
+
+    def save(self) -> None:
+        """Écriture atomique du store"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self._state, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write alert state {self.path}: {e}", file=sys.stderr)
@@ -2,214 +2,669 @@
 """
 Datadog Alert Summary Script - Version 3 (Final)
 Utilise l'API search pour récupérer toutes les alertes actives
-Simplifié sans extraction des group values (pour l'instant)
+Valeurs des groupes ({{value}}) lues en lot via /api/v1/query pour les alertes affichées
+Monitors mutés par un downtime comptés en pause (un seul appel /api/v1/downtime par run)
 """
 
 import os
 import sys
 import json
-import re
+import time
+import random
+import signal
+import argparse
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-from collections import defaultdict
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote
 import requests
 
+from aggregation import EnvironmentSummary, SummaryAggregator
+from alert_state import AlertStateStore, diff_alerts, payload_hash, snapshot_alert
+from classifier import MonitorClassifier
+from downtimes import DowntimeIndex
+from group_loader import GroupStateLoader
+from http_client import HttpClient
+from json_stream import BULK_FIELDS, SEARCH_FIELDS, iter_json_items, iter_json_members
+from metric_values import MetricValueLookup, format_value
+from metrics import RunMetrics
+from models import ACTIVE_STATUSES, GroupSelection, GroupState, KeyCounts, MonitorRecord, Status, alerting_groups
+from monitor_cache import MonitorCache
+from monitor_state import MonitorEvent, MonitorStateStore, parse_monitor_event
+from name_cleaner import NameCleaner, fill_templates
+from query_parser import parse_query
+from rate_limiter import RateLimitScheduler
+from search_scope import compile_search_scope
+from slack_delivery import SlackDelivery
+from slack_packer import pack_message
+
+
+# Périmètre des monitors suivis (API search), surchargeable via "search_query" dans les règles
+DEFAULT_SEARCH_QUERY = "(env:prod OR env:preprod OR env:staging)"
+
+# Taille des morceaux lus lors du parsing en flux des réponses monitors
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Groupes affichés par alerte dans le résumé (au-delà: "... and N more")
+MAX_GROUPS_SHOWN = 5
+
+# Libellés des statuts dans les compteurs de groupes ("312 alerting")
+GROUP_STATUS_LABELS = {Status.ALERT: "alerting", Status.WARN: "warning", Status.NO_DATA: "no data"}
+
 
 class DatadogAlertSummary:
     def __init__(self):
         self.dd_api_key = os.getenv("DATADOG_API_KEY")
         self.dd_app_key = os.getenv("DATADOG_APP_KEY")
-        self.slack_webhook_preprod = os.getenv("SLACK_WEBHOOK_PREPROD")
-        self.slack_webhook_prod = os.getenv("SLACK_WEBHOOK_PROD")
         self.dd_site = os.getenv("DATADOG_SITE", "datadoghq.eu")
 
-        if not all([self.dd_api_key, self.dd_app_key, self.slack_webhook_preprod, self.slack_webhook_prod]):
+        # Règles de classification, environnements suivis et périmètre de recherche
+        rules_path = os.getenv(
+            "CLASSIFICATION_RULES",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "classification_rules.json")
+        )
+        with open(rules_path) as f:
+            rules = json.load(f)
+        self.classifier = MonitorClassifier(rules)
+        self.environments: List[str] = rules.get("environments", ["preprod", "prod"])
+        self.search_query = rules.get("search_query", DEFAULT_SEARCH_QUERY)
+        # Même périmètre appliqué aux monitors bulk (None: requête non reproductible côté client)
+        self.search_scope = compile_search_scope(self.search_query)
+
+        # Un webhook Slack par environnement: SLACK_WEBHOOK_<ENV>
+        self.slack_webhooks = {
+            env: os.getenv(f"SLACK_WEBHOOK_{env.upper().replace('-', '_')}")
+            for env in self.environments
+        }
+
+        if not all([self.dd_api_key, self.dd_app_key, *self.slack_webhooks.values()]):
             raise ValueError("Missing required environment variables")
 
-        self.base_url = f"https://api.{self.dd_site}"
+        # DATADOG_API_URL: autre point d'entrée (proxy, stub local des benchmarks)
+        self.base_url = os.getenv("DATADOG_API_URL", f"https://api.{self.dd_site}").rstrip("/")
         self.headers = {
             "DD-API-KEY": self.dd_api_key,
             "DD-APPLICATION-KEY": self.dd_app_key,
             "Content-Type": "application/json"
         }
 
-    def get_all_monitors_search(self) -> List[Dict[str, Any]]:
-        """Récupère tous les moniteurs via l'API search (plus fiable)"""
+        # "single": un seul inventaire, alertes dérivées du champ status
+        # "split": deux recherches (inventaire + alertes actives)
+        self.fetch_mode = os.getenv("FETCH_MODE", "single").lower()
+        if self.fetch_mode not in ("single", "split"):
+            raise ValueError(f"Invalid FETCH_MODE: {self.fetch_mode} (expected 'single' or 'split')")
+
+        # Stratégie de récupération: "auto", "bulk" (/api/v1/monitor) ou "search" (search + 1 appel par alerte)
+        self.fetch_strategy = os.getenv("FETCH_STRATEGY", "auto").lower()
+        if self.fetch_strategy not in ("auto", "bulk", "search"):
+            raise ValueError(f"Invalid FETCH_STRATEGY: {self.fetch_strategy} (expected 'auto', 'bulk' or 'search')")
+        self.bulk_page_size = max(1, int(os.getenv("BULK_PAGE_SIZE", "1000")))
+        # Coût estimé du transfert bulk, en allers-retours pour 1000 monitors
+        self.bulk_cost_per_1000 = float(os.getenv("BULK_COST_PER_1000", "2"))
+
+        # Taille des pages de /api/v1/monitor/search
+        self.search_page_size = max(1, int(os.getenv("SEARCH_PAGE_SIZE", "100")))
+
+        # Nombre max de requêtes group_states en parallèle
+        self.enrich_workers = max(1, int(os.getenv("ENRICH_WORKERS", "16")))
+        # Alertes affichées avec leurs groupes par environnement (0 = toutes), les suivantes sur une ligne
+        self.max_detailed_alerts = max(0, int(os.getenv("SLACK_MAX_DETAILED_ALERTS", "0")))
+
+        # Cache local des définitions de monitors (vide = désactivé)
+        cache_path = os.getenv("MONITOR_CACHE_PATH", "monitor_cache.db")
+        self.monitor_cache = MonitorCache(cache_path, self.classifier.fingerprint) if cache_path else None
+
+        # "full": résumé complet à chaque run, "delta": uniquement les changements + digest périodique
+        self.notify_mode = os.getenv("NOTIFY_MODE", "full").lower()
+        if self.notify_mode not in ("full", "delta"):
+            raise ValueError(f"Invalid NOTIFY_MODE: {self.notify_mode} (expected 'full' or 'delta')")
+        self.digest_interval = float(os.getenv("DIGEST_INTERVAL", "21600"))
+        self.alert_state = None
+        if self.notify_mode == "delta":
+            self.alert_state = AlertStateStore(os.getenv("ALERT_STATE_PATH", "alert_state.json"))
+        # Seuls les premiers groupes sont affichés; le mode delta compare tous les groupes d'un run à l'autre
+        self.group_limit = None if self.notify_mode == "delta" else MAX_GROUPS_SHOWN
+
+        # Mode incrémental: état local des monitors mis à jour par les événements de transition depuis le
+        # curseur, récupération complète au premier run, tous les INCREMENTAL_RESYNC_INTERVAL secondes
+        # ou quand le dernier run remonte à plus de INCREMENTAL_MAX_GAP secondes
+        self.monitor_state = None
+        if os.getenv("INCREMENTAL", "false").lower() in ("1", "true", "yes"):
+            self.monitor_state = MonitorStateStore(os.getenv("MONITOR_STATE_PATH", "monitor_state.json"))
+        self.resync_interval = float(os.getenv("INCREMENTAL_RESYNC_INTERVAL", "21600"))
+        self.max_event_gap = float(os.getenv("INCREMENTAL_MAX_GAP", "7200"))
+        # Marge relue avant le curseur (événements indexés en retard) et nombre max d'événements par run
+        self.event_lag = float(os.getenv("INCREMENTAL_EVENT_LAG", "120"))
+        self.max_events = int(os.getenv("INCREMENTAL_MAX_EVENTS", "10000"))
+        self.events_page_size = max(1, int(os.getenv("EVENTS_PAGE_SIZE", "1000")))
+        # L'état local garde tous les groupes actifs (les événements y ajoutent et retirent des groupes)
+        self.fetch_group_limit = None if self.monitor_state is not None else self.group_limit
+
+        # Nettoyage des noms: regex précompilées + cache LRU sur (nom, statut)
+        self.name_cleaner = NameCleaner(cache_size=int(os.getenv("NAME_CACHE_SIZE", "4096")))
+
+        # Métriques du run (phases, appels HTTP), exportées en fin de run si METRICS_PATH est défini
+        self.metrics = RunMetrics()
+        self.metrics_path = os.getenv("METRICS_PATH", "")
+
+        # Sessions keep-alive partagées par tous les appels Datadog et Slack
+        self.http = HttpClient(
+            pool_size=self.enrich_workers,
+            host_pool_sizes={"hooks.slack.com": max(2, len(self.environments))},
+            timeout=float(os.getenv("HTTP_TIMEOUT", "30")),
+            http2=os.getenv("HTTP2", "false").lower() in ("1", "true", "yes"),
+            observer=self.metrics.observe_request
+        )
+
+        # Appels Datadog pilotés par les en-têtes X-RateLimit (pacing et concurrence par endpoint, retry des 429)
+        self.datadog = RateLimitScheduler(
+            self.http,
+            max_concurrency=self.enrich_workers,
+            max_retries=int(os.getenv("DATADOG_MAX_RETRIES", "3"))
+        )
+        # Groupes des alertes chargés à la demande du rendu (aucune requête pour une alerte non affichée)
+        self.group_loader = GroupStateLoader(
+            self._get_monitor_group_states, self.enrich_workers, local=self._single_group_state
+        )
+        # Valeurs courantes des alertes ({{value}}, valeur par groupe): expressions dédupliquées, par lots
+        self.metric_values_enabled = os.getenv("METRIC_VALUES", "true").lower() in ("1", "true", "yes")
+        self.metric_values = MetricValueLookup(
+            self.datadog.get,
+            f"{self.base_url}/api/v1/query",
+            self.headers,
+            workers=self.enrich_workers,
+            max_window=int(os.getenv("METRIC_VALUES_MAX_WINDOW", "86400")),
+            # Tendance (sparkline) de la dernière heure à côté de chaque alerte, rendue sous budget CPU
+            sparkline_window=(
+                int(os.getenv("SPARKLINE_WINDOW", "3600"))
+                if os.getenv("SPARKLINES", "true").lower() in ("1", "true", "yes") else 0
+            ),
+            sparkline_points=int(os.getenv("SPARKLINE_POINTS", "20")),
+            sparkline_budget=float(os.getenv("SPARKLINE_CPU_BUDGET", "0.5"))
+        )
+        # Downtimes actifs et planifiés chargés une fois par run: monitors mutés comptés en pause
+        self.downtimes_enabled = os.getenv("DOWNTIMES", "true").lower() in ("1", "true", "yes")
+        self.downtimes: Optional[DowntimeIndex] = None
+
+        # Envoi Slack: webhooks en parallèle, retries avec backoff et Retry-After
+        self.slack_delivery = SlackDelivery(
+            self.http,
+            max_retries=int(os.getenv("SLACK_MAX_RETRIES", "4")),
+            base_delay=float(os.getenv("SLACK_RETRY_BASE_DELAY", "1"))
+        )
+
+    def _stream_monitors(self, response: requests.Response, key: Optional[str], fields: Tuple[str, ...],
+                         rest: Optional[Dict[str, Any]] = None) -> Iterator[MonitorRecord]:
+        """Monitors d'une réponse lue en flux, convertis en records (JSON invalide -> RequestException)"""
+        try:
+            for item in iter_json_items(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), key, fields, rest):
+                yield MonitorRecord.from_api(item, self.fetch_group_limit)
+        except ValueError as e:
+            raise requests.exceptions.InvalidJSONError(f"Invalid JSON from {response.url}: {e}") from e
+
+    def _iter_search_page(self, query: str, page: int, rest: Dict[str, Any],
+                          per_page: Optional[int] = None) -> Iterator[MonitorRecord]:
+        """
+        Parcourt une page de /api/v1/monitor/search en flux: les monitors sont transmis dès qu'ils
+        sont décodés, metadata et counts sont rangés dans `rest`
+        """
         url = f"{self.base_url}/api/v1/monitor/search"
         params = {
-            "query": "(env:prod OR env:preprod OR env:staging)"
+            "query": query,
+            "page": page,
+            "per_page": per_page or self.search_page_size
         }
+        with self.datadog.get(url, headers=self.headers, params=params, stream=True) as response:
+            response.raise_for_status()
+            yield from self._stream_monitors(response, "monitors", SEARCH_FIELDS, rest)
+
+    def _fetch_search_page(self, query: str, page: int, per_page: Optional[int] = None) -> Dict[str, Any]:
+        """Récupère une page de /api/v1/monitor/search (monitors réduits aux champs utilisés)"""
+        page_data: Dict[str, Any] = {}
+        page_data["monitors"] = list(self._iter_search_page(query, page, page_data, per_page))
+        return page_data
+
+    def iter_monitors_search(self, query: str) -> Iterator[MonitorRecord]:
+        """
+        Parcourt toutes les pages de l'API search
+        Le nombre de pages vient du bloc metadata de la première réponse, les pages suivantes
+        sont préchargées en parallèle mais transmises dans l'ordre de l'API: l'ordre des alertes
+        (et donc le message Slack et son empreinte) ne dépend pas de l'ordre d'arrivée des pages
+        """
+        first_page: Dict[str, Any] = {}
+        yield from self._iter_search_page(query, 0, first_page)
+
+        page_count = first_page.get("metadata", {}).get("page_count", 1)
+        if page_count <= 1:
+            return
+
+        with ThreadPoolExecutor(max_workers=min(self.enrich_workers, page_count - 1)) as pool:
+            futures = [pool.submit(self._fetch_search_page, query, page) for page in range(1, page_count)]
+            try:
+                for future in futures:
+                    yield from future.result().get("monitors", [])
+            finally:
+                # Consommateur arrêté ou page en erreur: ne pas attendre les pages restantes
+                for future in futures:
+                    future.cancel()
+
+    def get_active_alerts_search(self) -> List[MonitorRecord]:
+        """Récupère uniquement les alertes actives via l'API search"""
+        query = f'status:(Alert OR Warn OR "No Data") AND {self.search_query}'
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            return data.get("monitors", [])
+            # Groupes chargés plus tard, à la demande du rendu
+            with self.metrics.phase("fetch"):
+                return list(self.iter_monitors_search(query))
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error fetching monitors from Datadog: {e}", file=sys.stderr)
+            print(f"❌ Error fetching active alerts from Datadog: {e}", file=sys.stderr)
             return []
 
-    def get_active_alerts_search(self) -> List[Dict[str, Any]]:
-        """Récupère uniquement les alertes actives via l'API search"""
-        url = f"{self.base_url}/api/v1/monitor/search"
-        params = {
-            "query": 'status:(Alert OR Warn OR "No Data") AND (env:prod OR env:preprod OR env:staging)'
-        }
+    def aggregate_monitors_bulk(self, aggregator: SummaryAggregator) -> None:
+        """
+        Agrège tous les monitors et leurs group_states via /api/v1/monitor (paginé par page_size)
+        L'API renvoie toute l'organisation: seuls les monitors du périmètre search_query sont agrégés
+        """
+        url = f"{self.base_url}/api/v1/monitor"
+        page = 0
+        scope = self.search_scope
+        if scope is None:
+            print(
+                f"   ⚠️  search_query {self.search_query!r} cannot be applied to bulk results, counting every monitor",
+                file=sys.stderr
+            )
+
+        while True:
+            params = {
+                "group_states": "all",
+                "page": page,
+                "page_size": self.bulk_page_size
+            }
+            count = 0
+            with self.datadog.get(url, headers=self.headers, params=params, stream=True) as response:
+                response.raise_for_status()
+                # Records construits depuis overall_state, groupes actifs extraits de state
+                for monitor in self._stream_monitors(response, None, BULK_FIELDS):
+                    count += 1
+                    if scope is None or scope(monitor):
+                        aggregator.add(monitor)
+
+            if count < self.bulk_page_size:
+                break
+            page += 1
+
+    def select_fetch_strategy(self) -> str:
+        """
+        Choisit entre "bulk" et "search" à partir d'un comptage search (1 seul monitor par page)
+        Coût estimé en allers-retours:
+          search = 1ère page + pages restantes en parallèle + ceil(alertes / workers)
+          bulk   = ceil(organisation / page_size) + transfert proportionnel à l'organisation
+        Le bulk transfère tous les monitors de l'organisation, pas seulement ceux de search_query;
+        il n'est jamais choisi quand le périmètre ne peut pas être reproduit côté client
+        """
+        if self.fetch_strategy != "auto":
+            return self.fetch_strategy
+        if self.search_scope is None:
+            print(f"   Strategy: search (search_query {self.search_query!r} cannot be applied to bulk results)")
+            return "search"
 
         try:
-            response = requests.get(url, headers=self.headers, params=params)
-            response.raise_for_status()
-            data = response.json()
-            monitors = data.get("monitors", [])
-
-            # Enrichir chaque monitor avec ses group_states
-            print(f"   Fetching group states for {len(monitors)} alerts...")
-            for monitor in monitors:
-                monitor_id = monitor.get("id")
-                if monitor_id:
-                    groups = self._get_monitor_group_states(monitor_id)
-                    monitor["group_states"] = groups
-
-            return monitors
+            counts_page = self._fetch_search_page(self.search_query, 0, per_page=1)
+            org_page = self._fetch_search_page("", 0, per_page=1)
         except requests.exceptions.RequestException as e:
-            print(f"❌ Error fetching active alerts from Datadog: {e}", file=sys.stderr)
-            return []
+            print(f"   ⚠️  Monitor count failed ({e}), using search strategy", file=sys.stderr)
+            return "search"
+
+        total = counts_page.get("metadata", {}).get("total_count", 0)
+        org_total = max(total, org_page.get("metadata", {}).get("total_count", 0))
+        alerts = sum(
+            status.get("count", 0)
+            for status in counts_page.get("counts", {}).get("status", [])
+            if status.get("name") in ACTIVE_STATUSES
+        )
 
-    def _get_monitor_group_states(self, monitor_id: int) -> List[Dict[str, Any]]:
-        """Récupère les group states d'un monitor spécifique"""
-        url = f"{self.base_url}/api/v1/monitor/{monitor_id}"
-        params = {"group_states": "all"}
+        search_pages = max(1, -(-total // self.search_page_size))
+        search_cost = (1 if search_pages == 1 else 2) + -(-alerts // self.enrich_workers)
+        bulk_cost = max(1, -(-org_total // self.bulk_page_size)) + org_total / 1000 * self.bulk_cost_per_1000
+
+        strategy = "bulk" if bulk_cost < search_cost else "search"
+        print(
+            f"   Strategy: {strategy} ({total} monitors of {org_total}, {alerts} alerts, "
+            f"estimated cost search={search_cost:.1f} bulk={bulk_cost:.1f})"
+        )
+        return strategy
+
+    def collect(self) -> SummaryAggregator:
+        """
+        Récupère les monitors selon FETCH_STRATEGY / FETCH_MODE et les agrège au fil de l'eau
+        (une seule passe: environnement, service, statut), puis enrichit les alertes actives
+        En mode incrémental, l'état local mis à jour par les événements remplace la récupération complète
+        """
+        self.downtimes = self.load_downtimes() if self.downtimes_enabled else None
+
+        if self.monitor_state is not None:
+            aggregator = self.collect_incremental()
+            if aggregator is not None:
+                self._resolve_paused(aggregator)
+                return aggregator
 
+        print("\n📡 Fetching all monitors...")
+        # Mode incrémental: tout l'inventaire est gardé pour remplacer l'état local
+        records: Optional[List[MonitorRecord]] = [] if self.monitor_state is not None else None
+        on_add = records.append if records is not None else None
+        with self.metrics.phase("fetch"):
+            strategy = self.select_fetch_strategy()
+            start = time.monotonic()
+            cursor = int(time.time() * 1000)
+            aggregator = SummaryAggregator(self.environments, self._classification, on_add, self._is_paused)
+
+            try:
+                if strategy == "bulk":
+                    self.aggregate_monitors_bulk(aggregator)
+                else:
+                    # FETCH_MODE=single: les alertes viennent du même snapshot que l'inventaire
+                    for monitor in self.iter_monitors_search(self.search_query):
+                        aggregator.add(monitor, alerts=self.fetch_mode == "single")
+            except requests.exceptions.RequestException as e:
+                print(f"❌ Error fetching monitors from Datadog: {e}", file=sys.stderr)
+                # Pas de statistiques sur un inventaire partiel
+                aggregator = SummaryAggregator(self.environments, self._classification, is_paused=self._is_paused)
+                records = None
+        print(f"   Found {aggregator.total} total monitors")
+        if records is not None:
+            # Les événements survenus pendant la récupération seront relus au prochain run
+            self.monitor_state.replace(records, cursor, local=self._single_group_state)
+            self.metrics.set("full_resync", 1)
+
+        # FETCH_MODE=single: les alertes viennent du même snapshot que l'inventaire
+        if strategy != "bulk" and self.fetch_mode == "split":
+            print("\n🚨 Fetching active alerts...")
+            for monitor in self.get_active_alerts_search():
+                aggregator.add_alert(monitor)
+
+        print(f"   Found {len(aggregator.alerts())} active alerts")
+        if self.monitor_cache:
+            print(f"   💾 Monitor cache: {self.monitor_cache.hits} hits, {self.monitor_cache.misses} misses")
+        print(f"   ⏱️  Fetch strategy '{strategy}' took {time.monotonic() - start:.2f}s")
+        self._resolve_paused(aggregator)
+        self._print_rate_limits()
+
+        return aggregator
+
+    def load_downtimes(self) -> Optional[DowntimeIndex]:
+        """
+        Downtimes actifs et planifiés en un seul appel (/api/v1/downtime, current_only=false), indexés
+        par monitor et par scope. None si l'appel échoue: aucun monitor n'est alors compté en pause
+        """
+        url = f"{self.base_url}/api/v1/downtime"
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self.datadog.get(url, headers=self.headers, params={"current_only": "false"})
             response.raise_for_status()
-            data = response.json()
-
-            # Extraire les groupes en alerte
-            state = data.get("state", {})
-            groups = state.get("groups", {})
-
-            result = []
-            if isinstance(groups, dict):
-                for group_name, group_data in groups.items():
-                    if isinstance(group_data, dict):
-                        status = group_data.get("status")
-                        # Ne garder que les groupes en alerte/warn/no data
-                        if status in ["Alert", "Warn", "No Data"]:
-                            result.append({
-                                "name": group_name,
-                                "status": status,
-                                "last_nodata_ts": group_data.get("last_nodata_ts")
-                            })
-
-            return result
-        except requests.exceptions.RequestException as e:
-            # Ne pas bloquer si l'appel échoue
-            return []
+            downtimes = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"   ⚠️  Downtimes unavailable ({e}), no monitor counted as paused", file=sys.stderr)
+            return None
+        index = DowntimeIndex(downtimes if isinstance(downtimes, list) else [], time.time())
+        print(f"\n⏸️  Downtimes: {index.active} active, {index.scheduled} scheduled")
+        return index
+
+    def _is_paused(self, monitor: MonitorRecord) -> Optional[bool]:
+        """
+        True si un downtime sans scope en cours couvre le monitor, None si des downtimes à scope couvrent
+        une partie de ses groupes (tranché après la récupération par _resolve_paused), False sinon
+        Appelé pendant l'agrégation: aucun appel API
+        """
+        downtimes = self.downtimes
+        if not downtimes:
+            return False
+        if downtimes.monitor_muted(monitor):
+            return True
+        if monitor.status in ACTIVE_STATUSES and downtimes.scoped(monitor):
+            return None
+        return False
+
+    def _resolve_paused(self, aggregator: SummaryAggregator) -> None:
+        """
+        Alertes dont tous les groupes actifs sont couverts par des downtimes à scope: passées en pause
+        Leurs groupes complets sont chargés en parallèle par le pool du GroupStateLoader (et resservent au rendu)
+        """
+        candidates = aggregator.pause_candidates
+        if not candidates:
+            return
+        start = time.monotonic()
+        self.group_loader.request(candidates, all_groups=True)
+        muted = []
+        for monitor in candidates:
+            groups, _ = self.group_loader.get(monitor)
+            if groups and not monitor.group_states_error and all(
+                self.downtimes.group_muted(monitor, group.name) for group in groups
+            ):
+                muted.append(monitor)
+        aggregator.pause(muted)
+        print(
+            f"   ⏸️  {len(muted)} of {len(candidates)} alerts under scoped downtimes fully muted "
+            f"({time.monotonic() - start:.2f}s)"
+        )
 
-    def _detect_environment(self, monitor: Dict[str, Any]) -> Optional[str]:
-        """Détecte l'environnement: tags > scopes > query > nom"""
-        # 1. Tags
-        tags = monitor.get("tags", [])
-        for tag in tags:
-            tag_lower = tag.lower()
-            if tag_lower.startswith("env:"):
-                env_value = tag_lower.split(":", 1)[1]
-                if "preprod" in env_value or "pre-prod" in env_value or env_value == "staging":
-                    return "preprod"
-                elif env_value == "prod" or env_value == "production":
-                    return "prod"
-
-        # 2. Scopes (nouveau dans search API)
-        scopes = monitor.get("scopes", [])
-        for scope in scopes:
-            scope_lower = scope.lower()
-            if "env:preprod" in scope_lower or "env:staging" in scope_lower:
-                return "preprod"
-            elif "env:prod" in scope_lower:
-                return "prod"
-
-        # 3. Query
-        query = monitor.get("query", "").lower()
-        if "env:preprod" in query or "env:staging" in query:
-            return "preprod"
-        elif "env:prod" in query:
-            return "prod"
-
-        # 4. Nom (fallback)
-        name = monitor.get("name", "").upper()
-        if "PREPROD" in name or "PRE-PROD" in name:
-            return "preprod"
-        elif "PROD" in name and "PREPROD" not in name:
-            return "prod"
-
-        return None
-
-    def _extract_service(self, monitor: Dict[str, Any]) -> str:
-        """Extrait le service depuis les tags"""
-        tags = monitor.get("tags", [])
-        for tag in tags:
-            if tag.startswith("service:"):
-                service = tag.split(":", 1)[1]
-                if service == "all":
-                    # Si service:all, essayer de déduire depuis les métriques
-                    metrics = monitor.get("metrics", [])
-                    if any("kubernetes" in m for m in metrics):
-                        return "KUBERNETES"
-                    return "SYSTEM"
-                return service.upper()
-
-        # Fallback: déduire depuis les métriques ou le nom
-        metrics = monitor.get("metrics", [])
-        name = monitor.get("name", "").lower()
-        query = monitor.get("query", "").lower()
-
-        if any("redis" in m for m in metrics) or "redis" in name or "redis" in query:
-            return "REDIS"
-        elif any("postgres" in m for m in metrics) or "postgres" in name or "database" in name:
-            return "POSTGRESQL"
-        elif any("kubernetes" in m for m in metrics) or "pod" in name or "container" in name:
-            return "KUBERNETES"
-        elif "disk" in name or "memory" in name or "cpu" in name:
-            return "SYSTEM"
+    def iter_monitor_events(self, start_ms: int, end_ms: int) -> Iterator[MonitorEvent]:
+        """Transitions de monitors de /api/v2/events entre deux instants (ms), toutes pages confondues"""
+        url = f"{self.base_url}/api/v2/events"
+        params = {
+            "filter[query]": "source:alert",
+            "filter[from]": str(start_ms),
+            "filter[to]": str(end_ms),
+            "sort": "timestamp",
+            "page[limit]": self.events_page_size
+        }
+        while True:
+            response = self.datadog.get(url, headers=self.headers, params=params)
+            response.raise_for_status()
+            payload = response.json()
+            for item in payload.get("data") or []:
+                event = parse_monitor_event(item)
+                if event is not None:
+                    yield event
+            after = ((payload.get("meta") or {}).get("page") or {}).get("after")
+            if not after:
+                return
+            params["page[cursor]"] = after
+
+    def _fetch_monitor(self, monitor_id: int) -> Optional[MonitorRecord]:
+        """Définition et tous les groupes actifs d'un monitor (None s'il a été supprimé)"""
+        url = f"{self.base_url}/api/v1/monitor/{monitor_id}"
+        response = self.datadog.get(url, headers=self.headers, params={"group_states": "all"})
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return MonitorRecord.from_api(response.json())
+
+    def collect_incremental(self) -> Optional[SummaryAggregator]:
+        """
+        Applique à l'état local les transitions lues depuis le curseur, relit les monitors que les
+        événements ne suffisent pas à mettre à jour, et agrège l'état obtenu
+        None si une récupération complète est nécessaire (premier run, resync due, curseur trop ancien,
+        trop d'événements ou appel en échec)
+        """
+        state = self.monitor_state
+        now = time.time()
+        reason = state.resync_reason(now, self.resync_interval, self.max_event_gap)
+        if reason:
+            print(f"\n🔄 Full resync ({reason})")
+            return None
+
+        print("\n📡 Reading monitor events since last run...")
+        start = time.monotonic()
+        end_ms = int(now * 1000)
+        with self.metrics.phase("fetch"):
+            try:
+                events = []
+                for event in self.iter_monitor_events(state.cursor - int(self.event_lag * 1000), end_ms):
+                    events.append(event)
+                    if len(events) > self.max_events:
+                        print(f"\n🔄 Full resync (more than {self.max_events} events since last run)")
+                        return None
+
+                stale = state.apply(events)
+                if stale:
+                    with ThreadPoolExecutor(max_workers=min(self.enrich_workers, len(stale))) as pool:
+                        refreshed = list(pool.map(lambda monitor_id: (monitor_id, self._fetch_monitor(monitor_id)), stale))
+                    for monitor_id, record in refreshed:
+                        # Supprimé, ou hors du périmètre search_query (le flux d'événements couvre toute l'organisation)
+                        if record is None or (self.search_scope is not None and not self.search_scope(record)):
+                            state.remove(monitor_id)
+                        else:
+                            state.put(record, local=self._single_group_state)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"   ⚠️  Monitor events unavailable ({e}), full resync", file=sys.stderr)
+                return None
+            state.cursor = end_ms
+
+            aggregator = SummaryAggregator(self.environments, self._classification, is_paused=self._is_paused)
+            for record in state.records(self.group_limit):
+                aggregator.add(record)
+
+        print(
+            f"   Applied {len(events)} events to {aggregator.total} monitors "
+            f"({len(stale)} refetched) in {time.monotonic() - start:.2f}s"
+        )
+        print(f"   Found {len(aggregator.alerts())} active alerts")
+        self.metrics.set("monitor_events", len(events))
+        self.metrics.set("full_resync", 0)
+        self._print_rate_limits()
+        return aggregator
+
+    def _print_rate_limits(self) -> None:
+        """Requêtes, 429 rejoués et erreurs par endpoint Datadog pour ce run"""
+        for endpoint, stats in self.datadog.summary().items():
+            if not stats["requests"]:
+                continue
+            quota = f", limit {stats['limit']:.0f}/{stats['period']:.0f}s" if stats["limit"] else ""
+            print(
+                f"   🚦 {endpoint}: {stats['requests']} requests, {stats['throttled']} throttled, "
+                f"{stats['errors']} failed, waited {stats['waited']:.2f}s (concurrency {stats['concurrency']}{quota})"
+            )
+
+    def _derived_fields(self, monitor: MonitorRecord) -> Dict[str, Any]:
+        """
+        Résultats dérivés du monitor (environnement, service, noms nettoyés), calculés une seule fois
+        Repris du cache si modified n'a pas changé (la définition cachée complète le payload live),
+        sinon calculés puis mis en cache
+        """
+        derived = monitor.derived
+        if derived is not None:
+            return derived
+
+        monitor_id = monitor.id
+        modified = monitor.modified
+        entry = None
+        if self.monitor_cache and monitor_id:
+            entry = self.monitor_cache.get(monitor_id, modified)
+
+        if entry is not None:
+            monitor.fill_definition(entry["definition"])
         else:
-            return "OTHER"
-
-    def separate_by_environment(self, monitors: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
-        """Sépare les moniteurs par environnement"""
-        preprod = []
-        prod = []
-
-        for monitor in monitors:
-            env = self._detect_environment(monitor)
-            if env == "preprod":
-                preprod.append(monitor)
-            elif env == "prod":
-                prod.append(monitor)
-
-        return {"preprod": preprod, "prod": prod}
-
-    def group_by_service(self, monitors: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
-        """Groupe les moniteurs par service"""
-        grouped = defaultdict(list)
-        for monitor in monitors:
-            service = self._extract_service(monitor)
-            grouped[service].append(monitor)
-        return dict(grouped)
-
-    def calculate_statistics(self, all_monitors: List[Dict[str, Any]], active_alerts: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Calcule les statistiques"""
-        total = len(all_monitors)
-        down = len(active_alerts)
-        operational = total - down
-        uptime = (operational / total * 100) if total > 0 else 100
+            environment, service = self.classifier.classify(monitor)
+            if self.monitor_cache and monitor_id and modified:
+                entry = self.monitor_cache.put(monitor, environment, service)
+            else:
+                entry = {"environment": environment, "service": service, "clean_names": {}}
+
+        monitor.derived = entry
+        return entry
+
+    def _classification(self, monitor: MonitorRecord) -> Tuple[Optional[str], str]:
+        """(environnement, service) du monitor"""
+        start = time.perf_counter()
+        derived = self._derived_fields(monitor)
+        self.metrics.add_time("classification", time.perf_counter() - start)
+        return derived["environment"], derived["service"]
+
+    def _name_variables(self, monitor: MonitorRecord) -> Dict[str, str]:
+        """Variables du nom connues pour ce run: {{threshold}} (query) et {{value}} (série de la métrique)"""
+        name = monitor.name
+        if not name or "{{" not in name:
+            return {}
+        variables = {}
+        if "threshold" in name:
+            parsed = parse_query(monitor.query)
+            if parsed is not None and parsed.threshold is not None:
+                variables["threshold"] = format_value(parsed.threshold)
+        if "value" in name:
+            value = self.metric_values.value(monitor)
+            if value is not None:
+                variables["value"] = format_value(value)
+        return variables
+
+    def _display_name(self, monitor: MonitorRecord) -> str:
+        """Nom nettoyé du monitor, mémorisé par statut avec sa définition"""
+        derived = self._derived_fields(monitor)
+        status = monitor.status
+        variables = self._name_variables(monitor)
+        if variables:
+            # Valeurs propres à ce run: pas mémorisé avec la définition (le cache LRU du NameCleaner suffit)
+            return self.name_cleaner.clean(fill_templates(monitor.name, variables), status)
+        clean_name = derived["clean_names"].get(status)
+        if clean_name is None:
+            clean_name = self._clean_monitor_name(monitor)
+            if self.monitor_cache and monitor.id and monitor.modified:
+                self.monitor_cache.set_clean_name(monitor.id, status, clean_name)
+            else:
+                derived["clean_names"][status] = clean_name
+        return clean_name
+
+    def _single_group_state(self, monitor: MonitorRecord) -> Optional[GroupSelection]:
+        """
+        Groupe unique "*" d'un monitor sans group-by (déduit de sa query, sans appel API)
+        None si la query a un group-by ou n'est pas analysable: les groupes viennent alors de l'API
+        """
+        parsed = parse_query(monitor.query)
+        if parsed is None or parsed.grouped:
+            return None
+        return (GroupState("*", monitor.status),), 1, ()
+
+    def _get_monitor_group_states(self, monitor_id: int, all_groups: bool = False) -> Optional[GroupSelection]:
+        """
+        Groupes actifs les plus graves (group_limit, ou tous avec `all_groups`), nombre total et compteurs
+        par clé de tag d'un monitor (None si l'appel a échoué). La réponse est lue en flux: seuls les
+        groupes retenus sont conservés
+        """
+        url = f"{self.base_url}/api/v1/monitor/{monitor_id}"
+        params = {"group_states": "all"}
+
+        try:
+            with self.datadog.get(url, headers=self.headers, params=params, stream=True) as response:
+                response.raise_for_status()
+                groups = iter_json_members(response.iter_content(chunk_size=STREAM_CHUNK_SIZE), ("state", "groups"))
+                return alerting_groups(groups, None if all_groups else self.group_limit)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            # Ne pas bloquer si l'appel échoue, l'échec est compté dans le résumé du run
+            print(f"   ⚠️  Group states for monitor {monitor_id} failed: {e}", file=sys.stderr)
+            return None
+
+    def _detect_environment(self, monitor: MonitorRecord) -> Optional[str]:
+        """Détecte l'environnement: tags > scopes > query > nom (voir classification_rules.json)"""
+        return self.classifier.classify(monitor)[0]
+
+    def _extract_service(self, monitor: MonitorRecord) -> str:
+        """Extrait le service: tag service: puis métriques/nom/query (voir classification_rules.json)"""
+        return self.classifier.classify(monitor)[1]
+
+    def calculate_statistics(self, summary: EnvironmentSummary) -> Dict[str, Any]:
+        """Calcule les statistiques d'un environnement à partir de ses compteurs"""
+        total = summary.total
+        down = summary.down
+        # Monitors mutés par un downtime: ni down ni opérationnels, hors du calcul de l'uptime
+        paused = summary.paused
+        operational = total - down - paused
+        tracked = total - paused
+        uptime = (operational / tracked * 100) if tracked > 0 else 100
 
         return {
             "total": total,
             "operational": operational,
             "down": down,
-            "paused": 0,  # TODO: extraire depuis muted_until_ts
+            "paused": paused,
             "uptime": uptime
         }
 
@@ -223,42 +678,35 @@ class DatadogAlertSummary:
         else:
             return group_name.replace('_', ' ').title()
 
-    def _clean_monitor_name(self, monitor: Dict[str, Any]) -> str:
-        """Nettoie le nom du monitor des templates Datadog"""
-        name = monitor.get("name", "Unknown")
-        status = monitor.get("status", "Unknown")
-
-        # Extraire la bonne section selon le statut
-        if "{{#is_alert}}" in name:
-            if status in ["Alert", "No Data"]:
-                match = re.search(r'\{\{#is_alert\}\}(.*?)\{\{/is_alert\}\}', name, re.DOTALL)
-                if match:
-                    name = match.group(1)
-            elif status == "Warn":
-                match_warn = re.search(r'\{\{#is_warning\}\}(.*?)\{\{/is_warning\}\}', name, re.DOTALL)
-                if match_warn:
-                    name = match_warn.group(1)
-                else:
-                    match = re.search(r'\{\{#is_alert\}\}(.*?)\{\{/is_alert\}\}', name, re.DOTALL)
-                    if match:
-                        name = match.group(1)
-
-        # Supprimer tous les templates {{xxx}}
-        name = re.sub(r'\{\{[^}]+\}\}', '', name)
-
-        # Nettoyer le formatting
-        name = re.sub(r'\s*-\s*-\s*', ' - ', name)
-        name = re.sub(r'\s+-\s+', ' - ', name)
-        name = re.sub(r'\s+', ' ', name)
-        name = re.sub(r'\s*-\s*$', '', name)
-        name = re.sub(r'^\s*-\s*', '', name)
+    def _muted_suffix(self, monitor: MonitorRecord, group_name: str) -> str:
+        """Mention d'un groupe couvert par un downtime en cours (alerte partiellement mutée)"""
+        if self.downtimes and self.downtimes.group_muted(monitor, group_name):
+            return " ⏸️ _muted_"
+        return ""
+
+    def _format_key_counts(self, key_counts: KeyCounts) -> str:
+        """
+        Résumé des groupes actifs par clé de tag (ex: 'Pod Name: 312 alerting, 4 no data')
+        Les clés aux compteurs identiques (group-by sur plusieurs tags) partagent une entrée
+        """
+        merged: Dict[Tuple[Tuple[Status, int], ...], List[str]] = {}
+        for key, by_status in key_counts:
+            merged.setdefault(by_status, []).append(key.replace('_', ' ').title())
+        return " · ".join(
+            f"{', '.join(keys)}: " + ", ".join(f"{count} {GROUP_STATUS_LABELS[status]}" for status, count in by_status)
+            for by_status, keys in merged.items()
+        )
 
-        return name.strip()
+    def _clean_monitor_name(self, monitor: MonitorRecord) -> str:
+        """Nettoie le nom du monitor des templates Datadog"""
+        name = monitor.name if monitor.name is not None else "Unknown"
+        return self.name_cleaner.clean(name, monitor.status)
 
-    def format_slack_message(self, statistics: Dict[str, Any], grouped_alerts: Dict[str, List[Dict[str, Any]]], environment: str) -> Dict[str, Any]:
+    def format_slack_message(self, statistics: Dict[str, Any], summary: EnvironmentSummary, environment: str) -> Dict[str, Any]:
         """Formate le message Slack"""
-        total_alerts = sum(len(alerts) for alerts in grouped_alerts.values())
+        total_alerts = summary.down
         uptime = statistics["uptime"]
+        paused_suffix = f" ({statistics['paused']} paused)" if statistics["paused"] else ""
 
         # Emoji basé sur l'uptime
         if uptime >= 95:
@@ -278,7 +726,7 @@ class DatadogAlertSummary:
             "type": "header",
             "text": {
                 "type": "plain_text",
-                "text": f"{status_emoji} Infrastructure Health - {uptime:.1f}% Operational"
+                "text": f"{status_emoji} Infrastructure Health - {uptime:.1f}% Operational{paused_suffix}"
             }
         })
 
@@ -295,6 +743,7 @@ class DatadogAlertSummary:
             f"*Total Monitors*\n{statistics['total']}\n\n"
             f"*Operational*\n▸ {statistics['operational']}\n\n"
             f"*Down*\n:small_red_triangle_down: {statistics['down']}\n\n"
+            f"*Paused*\n⏸️ {statistics['paused']}\n\n"
             f"*Uptime*\n{uptime:.1f}%"
         )
 
@@ -326,23 +775,9 @@ class DatadogAlertSummary:
                 }
             })
 
-            # Séparer les alertes par statut: Alert/Warn vs No Data
-            regular_alerts = {}
-            no_data_alerts = {}
-
-            for category, alerts in grouped_alerts.items():
-                regular = []
-                no_data = []
-                for alert in alerts:
-                    if alert.get("status") == "No Data":
-                        no_data.append(alert)
-                    else:
-                        regular.append(alert)
-
-                if regular:
-                    regular_alerts[category] = regular
-                if no_data:
-                    no_data_alerts[category] = no_data
+            # Alertes déjà séparées par statut lors de l'agrégation: Alert/Warn vs No Data
+            regular_alerts = summary.regular_by_service
+            no_data_alerts = summary.no_data_by_service
 
             # Priorités
             category_priority = {
@@ -354,13 +789,24 @@ class DatadogAlertSummary:
                 "OTHER": 99
             }
 
+            sorted_categories = sorted(
+                regular_alerts.items(),
+                key=lambda x: (category_priority.get(x[0], 50), x[0])
+            )
+            sorted_no_data = sorted(
+                no_data_alerts.items(),
+                key=lambda x: (category_priority.get(x[0], 50), x[0])
+            )
+
+            # Groupes demandés dans l'ordre d'affichage: les premières alertes rendues sont les premières chargées
+            detailed = [monitor for _, alerts in sorted_categories + sorted_no_data for monitor in alerts]
+            if self.max_detailed_alerts:
+                detailed = detailed[:self.max_detailed_alerts]
+            self.group_loader.request(detailed)
+            detailed_ids = {id(monitor) for monitor in detailed}
+
             # Afficher d'abord les alertes régulières (Alert/Warn)
             if regular_alerts:
-                sorted_categories = sorted(
-                    regular_alerts.items(),
-                    key=lambda x: (category_priority.get(x[0], 50), x[0])
-                )
-
                 for category, alerts in sorted_categories:
                     blocks.append({
                         "type": "section",
@@ -373,60 +819,71 @@ class DatadogAlertSummary:
                     # Créer un bloc séparé pour chaque alerte
                     for monitor in alerts:
                         alert_lines = []
-                        clean_name = self._clean_monitor_name(monitor)
-                        status = monitor.get("status", "Unknown")
-                        monitor_id = monitor.get("id", "")
+                        clean_name = self._display_name(monitor)
+                        status = monitor.status
+                        monitor_id = monitor.id or ""
 
                         # Emoji
-                        if status == "Alert":
+                        if status == Status.ALERT:
                             emoji = "🔴"
-                        elif status == "Warn":
+                        elif status == Status.WARN:
                             emoji = "🟡"
                         else:
                             emoji = "⚫"
 
+                        # Tendance de la série la plus en alerte
+                        sparkline = self.metric_values.sparkline(monitor)
+                        trend_suffix = f"  {sparkline}" if sparkline else ""
+
                         # Lien vers Datadog
                         if monitor_id:
                             url = f"https://app.{self.dd_site}/monitors/{monitor_id}"
-                            alert_lines.append(f"• {emoji} <{url}|{clean_name}>")
+                            alert_lines.append(f"• {emoji} <{url}|{clean_name}>{trend_suffix}")
                         else:
-                            alert_lines.append(f"• {emoji} {clean_name}")
+                            alert_lines.append(f"• {emoji} {clean_name}{trend_suffix}")
 
-                        # Afficher les sous-groupes si présents (limité à 5 max)
-                        group_states = monitor.get("group_states", [])
+                        # Afficher les sous-groupes si présents (les MAX_GROUPS_SHOWN plus graves puis plus récents)
+                        group_states, total_groups = (
+                            self.group_loader.get(monitor) if id(monitor) in detailed_ids else ((), 0)
+                        )
                         if group_states:
-                            total_groups = len(group_states)
-                            # Limiter à 5 groupes max
-                            for group in group_states[:5]:
-                                group_name = self._format_group_name(group["name"])
-                                group_status = group["status"]
+                            for group in group_states[:MAX_GROUPS_SHOWN]:
+                                group_name = self._format_group_name(group.name)
+                                group_status = group.status
+                                group_value = (
+                                    self.metric_values.value(monitor, group.name) if group_status != Status.NO_DATA else None
+                                )
+                                value_suffix = f": {format_value(group_value)}" if group_value is not None else ""
+                                value_suffix += self._muted_suffix(monitor, group.name)
 
                                 # Emoji pour le groupe
-                                if group_status == "Alert":
+                                if group_status == Status.ALERT:
                                     group_emoji = "🔴"
-                                elif group_status == "Warn":
+                                elif group_status == Status.WARN:
                                     group_emoji = "🟡"
-                                elif group_status == "No Data":
+                                elif group_status == Status.NO_DATA:
                                     group_emoji = "⚪"
                                 else:
                                     group_emoji = "⚫"
 
                                 # Créer l'URL pour ce groupe spécifique
                                 if monitor_id:
-                                    encoded_group = quote(group['name'], safe='')
+                                    encoded_group = quote(group.name, safe='')
                                     group_url = f"https://app.{self.dd_site}/monitors/{monitor_id}?group={encoded_group}"
-                                    alert_lines.append(f"  ↳ {group_emoji} <{group_url}|{group_name}>")
+                                    alert_lines.append(f"  ↳ {group_emoji} <{group_url}|{group_name}>{value_suffix}")
                                 else:
-                                    alert_lines.append(f"  ↳ {group_emoji} {group_name}")
+                                    alert_lines.append(f"  ↳ {group_emoji} {group_name}{value_suffix}")
 
-                            # Si plus de 5, afficher le compte avec lien vers le monitor
-                            if total_groups > 5:
-                                remaining = total_groups - 5
+                            # Au-delà, afficher le compte et les compteurs par clé de tag avec lien vers le monitor
+                            if total_groups > MAX_GROUPS_SHOWN:
+                                remaining = total_groups - MAX_GROUPS_SHOWN
+                                key_counts = self._format_key_counts(monitor.group_key_counts)
+                                counts_suffix = f" ({key_counts})" if key_counts else ""
                                 if monitor_id:
                                     all_groups_url = f"https://app.{self.dd_site}/monitors/{monitor_id}"
-                                    alert_lines.append(f"  ↳ <{all_groups_url}|... and {remaining} more>")
+                                    alert_lines.append(f"  ↳ <{all_groups_url}|... and {remaining} more>{counts_suffix}")
                                 else:
-                                    alert_lines.append(f"  ↳ ... and {remaining} more")
+                                    alert_lines.append(f"  ↳ ... and {remaining} more{counts_suffix}")
 
                         # Un bloc par alerte (au lieu de toutes les alertes dans un seul bloc)
                         blocks.append({
@@ -448,11 +905,6 @@ class DatadogAlertSummary:
                     }
                 })
 
-                sorted_no_data = sorted(
-                    no_data_alerts.items(),
-                    key=lambda x: (category_priority.get(x[0], 50), x[0])
-                )
-
                 for category, alerts in sorted_no_data:
                     blocks.append({
                         "type": "section",
@@ -465,8 +917,8 @@ class DatadogAlertSummary:
                     # Créer un bloc séparé pour chaque alerte No Data
                     for monitor in alerts:
                         alert_lines = []
-                        clean_name = self._clean_monitor_name(monitor)
-                        monitor_id = monitor.get("id", "")
+                        clean_name = self._display_name(monitor)
+                        monitor_id = monitor.id or ""
 
                         # Lien vers Datadog
                         if monitor_id:
@@ -475,28 +927,32 @@ class DatadogAlertSummary:
                         else:
                             alert_lines.append(f"• ⚪ {clean_name}")
 
-                        # Afficher les sous-groupes si présents (limité à 5 max)
-                        group_states = monitor.get("group_states", [])
+                        # Afficher les sous-groupes si présents (les MAX_GROUPS_SHOWN plus graves puis plus récents)
+                        group_states, total_groups = (
+                            self.group_loader.get(monitor) if id(monitor) in detailed_ids else ((), 0)
+                        )
                         if group_states:
-                            total_groups = len(group_states)
-                            for group in group_states[:5]:
-                                group_name = self._format_group_name(group["name"])
+                            for group in group_states[:MAX_GROUPS_SHOWN]:
+                                group_name = self._format_group_name(group.name)
+                                muted_suffix = self._muted_suffix(monitor, group.name)
 
                                 # Créer l'URL pour ce groupe spécifique
                                 if monitor_id:
-                                    encoded_group = quote(group['name'], safe='')
+                                    encoded_group = quote(group.name, safe='')
                                     group_url = f"https://app.{self.dd_site}/monitors/{monitor_id}?group={encoded_group}"
-                                    alert_lines.append(f"  ↳ ⚪ <{group_url}|{group_name}>")
+                                    alert_lines.append(f"  ↳ ⚪ <{group_url}|{group_name}>{muted_suffix}")
                                 else:
-                                    alert_lines.append(f"  ↳ ⚪ {group_name}")
+                                    alert_lines.append(f"  ↳ ⚪ {group_name}{muted_suffix}")
 
-                            if total_groups > 5:
-                                remaining = total_groups - 5
+                            if total_groups > MAX_GROUPS_SHOWN:
+                                remaining = total_groups - MAX_GROUPS_SHOWN
+                                key_counts = self._format_key_counts(monitor.group_key_counts)
+                                counts_suffix = f" ({key_counts})" if key_counts else ""
                                 if monitor_id:
                                     all_groups_url = f"https://app.{self.dd_site}/monitors/{monitor_id}"
-                                    alert_lines.append(f"  ↳ <{all_groups_url}|... and {remaining} more>")
+                                    alert_lines.append(f"  ↳ <{all_groups_url}|... and {remaining} more>{counts_suffix}")
                                 else:
-                                    alert_lines.append(f"  ↳ ... and {remaining} more")
+                                    alert_lines.append(f"  ↳ ... and {remaining} more{counts_suffix}")
 
                         # Un bloc par alerte
                         blocks.append({
@@ -509,6 +965,132 @@ class DatadogAlertSummary:
 
         blocks.append({"type": "divider"})
 
+        # Footer
+        footer = [
+            {
+                "type": "mrkdwn",
+                "text": f"Mobula Monitoring System | {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}"
+            }
+        ]
+        missing_groups = sum(1 for monitor in summary.alerts if monitor.group_states_error)
+        if missing_groups:
+            footer.append({
+                "type": "mrkdwn",
+                "text": f"⚠️ Group details unavailable for {missing_groups} alerts (Datadog API errors)"
+            })
+        if self.max_detailed_alerts and total_alerts > self.max_detailed_alerts:
+            footer.append({
+                "type": "mrkdwn",
+                "text": f"ℹ️ Group details shown for the first {self.max_detailed_alerts} of {total_alerts} alerts"
+            })
+        blocks.append({
+            "type": "context",
+            "elements": footer
+        })
+
+        return {"blocks": blocks}
+
+    def _status_emoji(self, status: str) -> str:
+        if status == Status.ALERT:
+            return "🔴"
+        elif status == Status.WARN:
+            return "🟡"
+        elif status == Status.NO_DATA:
+            return "⚪"
+        return "⚫"
+
+    def _alert_snapshot(self, active_alerts: List[MonitorRecord]) -> Dict[str, Dict[str, Any]]:
+        """Ensemble des alertes courantes (monitor id -> nom, statut, groupes) pour le store"""
+        # Le diff porte sur tous les groupes: chaque alerte suivie est chargée
+        self.group_loader.request(active_alerts)
+        return {
+            str(monitor.id): snapshot_alert(
+                self._display_name(monitor),
+                monitor.status,
+                [group.name for group in self.group_loader.get(monitor)[0]]
+            )
+            for monitor in active_alerts
+            if monitor.id
+        }
+
+    def format_delta_message(self, statistics: Dict[str, Any], changes: Dict[str, List[Dict[str, Any]]], environment: str) -> Dict[str, Any]:
+        """Formate un message Slack avec uniquement les changements depuis le dernier envoi"""
+        blocks = []
+
+        blocks.append({
+            "type": "header",
+            "text": {
+                "type": "plain_text",
+                "text": (
+                    f"🔔 {environment.upper()} Alert Changes - {statistics['uptime']:.1f}% Operational"
+                    + (f" ({statistics['paused']} paused)" if statistics["paused"] else "")
+                )
+            }
+        })
+
+        blocks.append({
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": (
+                    f":bar_chart: *{statistics['down']} Down* / {statistics['total']} monitors"
+                    + (f", {statistics['paused']} paused" if statistics["paused"] else "") + " | "
+                    f"{len(changes['new'])} new, {len(changes['resolved'])} resolved, {len(changes['changed'])} changed"
+                )
+            }
+        })
+
+        sections = [
+            ("new", "🆕 *New Alerts*"),
+            ("changed", "🔄 *Changed Alerts*"),
+            ("resolved", "✅ *Resolved*")
+        ]
+        for kind, title in sections:
+            if not changes[kind]:
+                continue
+
+            blocks.append({"type": "divider"})
+            blocks.append({
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": title
+                }
+            })
+
+            # Un bloc par alerte
+            for alert in changes[kind]:
+                url = f"https://app.{self.dd_site}/monitors/{alert['id']}"
+                if kind == "resolved":
+                    alert_lines = [f"• ✅ <{url}|{alert['name']}>"]
+                elif kind == "changed":
+                    emoji = self._status_emoji(alert["status"])
+                    alert_lines = [f"• {emoji} <{url}|{alert['name']}>"]
+                    if alert["previous_status"] != alert["status"]:
+                        alert_lines[0] += f" ({alert['previous_status']} → {alert['status']})"
+                    group_changes = [f"+ {name}" for name in alert["added_groups"]] + [f"− {name}" for name in alert["removed_groups"]]
+                    for group_change in group_changes[:5]:
+                        alert_lines.append(f"  ↳ {group_change}")
+                    if len(group_changes) > 5:
+                        alert_lines.append(f"  ↳ <{url}|... and {len(group_changes) - 5} more>")
+                else:
+                    emoji = self._status_emoji(alert["status"])
+                    alert_lines = [f"• {emoji} <{url}|{alert['name']}>"]
+                    for group_name in alert["groups"][:5]:
+                        alert_lines.append(f"  ↳ {self._format_group_name(group_name)}")
+                    if len(alert["groups"]) > 5:
+                        alert_lines.append(f"  ↳ <{url}|... and {len(alert['groups']) - 5} more>")
+
+                blocks.append({
+                    "type": "section",
+                    "text": {
+                        "type": "mrkdwn",
+                        "text": "\n".join(alert_lines)
+                    }
+                })
+
+        blocks.append({"type": "divider"})
+
         # Footer
         blocks.append({
             "type": "context",
@@ -524,24 +1106,60 @@ class DatadogAlertSummary:
 
     def send_to_slack(self, message: Dict[str, Any], environment: str) -> bool:
         """Envoie le message sur Slack"""
-        webhook_url = self.slack_webhook_prod if environment == "prod" else self.slack_webhook_preprod
+        return self.deliver_to_slack({environment: (message, None)})[environment]
+
+    def deliver_to_slack(self, outbox: Dict[str, Tuple[Dict[str, Any], Optional[Callable[[], None]]]]) -> Dict[str, bool]:
+        """
+        Envoie les messages de tous les environnements en parallèle (un fil par webhook)
+        outbox: environnement -> (message, callback appelé si l'envoi réussit)
+        """
+        jobs = {}
+        parts_by_env = {}
+        for environment, (message, _) in outbox.items():
+            # Respecter les limites Slack (50 blocs, 3000 caractères par texte), quitte à découper
+            start = time.monotonic()
+            parts = pack_message(message)
+            packing = time.monotonic() - start
+            self.metrics.add_time("formatting", packing)
+            print(
+                f"   {environment.upper()}: packed {len(message.get('blocks', []))} blocks into {len(parts)} message(s) "
+                f"in {packing * 1000:.1f}ms"
+            )
+            parts_by_env[environment] = parts
+            jobs[environment] = (
+                self.slack_webhooks[environment],
+                [(json.dumps(part).encode("utf-8"), len(part["blocks"])) for part in parts]
+            )
+
+        with self.metrics.phase("delivery"):
+            reports = self.slack_delivery.deliver(jobs)
+
+        results = {}
+        for environment, (_, on_sent) in outbox.items():
+            parts = parts_by_env[environment]
+            for report in reports[environment]:
+                retries = f", {report.attempts} attempts" if report.attempts > 1 else ""
+                print(
+                    f"   {environment.upper()} message {report.index}/{len(parts)}: {report.size} bytes, "
+                    f"{report.blocks} blocks, {'delivered' if report.ok else 'failed'} in "
+                    f"{report.latency * 1000:.0f}ms{retries}"
+                )
 
-        try:
-            # Debug: afficher la taille du message
-            message_json = json.dumps(message)
-            print(f"   Message size: {len(message_json)} bytes, {len(message.get('blocks', []))} blocks")
-
-            response = requests.post(webhook_url, json=message, headers={"Content-Type": "application/json"})
-            response.raise_for_status()
-            print(f"✅ Message sent to Slack ({environment}) successfully")
-            return True
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Error sending to Slack ({environment}): {e}", file=sys.stderr)
-            # Sauvegarder le message pour debug
-            with open(f"slack_message_{environment}_error.json", "w") as f:
-                json.dump(message, f, indent=2)
-            print(f"   Message saved to slack_message_{environment}_error.json for debugging")
-            return False
+            failed = next((report for report in reports[environment] if not report.ok), None)
+            if failed is None:
+                print(f"✅ Message sent to Slack ({environment}) successfully")
+                if on_sent:
+                    on_sent()
+                results[environment] = True
+            else:
+                print(f"❌ Error sending to Slack ({environment}), message {failed.index}/{len(parts)}: {failed.error}", file=sys.stderr)
+                # Sauvegarder le message pour debug
+                with open(f"slack_message_{environment}_error.json", "w") as f:
+                    json.dump(parts[failed.index - 1], f, indent=2)
+                print(f"   Message saved to slack_message_{environment}_error.json for debugging")
+                results[environment] = False
+
+        return results
 
     def run(self):
         """Execute le processus complet"""
@@ -549,64 +1167,217 @@ class DatadogAlertSummary:
         print("Datadog Alert Summary v3")
         print("=" * 60)
 
-        # Récupérer tous les monitors
-        print("\n📡 Fetching all monitors...")
-        all_monitors = self.get_all_monitors_search()
-        print(f"   Found {len(all_monitors)} total monitors")
-
-        # Récupérer les alertes actives
-        print("\n🚨 Fetching active alerts...")
-        active_alerts = self.get_active_alerts_search()
-        print(f"   Found {len(active_alerts)} active alerts")
-
-        # Séparer par environnement
-        all_by_env = self.separate_by_environment(all_monitors)
-        alerts_by_env = self.separate_by_environment(active_alerts)
+        # Récupérer et agréger les monitors (environnement, service, statut) en une passe
+        run_start = time.monotonic()
+        self.metrics.reset()
+        self.datadog.reset_stats()
+        self.group_loader.reset()
+        aggregator = self.collect()
 
         print(f"\n📊 Environment split:")
-        print(f"   PREPROD: {len(all_by_env['preprod'])} total, {len(alerts_by_env['preprod'])} alerts")
-        print(f"   PROD: {len(all_by_env['prod'])} total, {len(alerts_by_env['prod'])} alerts")
-
-        # Traiter chaque environnement
-        success_preprod = self._process_environment("preprod", all_by_env["preprod"], alerts_by_env["preprod"])
-        success_prod = self._process_environment("prod", all_by_env["prod"], alerts_by_env["prod"])
+        for environment, summary in aggregator.environments.items():
+            print(f"   {environment.upper()}: {summary.total} total, {summary.down} alerts")
+
+        self.metric_values.reset()
+        if self.metric_values_enabled:
+            self._load_metric_values(aggregator.alerts())
+
+        # Préparer le message de chaque environnement
+        results = {}
+        outbox = {}
+        with self.metrics.phase("formatting"):
+            for environment, summary in aggregator.environments.items():
+                prepared = self._process_environment(environment, summary)
+                if prepared is None:
+                    # Rien à envoyer pour cet environnement
+                    results[environment] = True
+                else:
+                    outbox[environment] = prepared
+        # Temps passé par le rendu à attendre les groupes (compté aussi dans formatting)
+        self.group_loader.close()
+        self.metrics.add_time("enrichment", self.group_loader.waited)
+        group_states = self.group_loader.summary_line(len(aggregator.alerts()))
+        if group_states:
+            print(f"\n   Group states: {group_states}")
+        if self.group_loader.failures:
+            print(f"   ⚠️  Group states unavailable for {self.group_loader.failures} monitors", file=sys.stderr)
+
+        # Envoyer tous les messages en parallèle
+        if outbox:
+            print(f"\n📤 Sending {len(outbox)} summaries to Slack...")
+            results.update(self.deliver_to_slack(outbox))
+
+        if self.monitor_cache:
+            self.monitor_cache.flush()
+        if self.monitor_state:
+            self.monitor_state.save()
+        if self.alert_state:
+            self.alert_state.save()
 
         print("\n" + "=" * 60)
-        if success_preprod or success_prod:
+        throttled = sum(stats["throttled"] for stats in self.datadog.summary().values())
+        if throttled or self.group_loader.failures:
+            print(f"⚠️  Datadog: {throttled} throttled requests, group states missing for {self.group_loader.failures} monitors")
+        print(f"⏱️  Phases: {self.metrics.summary_line()}")
+        if any(results.values()):
             print("✅ Alert summaries sent successfully!")
-            return 0
+            code = 0
         else:
             print("❌ Failed to send summaries")
-            return 1
-
-    def _process_environment(self, environment: str, all_monitors: List[Dict[str, Any]], active_alerts: List[Dict[str, Any]]) -> bool:
-        """Traite un environnement spécifique"""
+            code = 1
+
+        self._export_metrics(aggregator, code, time.monotonic() - run_start)
+        return code
+
+    def _load_metric_values(self, alerts: List[MonitorRecord]) -> None:
+        """Valeurs courantes de toutes les alertes suivies, en un minimum d'appels /api/v1/query"""
+        start = time.monotonic()
+        with self.metrics.phase("enrichment"):
+            self.metric_values.load(alerts)
+        stats = self.metric_values.summary()
+        if stats["requests"]:
+            failed = f", {stats['failures']} failed" if stats["failures"] else ""
+            print(
+                f"\n📏 Metric values: {stats['monitors']}/{len(alerts)} alerts from {stats['expressions']} queries "
+                f"in {stats['requests']} requests{failed} ({time.monotonic() - start:.2f}s)"
+            )
+        if stats["sparklines"] or stats["sparklines_skipped"]:
+            skipped = f", {stats['sparklines_skipped']} series over CPU budget" if stats["sparklines_skipped"] else ""
+            print(
+                f"📈 Sparklines: {stats['sparklines']} alerts in {self.metric_values.sparkline_time * 1000:.0f}ms"
+                f"{skipped}"
+            )
+
+    def _export_metrics(self, aggregator: SummaryAggregator, code: int, duration: float) -> None:
+        """Complète les métriques du run et les écrit dans METRICS_PATH (.prom ou JSON)"""
+        if not self.metrics_path:
+            return
+        self.metrics.set("run_duration_seconds", duration)
+        self.metrics.set("exit_code", code)
+        self.metrics.set("monitors", aggregator.total)
+        self.metrics.set("monitors_unclassified", aggregator.unclassified)
+        self.metrics.set("active_alerts", len(aggregator.alerts()))
+        self.metrics.set("paused_monitors", sum(summary.paused for summary in aggregator.environments.values()))
+        self.metrics.set("group_state_failures", self.group_loader.failures)
+        try:
+            self.metrics.write(self.metrics_path)
+            print(f"📈 Metrics written to {self.metrics_path}")
+        except OSError as e:
+            print(f"⚠️  Could not write metrics to {self.metrics_path}: {e}", file=sys.stderr)
+
+    def run_forever(self, interval: float, jitter: float, stop_event: threading.Event) -> int:
+        """
+        Mode daemon: exécute run() toutes les `interval` secondes (± jitter) jusqu'à stop_event
+        Le client HTTP et le cache restent chauds entre deux cycles
+        """
+        cycle = 0
+        last_code = 0
+        while not stop_event.is_set():
+            cycle += 1
+            start = time.monotonic()
+            try:
+                last_code = self.run()
+            except Exception as e:
+                # Un cycle en échec ne doit pas arrêter le daemon
+                print(f"💥 Cycle {cycle} failed: {e}", file=sys.stderr)
+                last_code = 1
+            elapsed = time.monotonic() - start
+
+            delay = max(0.0, interval + random.uniform(-jitter, jitter) - elapsed)
+            print(f"\n⏱️  Cycle {cycle} finished in {elapsed:.2f}s (exit code {last_code}), next run in {delay:.0f}s")
+            stop_event.wait(delay)
+
+        print("👋 Daemon stopped")
+        return last_code
+
+    def close(self):
+        """Ferme les connexions HTTP du client et le cache des monitors"""
+        self.group_loader.close()
+        self.http.close()
+        if self.monitor_cache:
+            self.monitor_cache.close()
+
+    def _process_environment(self, environment: str, summary: EnvironmentSummary) -> Optional[Tuple[Dict[str, Any], Optional[Callable[[], None]]]]:
+        """Prépare le message d'un environnement: (message, callback après envoi) ou None si rien à envoyer"""
         print(f"\n--- Processing {environment.upper()} ---")
 
-        if not all_monitors:
+        if not summary.total:
             print(f"   ⚠️  No monitors found")
-            return True
+            return None
 
         # Statistiques
-        statistics = self.calculate_statistics(all_monitors, active_alerts)
-        print(f"   📈 Stats: {statistics['operational']} OK | {statistics['down']} Down")
+        statistics = self.calculate_statistics(summary)
+        print(f"   📈 Stats: {statistics['operational']} OK | {statistics['down']} Down | {statistics['paused']} Paused")
+
+        # Alertes par service (déjà groupées lors de l'agrégation)
+        for category, alerts in summary.by_service.items():
+            print(f"      • {category}: {len(alerts)} alerts")
+
+        if self.notify_mode == "delta":
+            return self._prepare_delta(environment, statistics, summary)
+
+        # Formatter
+        return self.format_slack_message(statistics, summary, environment), None
 
-        # Grouper par service
-        grouped_alerts = self.group_by_service(active_alerts)
-        if grouped_alerts:
-            for category, alerts in grouped_alerts.items():
-                print(f"      • {category}: {len(alerts)} alerts")
+    def _prepare_delta(self, environment: str, statistics: Dict[str, Any],
+                       summary: EnvironmentSummary) -> Optional[Tuple[Dict[str, Any], Optional[Callable[[], None]]]]:
+        """Prépare uniquement les changements depuis le dernier run (ou le digest complet s'il est dû)"""
+        current = self._alert_snapshot(summary.alerts)
+        digest = self.alert_state.digest_due(environment, self.digest_interval)
 
-        # Formatter et envoyer
-        slack_message = self.format_slack_message(statistics, grouped_alerts, environment)
-        print(f"   📤 Sending to Slack...")
-        return self.send_to_slack(slack_message, environment)
+        if digest:
+            print("   📋 Full digest due")
+            slack_message = self.format_slack_message(statistics, summary, environment)
+        else:
+            changes = diff_alerts(self.alert_state.previous_alerts(environment), current)
+            if not any(changes.values()):
+                print("   💤 No alert changes since last run, skipping Slack")
+                self.alert_state.record(environment, current)
+                return None
+            print(
+                f"   🔔 Changes: {len(changes['new'])} new, {len(changes['resolved'])} resolved, "
+                f"{len(changes['changed'])} changed"
+            )
+            slack_message = self.format_delta_message(statistics, changes, environment)
+
+        message_hash = payload_hash(slack_message)
+        if self.alert_state.is_duplicate(environment, message_hash):
+            print("   💤 Payload unchanged since last message, skipping Slack")
+            self.alert_state.record(environment, current, digest=digest)
+            return None
+
+        # État enregistré seulement si l'envoi réussit: sinon les changements seront renvoyés au prochain run
+        return slack_message, lambda: self.alert_state.record(environment, current, message_hash, digest=digest)
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Datadog alert summary to Slack")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Keep running and send a summary every DAEMON_INTERVAL seconds")
+    args = parser.parse_args()
+
     try:
         summary = DatadogAlertSummary()
-        sys.exit(summary.run())
+        try:
+            if args.daemon:
+                stop_event = threading.Event()
+
+                def _stop(signum, frame):
+                    print(f"\n🛑 Received signal {signum}, stopping after current cycle...")
+                    stop_event.set()
+
+                signal.signal(signal.SIGTERM, _stop)
+                signal.signal(signal.SIGINT, _stop)
+                exit_code = summary.run_forever(
+                    interval=float(os.getenv("DAEMON_INTERVAL", "3600")),
+                    jitter=float(os.getenv("DAEMON_JITTER", "30")),
+                    stop_event=stop_event
+                )
+            else:
+                exit_code = summary.run()
+        finally:
+            summary.close()
+        sys.exit(exit_code)
     except Exception as e:
         print(f"💥 Fatal error: {e}", file=sys.stderr)
         import traceback
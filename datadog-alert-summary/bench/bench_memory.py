@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Empreinte mémoire par monitor: dicts JSON (avant) vs MonitorRecord (après)
+Chaque monitor de l'inventaire synthétique est décodé depuis son JSON (chaînes fraîches comme
+à la lecture du réseau), puis conservé sous chaque représentation; tracemalloc mesure ce qui reste alloué
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from corpus import generate  # noqa: E402
+from json_stream import SEARCH_FIELDS  # noqa: E402
+from models import ACTIVE_STATUSES, MonitorRecord  # noqa: E402
+
+
+def pipeline_dict(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Représentation d'avant: champs utiles du monitor + group_states en liste de dicts"""
+    monitor = {field: data[field] for field in SEARCH_FIELDS if field in data}
+    groups = data.get("state", {}).get("groups", {})
+    if monitor.get("status") in ACTIVE_STATUSES:
+        monitor["group_states"] = [
+            {"name": name, "status": group["status"], "last_nodata_ts": group.get("last_nodata_ts")}
+            for name, group in groups.items()
+            if group.get("status") in ACTIVE_STATUSES
+        ]
+    return monitor
+
+
+def measure(payloads: List[bytes], build: Callable[[Dict[str, Any]], Any]) -> Tuple[int, float]:
+    """Octets encore alloués après avoir construit et gardé un objet par monitor, et durée"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    kept = [build(json.loads(payload)) for payload in payloads]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del kept
+    return used, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--monitors", type=int, default=20000)
+    parser.add_argument("--alert-ratio", type=float, default=0.1)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = generate(args.monitors, args.alert_ratio, args.groups, seed=args.seed)
+    payloads = [json.dumps(monitor).encode("utf-8") for monitor in corpus]
+    del corpus
+
+    variants = [
+        ("raw API dict", lambda data: data),
+        ("dict, used fields (before)", pipeline_dict),
+        ("MonitorRecord (after)", MonitorRecord.from_api),
+    ]
+    results = [(label, *measure(payloads, build)) for label, build in variants]
+
+    print(f"{args.monitors} monitors, alert ratio {args.alert_ratio}, {args.groups} groups per multi-alert monitor")
+    before = results[1][1]
+    for label, used, elapsed in results:
+        print(
+            f"   {label:28} {used / args.monitors:8.0f} B/monitor  {used / 1024 / 1024:7.1f} MB  "
+            f"x{before / used:4.1f} vs before  built in {elapsed:.2f}s"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
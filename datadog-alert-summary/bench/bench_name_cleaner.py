@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du nettoyage des noms de monitors
+Compare l'implémentation d'origine (regex non compilées, 5 passes) à NameCleaner
+sur des noms synthétiques, à froid puis avec le cache chaud, et vérifie que les sorties sont identiques
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from name_cleaner import NameCleaner  # noqa: E402
+
+
+def reference_clean(name: str, status: str) -> str:
+    """Implémentation d'origine de DatadogAlertSummary._clean_monitor_name"""
+    if "{{#is_alert}}" in name:
+        if status in ["Alert", "No Data"]:
+            match = re.search(r'\{\{#is_alert\}\}(.*?)\{\{/is_alert\}\}', name, re.DOTALL)
+            if match:
+                name = match.group(1)
+        elif status == "Warn":
+            match_warn = re.search(r'\{\{#is_warning\}\}(.*?)\{\{/is_warning\}\}', name, re.DOTALL)
+            if match_warn:
+                name = match_warn.group(1)
+            else:
+                match = re.search(r'\{\{#is_alert\}\}(.*?)\{\{/is_alert\}\}', name, re.DOTALL)
+                if match:
+                    name = match.group(1)
+
+    name = re.sub(r'\{\{[^}]+\}\}', '', name)
+    name = re.sub(r'\s*-\s*-\s*', ' - ', name)
+    name = re.sub(r'\s+-\s+', ' - ', name)
+    name = re.sub(r'\s+', ' ', name)
+    name = re.sub(r'\s*-\s*$', '', name)
+    name = re.sub(r'^\s*-\s*', '', name)
+    return name.strip()
+
+
+def synthetic_names(count: int, distinct: int, seed: int):
+    """Génère `count` couples (nom, statut) tirés de `distinct` templates"""
+    rng = random.Random(seed)
+    services = ["Redis", "Postgres", "RabbitMQ", "Pod", "Node", "Disk", "API"]
+    pieces = [" ", "  ", " - ", "-", " -- ", "\t", "\n", "{{value}}", "{{threshold}}", "{{pod_name.name}}", "%", "(", ")"]
+    templates = []
+    for i in range(distinct):
+        body = f"{rng.choice(services)} {i}" + "".join(rng.choice(pieces) for _ in range(rng.randint(2, 8)))
+        prefix = rng.choice(["", "- ", "PROD - ", "[PREPROD] "])
+        kind = rng.random()
+        if kind < 0.5:
+            name = f"{{{{#is_alert}}}}{prefix}{body}{{{{/is_alert}}}}{{{{#is_warning}}}}{body} warn{{{{/is_warning}}}}"
+        elif kind < 0.7:
+            name = f"{{{{#is_alert}}}}{prefix}{body}{{{{/is_alert}}}}"
+        else:
+            name = f"{prefix}{body}{rng.choice(['', ' -', ' - {{value}}'])}"
+        templates.append(name)
+    statuses = ["Alert", "Warn", "No Data", "OK"]
+    return [(rng.choice(templates), rng.choice(statuses)) for _ in range(count)]
+
+
+def timed(fn, names):
+    start = time.perf_counter()
+    results = [fn(name, status) for name, status in names]
+    return results, time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--names", type=int, default=10000, help="Number of names per pass")
+    parser.add_argument("--distinct", type=int, default=2000, help="Distinct name templates")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    names = synthetic_names(args.names, args.distinct, args.seed)
+    cleaner = NameCleaner()
+
+    reference, t_reference = timed(reference_clean, names)
+    uncached, t_uncached = timed(NameCleaner._clean, names)
+    cold, t_cold = timed(cleaner.clean, names)
+    warm, t_warm = timed(cleaner.clean, names)
+
+    mismatches = [(n, s, r, c) for (n, s), r, c in zip(names, reference, uncached) if r != c]
+    if mismatches or reference != cold or reference != warm:
+        print(f"❌ {len(mismatches)} outputs differ from the reference implementation")
+        for name, status, expected, got in mismatches[:5]:
+            print(f"   {status!r} {name!r}: expected {expected!r}, got {got!r}")
+        return 1
+
+    print(f"{args.names} names ({args.distinct} distinct templates), outputs identical")
+    for label, elapsed in [
+        ("reference (5 passes, no cache)", t_reference),
+        ("compiled (no cache)", t_uncached),
+        ("compiled + LRU (cold)", t_cold),
+        ("compiled + LRU (warm)", t_warm),
+    ]:
+        print(f"   {label:32} {elapsed * 1000:8.1f} ms  {args.names / elapsed:12,.0f} names/s  x{t_reference / elapsed:.1f}")
+    print(f"   cache: {cleaner.cache_info()}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout de DatadogAlertSummary.run() contre le stub local (stub_server.py)
+Le stub tourne dans un sous-processus (le pic RSS mesuré est celui du script seul). Pour chaque run:
+temps total, requêtes et 429 vus par le stub, octets échangés, messages Slack et pic RSS
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+
+def _stub_call(base_url: str, path: str, method: str = "GET") -> Dict[str, Any]:
+    request = urllib.request.Request(f"{base_url}{path}", method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request) as response:
+        return json.load(response)
+
+
+def start_stub_process(args: argparse.Namespace) -> subprocess.Popen:
+    """Lance stub_server.py sur un port libre; son URL est la première ligne de sa sortie"""
+    command = [
+        sys.executable, os.path.join(BENCH_DIR, "stub_server.py"), "--port", "0",
+        "--monitors", str(args.monitors), "--alert-ratio", str(args.alert_ratio),
+        "--groups", str(args.groups), "--seed", str(args.seed),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--throttle-ratio", str(args.throttle_ratio),
+        "--rate-limit", str(args.rate_limit), "--rate-period", str(args.rate_period),
+    ]
+    if args.corpus:
+        command += ["--corpus", args.corpus]
+    return subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss est en Ko sous Linux, en octets sous macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--monitors", type=int, default=2000)
+    parser.add_argument("--alert-ratio", type=float, default=0.1)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--corpus", help="JSON file from corpus.py instead of a generated inventory")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--throttle-ratio", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Stub rate limit per endpoint and period")
+    parser.add_argument("--rate-period", type=float, default=10.0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--json", help="Write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the script output")
+    args = parser.parse_args()
+    json_path = os.path.abspath(args.json) if args.json else None
+
+    stub = start_stub_process(args)
+    workdir = tempfile.mkdtemp(prefix="alert-summary-bench-")
+    try:
+        base_url = stub.stdout.readline().strip()
+        if not base_url:
+            print("❌ Stub failed to start", file=sys.stderr)
+            return 1
+
+        # Configuration du script: valeurs du shell conservées (FETCH_STRATEGY, ENRICH_WORKERS...)
+        os.environ.update({
+            "DATADOG_API_KEY": "bench",
+            "DATADOG_APP_KEY": "bench",
+            "DATADOG_API_URL": base_url,
+            "SLACK_WEBHOOK_PROD": f"{base_url}/slack/prod",
+            "SLACK_WEBHOOK_PREPROD": f"{base_url}/slack/preprod",
+        })
+        os.environ.setdefault("MONITOR_CACHE_PATH", os.path.join(workdir, "monitor_cache.db"))
+        os.environ.setdefault("ALERT_STATE_PATH", os.path.join(workdir, "alert_state.json"))
+        # Les messages en erreur sont écrits dans le répertoire courant
+        os.chdir(workdir)
+
+        import alert_summary
+
+        baseline_rss = peak_rss_mb()
+        summary = alert_summary.DatadogAlertSummary()
+        results = []
+        try:
+            for run in range(1, args.runs + 1):
+                _stub_call(base_url, "/_reset", "POST")
+                with contextlib.ExitStack() as stack:
+                    if not args.verbose:
+                        output = io.StringIO()
+                        stack.enter_context(contextlib.redirect_stdout(output))
+                        stack.enter_context(contextlib.redirect_stderr(output))
+                    start = time.perf_counter()
+                    code = summary.run()
+                    wall = time.perf_counter() - start
+                stats = _stub_call(base_url, "/_stats")
+                results.append({
+                    "run": run,
+                    "exit_code": code,
+                    "wall_s": wall,
+                    "requests": stats["total_requests"],
+                    "throttled": stats["total_throttled"],
+                    "requests_by_endpoint": stats["requests"],
+                    "bytes_in": stats["bytes_in"],
+                    "bytes_out": stats["bytes_out"],
+                    "slack_messages": len(stats["slack_messages"]),
+                    "peak_rss_mb": peak_rss_mb(),
+                })
+        finally:
+            summary.close()
+    finally:
+        stub.terminate()
+        stub.wait()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(
+        f"{args.monitors} monitors, alert ratio {args.alert_ratio}, {args.groups} groups, "
+        f"latency {args.latency * 1000:.0f}ms, throttle {args.throttle_ratio:.0%}, baseline RSS {baseline_rss:.1f} MB"
+    )
+    print(f"   {'run':>3} {'exit':>4} {'wall':>8} {'requests':>8} {'429':>5} {'sent':>9} {'received':>10} {'slack':>5} {'peak RSS':>9}")
+    for r in results:
+        print(
+            f"   {r['run']:>3} {r['exit_code']:>4} {r['wall_s']:>7.2f}s {r['requests']:>8} {r['throttled']:>5} "
+            f"{r['bytes_in'] / 1024:>7.1f}KB {r['bytes_out'] / 1024:>8.1f}KB {r['slack_messages']:>5} "
+            f"{r['peak_rss_mb']:>6.1f} MB"
+        )
+    for endpoint, count in sorted(results[-1]["requests_by_endpoint"].items()):
+        print(f"   last run: {endpoint}: {count} requests")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"config": vars(args), "baseline_rss_mb": baseline_rss, "runs": results}, f, indent=2)
+    return 0 if all(r["exit_code"] == 0 for r in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
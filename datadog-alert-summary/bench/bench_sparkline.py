@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark des sparklines
+Réduit des séries synthétiques (timestamp ms, valeur) avec le bucketer min/max, puis mesure
+render_many (découpe de la fenêtre, réduction et rendu) sous budget CPU
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import sparkline  # noqa: E402
+
+
+def synthetic_series(count: int, points: int, seed: int):
+    """`count` séries de `points` points à une seconde d'intervalle, avec quelques pics"""
+    rng = random.Random(seed)
+    end = 1_700_000_000_000
+    series = []
+    for _ in range(count):
+        level, period = rng.uniform(10, 100), rng.uniform(300, 3600)
+        values = [level * (1 + 0.2 * math.sin(i / period * 2 * math.pi)) + rng.gauss(0, level * 0.02) for i in range(points)]
+        for _ in range(3):
+            values[rng.randrange(points)] *= 2
+        series.append([(end - (points - i) * 1000.0, value) for i, value in enumerate(values)])
+    return series, end
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--series", type=int, default=500, help="Number of series")
+    parser.add_argument("--points", type=int, default=3600, help="Points per series")
+    parser.add_argument("--width", type=int, default=20, help="Points per sparkline")
+    parser.add_argument("--budget", type=float, default=0.5, help="CPU budget of render_many in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    series, end = synthetic_series(args.series, args.points, args.seed)
+    values = [[value for _, value in points] for points in series]
+    total = args.series * args.points
+
+    start = time.thread_time()
+    sparkline.downsample(values, args.width, "max")
+    elapsed = time.thread_time() - start
+
+    print(f"{args.series} series x {args.points} points ({total:,} points) -> {args.width} points each")
+    print(f"   downsample       {elapsed * 1000:8.1f} ms CPU  {total / max(elapsed, 1e-9):14,.0f} points/s")
+
+    entries = [(index, points, "max") for index, points in enumerate(series)]
+    start = time.thread_time()
+    rendered, skipped = sparkline.render_many(entries, end - 3600 * 1000, args.width, args.budget)
+    elapsed = time.thread_time() - start
+    print(
+        f"   render_many (budget {args.budget:.2f}s): {len(rendered)} rendered, "
+        f"{skipped} skipped, {elapsed * 1000:.1f} ms CPU"
+    )
+    if rendered:
+        print(f"   e.g. {rendered[next(iter(rendered))]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
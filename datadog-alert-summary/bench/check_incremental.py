@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Vérification du mode incrémental contre le flux d'événements du stub (stub_server.py)
+Après une resynchronisation complète, chaque round fait changer des groupes de statut dans le stub
+(et crée des monitors), puis compare l'agrégat obtenu en appliquant les événements à celui d'une
+récupération complète (bulk): totaux et statuts par environnement, statut et groupes actifs de chaque
+alerte. Le dernier round vieillit le curseur pour vérifier le retour à la récupération complète
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import generate  # noqa: E402
+from stub_server import StubState, start_stub  # noqa: E402
+
+
+def snapshot(aggregator) -> Tuple[Dict[str, Any], Dict[int, Tuple[Any, ...]]]:
+    """(totaux et statuts par environnement, alerte -> (statut, groupes actifs ou None si non chargés))"""
+    environments = {
+        name: (summary.total, dict(summary.status_counts))
+        for name, summary in aggregator.environments.items()
+    }
+    alerts = {
+        monitor.id: (
+            monitor.status.value,
+            None if monitor.group_count is None
+            else frozenset((group.name, group.status.value) for group in monitor.group_states)
+        )
+        for monitor in aggregator.alerts()
+    }
+    return environments, alerts
+
+
+def compare(label: str, incremental, reference) -> int:
+    """Nombre de différences entre les deux snapshots (détail des premières)"""
+    inc_envs, inc_alerts = incremental
+    ref_envs, ref_alerts = reference
+    errors = []
+    for name in ref_envs:
+        if inc_envs.get(name) != ref_envs[name]:
+            errors.append(f"{name}: {inc_envs.get(name)} != {ref_envs[name]}")
+    for monitor_id in sorted(set(inc_alerts) | set(ref_alerts)):
+        inc, ref = inc_alerts.get(monitor_id), ref_alerts.get(monitor_id)
+        if inc is None or ref is None or inc[0] != ref[0] or (inc[1] is not None and inc[1] != ref[1]):
+            errors.append(f"monitor {monitor_id}: {inc} != {ref}")
+    lazy = sum(1 for alert in inc_alerts.values() if alert[1] is None)
+    status = "✅" if not errors else "❌"
+    print(f"   {status} {label}: {len(inc_alerts)} alerts, {len(errors)} differences, {lazy} with groups left to lazy loading")
+    for error in errors[:5]:
+        print(f"      {error}")
+    return len(errors)
+
+
+def quiet():
+    stack = contextlib.ExitStack()
+    stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+    stack.enter_context(contextlib.redirect_stderr(io.StringIO()))
+    return stack
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--monitors", type=int, default=3000)
+    parser.add_argument("--alert-ratio", type=float, default=0.1)
+    parser.add_argument("--groups", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub latency per request (s)")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--transitions", type=int, default=300, help="Group transitions per round")
+    parser.add_argument("--new-ratio", type=float, default=0.02, help="Share of transitions on new monitors")
+    parser.add_argument("--strategy", choices=("bulk", "search"), default="bulk",
+                        help="Fetch strategy of the incremental script's full resyncs")
+    args = parser.parse_args()
+
+    state = StubState(generate(args.monitors, args.alert_ratio, args.groups, seed=args.seed), args.latency, seed=args.seed)
+    server = start_stub(state)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    workdir = tempfile.mkdtemp(prefix="alert-summary-incremental-")
+    os.environ.update({
+        "DATADOG_API_KEY": "check",
+        "DATADOG_APP_KEY": "check",
+        "DATADOG_API_URL": base_url,
+        "SLACK_WEBHOOK_PROD": f"{base_url}/slack/prod",
+        "SLACK_WEBHOOK_PREPROD": f"{base_url}/slack/preprod",
+        "MONITOR_CACHE_PATH": "",
+        "METRIC_VALUES": "false",
+        "INCREMENTAL": "true",
+        "MONITOR_STATE_PATH": os.path.join(workdir, "monitor_state.json"),
+        "FETCH_STRATEGY": args.strategy,
+    })
+
+    import alert_summary
+
+    incremental = alert_summary.DatadogAlertSummary()
+    os.environ.update({"INCREMENTAL": "false", "FETCH_STRATEGY": "bulk"})
+    reference = alert_summary.DatadogAlertSummary()
+    # Tous les groupes actifs des deux côtés: la comparaison porte sur les ensembles complets
+    incremental.group_limit = reference.group_limit = reference.fetch_group_limit = None
+
+    def collect(summary) -> Tuple[Any, Dict[str, Any], float]:
+        state.reset()
+        start = time.perf_counter()
+        with quiet():
+            aggregator = summary.collect()
+        elapsed = time.perf_counter() - start
+        stats = state.stats()
+        return aggregator, stats, elapsed
+
+    errors = 0
+    try:
+        aggregator, stats, elapsed = collect(incremental)
+        incremental.monitor_state.save()
+        print(
+            f"Initial {args.strategy} resync: {aggregator.total} monitors, {stats['total_requests']} requests, "
+            f"{stats['bytes_out'] / 1024:.0f} KiB, {elapsed:.2f}s"
+        )
+
+        for round_number in range(1, args.rounds + 2):
+            state.transition(args.transitions, args.new_ratio)
+            last = round_number == args.rounds + 1
+            if last:
+                # Curseur plus ancien que INCREMENTAL_MAX_GAP: récupération complète attendue
+                incremental.monitor_state.cursor -= int((incremental.max_event_gap + 60) * 1000)
+
+            aggregator, inc_stats, inc_elapsed = collect(incremental)
+            incremental.monitor_state.save()
+            full_resync = incremental.metrics.gauges.get("full_resync")
+            reference_aggregator, ref_stats, ref_elapsed = collect(reference)
+
+            label = "stale cursor" if last else f"round {round_number}"
+            mode = "full resync" if full_resync else f"{incremental.metrics.gauges.get('monitor_events', 0):.0f} events"
+            print(
+                f"{label}: {mode}, {inc_stats['total_requests']} requests, {inc_stats['bytes_out'] / 1024:.0f} KiB "
+                f"in {inc_elapsed:.2f}s (full fetch: {ref_stats['total_requests']} requests, "
+                f"{ref_stats['bytes_out'] / 1024:.0f} KiB in {ref_elapsed:.2f}s)"
+            )
+            errors += compare(label, snapshot(aggregator), snapshot(reference_aggregator))
+            if last and not full_resync:
+                print("   ❌ stale cursor did not trigger a full resync")
+                errors += 1
+    finally:
+        incremental.close()
+        reference.close()
+        server.shutdown()
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Vérification du parsing JSON en flux (json_stream.py) aux frontières de morceaux
+Chaque document de référence (réponses search, bulk et état des groupes de l'inventaire synthétique,
+plus un document de cas limites: nombres à exposant, échappements, UTF-8 multi-octets) est coupé
+en deux à chaque octet, puis lu octet par octet: le résultat doit être celui de json.loads
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, ".."))
+
+from corpus import generate  # noqa: E402
+from json_stream import BULK_FIELDS, SEARCH_FIELDS, iter_json_items, iter_json_members  # noqa: E402
+
+# Document de cas limites, en texte brut pour garder l'écriture des nombres (json.dumps la normalise):
+# nombres coupables après ".", "e", "E" ou un signe, chaînes échappées, UTF-8 multi-octets
+EDGE_CASES = """{
+  "total": 1.5e3, "ratio": -0.000125E-2, "big": 12345678901234567890,
+  "exponents": [1e-7, 2.5E+10, -3e5, 0, -0, 10, 1.0, 6.02e23],
+  "monitors": [
+    {"id": 1.25e2, "name": "Disk \\"sdb\\" à 95% — ⚠️", "tags": ["env:prod", "\\u00e9\\\\"], "modified": null},
+    {"id": 7, "status": "OK", "query": "avg:a{b} > 1e3", "metrics": [true, false, null, -12.5e-3]},
+    [], {}, "🔥", -1, 3.25e+1
+  ],
+  "metadata": {"page": 0, "per_page": 1E2}
+}"""
+
+
+def splits(payload: bytes) -> Iterable[Tuple[str, List[bytes]]]:
+    """Découpages du document: en deux à chaque octet, puis octet par octet"""
+    for offset in range(len(payload) + 1):
+        yield f"split at {offset}", [payload[:offset], payload[offset:]]
+    yield "byte by byte", [payload[index:index + 1] for index in range(len(payload))]
+
+
+def select(item: Any, fields: Tuple[str, ...]) -> Any:
+    if not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def read_items(key: str, fields: Tuple[str, ...]) -> Callable[[List[bytes]], Any]:
+    def read(chunks: List[bytes]) -> Any:
+        rest: Dict[str, Any] = {}
+        items = list(iter_json_items(iter(chunks), key, fields, rest))
+        return items, rest
+    return read
+
+
+def expected_items(document: Any, key: str, fields: Tuple[str, ...]) -> Any:
+    if key is None:
+        return [select(item, fields) for item in document], {}
+    items = [select(item, fields) for item in document[key]]
+    return items, {name: value for name, value in document.items() if name != key}
+
+
+def check(label: str, payload: bytes, read: Callable[[List[bytes]], Any], expected: Any) -> int:
+    """Nombre de découpages dont le résultat diffère de json.loads (détail des premiers)"""
+    errors = []
+    for split_label, chunks in splits(payload):
+        try:
+            result = read(chunks)
+        except ValueError as e:
+            result = f"ValueError: {e}"
+        # repr: distingue 1 de 1.0 et -0 de -0.0
+        if repr(result) != repr(expected):
+            errors.append(f"{split_label}: {str(result)[:120]}")
+    status = "✅" if not errors else "❌"
+    print(f"   {status} {label}: {len(payload)} bytes, {len(payload) + 2} splits, {len(errors)} differences")
+    for error in errors[:5]:
+        print(f"      {error}")
+    return len(errors)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--monitors", type=int, default=6, help="Monitors in the search and bulk documents")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    corpus = generate(monitors=args.monitors, alert_ratio=0.5, groups=3, seed=args.seed)
+    search = {"monitors": corpus, "metadata": {"page": 0, "page_count": 1, "per_page": 100, "total_count": len(corpus)}}
+    group_state = corpus[0]
+
+    errors = 0
+    for label, text, key, fields in (
+        ("search", json.dumps(search, ensure_ascii=False), "monitors", SEARCH_FIELDS),
+        ("bulk", json.dumps(corpus, ensure_ascii=False), None, BULK_FIELDS),
+        ("edge cases", EDGE_CASES, "monitors", SEARCH_FIELDS),
+    ):
+        payload = text.encode("utf-8")
+        document = json.loads(payload)
+        errors += check(label, payload, read_items(key, fields), expected_items(document, key, fields))
+
+    payload = json.dumps(group_state, ensure_ascii=False).encode("utf-8")
+    expected = list(json.loads(payload).get("state", {}).get("groups", {}).items())
+    errors += check(
+        "group states", payload,
+        lambda chunks: list(iter_json_members(iter(chunks), ("state", "groups"))), expected
+    )
+
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
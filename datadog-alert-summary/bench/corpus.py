@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Générateur d'un inventaire synthétique de monitors Datadog
+Nombre de monitors, proportion d'alertes, groupes par monitor et templates de noms
+({{#is_alert}}, {{#is_warning}}, variables) configurables, reproductible via la seed
+"""
+
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, List, Sequence
+
+
+# (service tag, métrique, libellé) des monitors générés
+SERVICES = [
+    ("redis", "redis.mem.used", "Redis memory"),
+    ("postgres", "postgresql.connections", "Postgres connections"),
+    ("kubernetes", "kubernetes.cpu.usage.total", "Pod CPU"),
+    ("all", "system.disk.in_use", "Disk usage"),
+    ("api", "trace.http.request.errors", "API error rate"),
+    ("rabbitmq", "rabbitmq.queue.messages", "RabbitMQ queue depth"),
+]
+
+GROUP_KEYS = ["pod_name", "host", "kube_namespace", "queue"]
+
+NAME_TEMPLATES = [
+    "{{{{#is_alert}}}}{env} - {label} above {{{{threshold}}}} on {{{{{group}.name}}}}{{{{/is_alert}}}}"
+    "{{{{#is_warning}}}}{env} - {label} close to {{{{warn_threshold}}}}{{{{/is_warning}}}}",
+    "{{{{#is_alert}}}}[{env}] {label} is {{{{value}}}}{{{{/is_alert}}}}",
+    "{label} - {env} -- {{{{value}}}}",
+    "{label} ({env})",
+]
+
+# Répartition des statuts actifs
+ACTIVE_WEIGHTS = [("Alert", 0.6), ("Warn", 0.25), ("No Data", 0.15)]
+
+
+def _active_status(rng: random.Random) -> str:
+    roll = rng.random()
+    for status, weight in ACTIVE_WEIGHTS:
+        if roll < weight:
+            return status
+        roll -= weight
+    return ACTIVE_WEIGHTS[-1][0]
+
+
+def generate(monitors: int = 2000, alert_ratio: float = 0.1, groups: int = 8, multi_ratio: float = 0.5,
+             environments: Sequence[str] = ("prod", "preprod"), seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Génère `monitors` monitors au format de l'API (champs search + state.groups des API par id/bulk)
+    alert_ratio: part des monitors en Alert/Warn/No Data; multi_ratio: part des monitors "by {...}"
+    qui ont `groups` groupes (les autres en ont un seul)
+    """
+    rng = random.Random(seed)
+    base_ts = 1_700_000_000
+    corpus = []
+
+    for index in range(monitors):
+        env = rng.choice(environments)
+        service, metric, label = rng.choice(SERVICES)
+        multi = rng.random() < multi_ratio
+        group_key = rng.choice(GROUP_KEYS)
+        status = _active_status(rng) if rng.random() < alert_ratio else "OK"
+
+        scope = f"env:{env}"
+        query = f"avg(last_5m):avg:{metric}{{{scope}}}"
+        if multi:
+            query = f"avg(last_5m):avg:{metric}{{{scope}}} by {{{group_key}}}"
+        query += f" > {rng.choice([80, 90, 95, 1000])}"
+
+        # Groupes: au moins un groupe dans le statut du monitor quand il est actif
+        group_states = {}
+        group_count = groups if multi else 1
+        for g in range(group_count):
+            name = f"{group_key}:{service}-{g}" if multi else "*"
+            if status != "OK" and (g == 0 or rng.random() < 0.3):
+                group_status = status
+            else:
+                group_status = "OK"
+            group_states[name] = {
+                "status": group_status,
+                "last_triggered_ts": base_ts + rng.randint(0, 86_400) if group_status != "OK" else None,
+                "last_nodata_ts": base_ts + rng.randint(0, 86_400) if group_status == "No Data" else None,
+            }
+
+        template = rng.choice(NAME_TEMPLATES)
+        corpus.append({
+            "id": 1_000_000 + index,
+            "name": template.format(env=env.upper(), label=label, group=group_key),
+            "type": "query alert" if service == "api" else "metric alert",
+            "status": status,
+            "overall_state": status,
+            "tags": [f"env:{env}", f"service:{service}", "team:platform"],
+            "scopes": [scope],
+            "query": query,
+            "metrics": [metric],
+            "modified": f"2025-01-{1 + index % 28:02d}T00:00:00+00:00",
+            "last_triggered_ts": base_ts + rng.randint(0, 86_400) if status != "OK" else None,
+            "state": {"groups": group_states},
+        })
+
+    return corpus
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--monitors", type=int, default=2000)
+    parser.add_argument("--alert-ratio", type=float, default=0.1)
+    parser.add_argument("--groups", type=int, default=8, help="Groups per multi-alert monitor")
+    parser.add_argument("--multi-ratio", type=float, default=0.5, help="Share of 'by {...}' monitors")
+    parser.add_argument("--environments", default="prod,preprod")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args()
+
+    corpus = generate(args.monitors, args.alert_ratio, args.groups, args.multi_ratio,
+                      args.environments.split(","), args.seed)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(corpus, f)
+        print(f"{len(corpus)} monitors written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(corpus, sys.stdout)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
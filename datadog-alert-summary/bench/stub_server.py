@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Stub HTTP local de l'API Datadog et des webhooks Slack pour les benchmarks
+Sert /api/v1/monitor/search, /api/v1/monitor/{id}, /api/v1/monitor (bulk), /api/v1/query, /api/v2/events,
+/api/v1/downtime et POST /slack/<canal> à partir d'un inventaire synthétique (corpus.py), avec latence et 429 injectables et
+des en-têtes X-RateLimit-* par endpoint. GET /_stats renvoie les compteurs (requêtes, octets), POST /_reset
+les remet à zéro, POST /_transitions?count=N&new=R change le statut de N groupes (et crée une part R de
+nouveaux monitors) en publiant un événement par transition
+"""
+
+import argparse
+import copy
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import generate  # noqa: E402
+
+
+_MONITOR_ID = re.compile(r"^/api/v1/monitor/(\d+)$")
+_ENV_TERM = re.compile(r"env:([\w-]+)")
+# avg(last_5m):<expression> > 80 (forme des queries générées par corpus.py)
+_MONITOR_QUERY = re.compile(r"^\w+\([^)]*\):(?P<expression>.*?)\s*[<>]=?\s*(?P<threshold>[\d.]+)$")
+
+# Niveau des séries servies par /api/v1/query, relatif au seuil du monitor, selon le statut du groupe
+SERIES_LEVELS = {"Alert": 1.25, "Warn": 0.95, "OK": 0.6}
+
+# Gravité des statuts de groupe: le statut d'un monitor est celui de son groupe le plus grave
+STATUS_SEVERITY = {"OK": 0, "No Data": 1, "Warn": 2, "Alert": 3}
+# Statut des événements de monitor (champ status de /api/v2/events)
+EVENT_STATUSES = {"OK": "ok", "No Data": "warn", "Warn": "warn", "Alert": "error"}
+
+# Champs renvoyés par l'API search (sans state ni overall_state)
+SEARCH_FIELDS = ("id", "name", "type", "status", "tags", "scopes", "query", "metrics", "modified", "last_triggered_ts")
+
+
+class StubState:
+    """Inventaire servi, comportement injecté et compteurs du stub"""
+
+    def __init__(self, monitors: List[Dict[str, Any]], latency: float = 0.0, jitter: float = 0.0,
+                 throttle_ratio: float = 0.0, rate_limit: int = 0, rate_period: float = 10.0, seed: int = 0,
+                 point_interval: float = 60.0, downtime_ratio: float = 0.0):
+        self.monitors = monitors
+        self.by_id = {monitor["id"]: monitor for monitor in monitors}
+        # expression métrique -> [(monitor, seuil)] pour /api/v1/query
+        self.by_expression: Dict[str, List[Tuple[Dict[str, Any], float]]] = {}
+        for monitor in monitors:
+            match = _MONITOR_QUERY.match(monitor.get("query", ""))
+            if match:
+                self.by_expression.setdefault(match.group("expression"), []).append(
+                    (monitor, float(match.group("threshold")))
+                )
+        self.point_interval = point_interval
+        # Événements de transition servis par /api/v2/events, dans l'ordre chronologique
+        self.events: List[Dict[str, Any]] = []
+        # Downtimes servis par /api/v1/downtime (actifs, planifiés, terminés), sur une part des monitors
+        self.downtimes = _generate_downtimes(monitors, downtime_ratio, seed)
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_ratio = throttle_ratio
+        self.rate_limit = rate_limit
+        self.rate_period = rate_period
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        # endpoint -> (début de fenêtre, requêtes consommées)
+        self.windows: Dict[str, Tuple[float, int]] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests: Counter = Counter()
+            self.throttled: Counter = Counter()
+            self.bytes_in = 0
+            self.bytes_out = 0
+            self.slack_messages: List[Dict[str, Any]] = []
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "requests": dict(self.requests),
+                "throttled": dict(self.throttled),
+                "total_requests": sum(self.requests.values()),
+                "total_throttled": sum(self.throttled.values()),
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "slack_messages": list(self.slack_messages),
+            }
+
+    def delay(self) -> float:
+        with self.lock:
+            return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def take(self, endpoint: str) -> Tuple[bool, Dict[str, str]]:
+        """Compte la requête; retourne (autorisée, en-têtes X-RateLimit)"""
+        with self.lock:
+            self.requests[endpoint] += 1
+            headers = {}
+            allowed = True
+            if self.rate_limit:
+                now = time.monotonic()
+                start, used = self.windows.get(endpoint, (now, 0))
+                if now - start >= self.rate_period:
+                    start, used = now, 0
+                used += 1
+                self.windows[endpoint] = (start, used)
+                allowed = used <= self.rate_limit
+                headers = {
+                    "X-RateLimit-Limit": str(self.rate_limit),
+                    "X-RateLimit-Period": str(int(self.rate_period)),
+                    "X-RateLimit-Remaining": str(max(0, self.rate_limit - used)),
+                    "X-RateLimit-Reset": str(max(1, int(self.rate_period - (now - start) + 0.999))),
+                }
+            if allowed and self.throttle_ratio and self.rng.random() < self.throttle_ratio:
+                allowed = False
+                headers.setdefault("X-RateLimit-Reset", "1")
+            if not allowed:
+                self.throttled[endpoint] += 1
+                headers["Retry-After"] = headers["X-RateLimit-Reset"]
+            return allowed, headers
+
+
+    def _new_monitor(self) -> Dict[str, Any]:
+        """Copie d'un monitor existant sous un nouvel id, tous groupes OK (monitor créé depuis le dernier run)"""
+        monitor = copy.deepcopy(self.rng.choice(self.monitors))
+        monitor["id"] = max(self.by_id) + 1
+        monitor["status"] = monitor["overall_state"] = "OK"
+        for group in monitor["state"]["groups"].values():
+            group.update(status="OK", last_triggered_ts=None, last_nodata_ts=None)
+        self.monitors.append(monitor)
+        self.by_id[monitor["id"]] = monitor
+        match = _MONITOR_QUERY.match(monitor.get("query", ""))
+        if match:
+            self.by_expression.setdefault(match.group("expression"), []).append(
+                (monitor, float(match.group("threshold")))
+            )
+        return monitor
+
+    def transition(self, count: int, new_ratio: float = 0.0) -> None:
+        """Change le statut de `count` groupes tirés au hasard et publie l'événement de chaque transition"""
+        with self.lock:
+            for _ in range(count):
+                monitor = self._new_monitor() if self.rng.random() < new_ratio else self.rng.choice(self.monitors)
+                groups = monitor["state"]["groups"]
+                name = self.rng.choice(list(groups))
+                group = groups[name]
+                before = group["status"]
+                after = self.rng.choice([status for status in STATUS_SEVERITY if status != before])
+                timestamp = time.time()
+                group["status"] = after
+                if after == "No Data":
+                    group["last_nodata_ts"] = int(timestamp)
+                elif after != "OK":
+                    group["last_triggered_ts"] = int(timestamp)
+                status = max((group["status"] for group in groups.values()), key=STATUS_SEVERITY.get)
+                monitor["status"] = monitor["overall_state"] = status
+
+                self.events.append({
+                    "id": str(len(self.events) + 1),
+                    "type": "event",
+                    "attributes": {
+                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(timestamp)),
+                        "tags": monitor["tags"],
+                        "attributes": {
+                            "timestamp": int(timestamp * 1000),
+                            "monitor_id": monitor["id"],
+                            "status": EVENT_STATUSES[after],
+                            "monitor": {
+                                "id": monitor["id"],
+                                "name": monitor["name"],
+                                "groups": [] if name == "*" else name.split(","),
+                                "transition": {"source_state": before, "destination_state": after},
+                            },
+                        },
+                    },
+                })
+
+    def series(self, expression: str, index: int, start: int, end: int) -> List[Dict[str, Any]]:
+        """
+        Séries d'une expression sur [start, end]: un groupe par groupe des monitors qui l'utilisent,
+        au-dessus du seuil quand le groupe est en Alert, en dessous sinon, sans points en No Data
+        """
+        levels: Dict[str, float] = {}
+        for monitor, threshold in self.by_expression.get(expression, []):
+            for name, group in monitor["state"]["groups"].items():
+                factor = SERIES_LEVELS.get(group["status"])
+                if factor is not None:
+                    levels[name] = max(levels.get(name, 0.0), threshold * factor)
+
+        count = max(1, int((end - start) / self.point_interval))
+        series = []
+        for name, level in levels.items():
+            phase = zlib.crc32(name.encode("utf-8")) % 100
+            series.append({
+                "metric": expression,
+                "expression": expression,
+                "query_index": index,
+                "scope": name,
+                "tag_set": [] if name == "*" else name.split(","),
+                # Oscillation calée sur le temps absolu: deux fenêtres qui se recouvrent ont les mêmes points
+                "pointlist": [
+                    [timestamp * 1000, level * (1 + 0.03 * math.sin(timestamp / (5 * 60) + phase))]
+                    for timestamp in (start + i * self.point_interval for i in range(count))
+                ],
+            })
+        return series
+
+
+def _generate_downtimes(monitors: List[Dict[str, Any]], ratio: float, seed: int) -> List[Dict[str, Any]]:
+    """
+    Downtimes au format de /api/v1/downtime sur `ratio` des monitors actifs: sans scope, limités à un
+    groupe, à tous les groupes (joker), planifiés ou terminés, plus un downtime ciblant des tags de monitors
+    """
+    rng = random.Random(seed)
+    now = int(time.time())
+    active = [monitor for monitor in monitors if monitor["status"] != "OK"]
+    downtimes = []
+    for index, monitor in enumerate(rng.sample(active, min(len(active), round(len(active) * ratio)))):
+        kind = rng.choice(("monitor", "group", "wildcard", "scheduled", "ended"))
+        group = next(iter(monitor["state"]["groups"]))
+        scope = ["*"]
+        if kind == "group" and group != "*":
+            scope = group.split(",")
+        elif kind == "wildcard" and group != "*":
+            scope = [group.rsplit("-", 1)[0] + "-*"]
+        start, end = now - 600, now + 3600
+        if kind == "scheduled":
+            start, end = now + 7200, now + 10800
+        elif kind == "ended":
+            start, end = now - 7200, now - 3600
+        downtimes.append({
+            "id": 5_000_000 + index, "monitor_id": monitor["id"], "monitor_tags": ["*"], "scope": scope,
+            "start": start, "end": end, "canceled": None, "disabled": False, "active": kind not in ("scheduled", "ended"),
+        })
+    if active and ratio > 0:
+        target = rng.choice(active)
+        downtimes.append({
+            "id": 5_000_000 + len(downtimes), "monitor_id": None, "monitor_tags": target["tags"],
+            "scope": next(iter(target["state"]["groups"])).split(","),
+            "start": now - 600, "end": None, "canceled": None, "disabled": False, "active": True,
+        })
+    return downtimes
+
+
+def _split_expressions(query: str) -> List[str]:
+    """Expressions d'un paramètre query de /api/v1/query (virgules hors accolades et parenthèses)"""
+    expressions = []
+    depth = 0
+    current = ""
+    for char in query:
+        if char in "{(":
+            depth += 1
+        elif char in "})":
+            depth -= 1
+        if char == "," and depth == 0:
+            expressions.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        expressions.append(current.strip())
+    return expressions
+
+
+def _matches_query(monitor: Dict[str, Any], query: str) -> bool:
+    """Sous-ensemble de la syntaxe search: filtre status:(...) et termes env:xxx"""
+    if "status:" in query and monitor["status"] == "OK":
+        return False
+    envs = _ENV_TERM.findall(query)
+    return not envs or any(f"env:{env}" in monitor["tags"] for env in envs)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: StubState = None
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, payload: Any, status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        with self.state.lock:
+            self.state.bytes_out += len(body)
+
+    def _read_body(self) -> bytes:
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        with self.state.lock:
+            self.state.bytes_in += len(body)
+        return body
+
+    def _gate(self, endpoint: str) -> Optional[Dict[str, str]]:
+        """Latence injectée + rate limit; None si la requête a reçu un 429"""
+        time.sleep(self.state.delay())
+        allowed, headers = self.state.take(endpoint)
+        if not allowed:
+            self._send({"errors": ["Rate limit exceeded"]}, 429, headers)
+            return None
+        return headers
+
+    def do_GET(self) -> None:
+        parts = urlsplit(self.path)
+        params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+        state = self.state
+
+        if parts.path == "/_stats":
+            return self._send(state.stats())
+
+        if parts.path == "/api/v1/monitor/search":
+            headers = self._gate("GET /api/v1/monitor/search")
+            if headers is None:
+                return
+            page = int(params.get("page", 0))
+            per_page = int(params.get("per_page", 30))
+            matching = [monitor for monitor in state.monitors if _matches_query(monitor, params.get("query", ""))]
+            counts = Counter(monitor["status"] for monitor in matching)
+            return self._send({
+                "monitors": [
+                    {field: monitor[field] for field in SEARCH_FIELDS}
+                    for monitor in matching[page * per_page:(page + 1) * per_page]
+                ],
+                "metadata": {
+                    "page": page,
+                    "per_page": per_page,
+                    "page_count": -(-len(matching) // per_page),
+                    "total_count": len(matching),
+                },
+                "counts": {"status": [{"name": name, "count": count} for name, count in counts.items()]},
+            }, headers=headers)
+
+        match = _MONITOR_ID.match(parts.path)
+        if match:
+            headers = self._gate("GET /api/v1/monitor/{id}")
+            if headers is None:
+                return
+            monitor = state.by_id.get(int(match.group(1)))
+            if monitor is None:
+                return self._send({"errors": ["Monitor not found"]}, 404, headers)
+            return self._send(monitor, headers=headers)
+
+        if parts.path == "/api/v1/query":
+            headers = self._gate("GET /api/v1/query")
+            if headers is None:
+                return
+            start = int(params.get("from", 0))
+            end = int(params.get("to", start))
+            series = []
+            for index, expression in enumerate(_split_expressions(params.get("query", ""))):
+                series.extend(state.series(expression, index, start, end))
+            return self._send({
+                "status": "ok",
+                "res_type": "time_series",
+                "from_date": start * 1000,
+                "to_date": end * 1000,
+                "query": params.get("query", ""),
+                "series": series,
+            }, headers=headers)
+
+        if parts.path == "/api/v2/events":
+            headers = self._gate("GET /api/v2/events")
+            if headers is None:
+                return
+            start = int(params.get("filter[from]", 0))
+            end = int(params.get("filter[to]", time.time() * 1000))
+            limit = int(params.get("page[limit]", 10))
+            offset = int(params.get("page[cursor]", 0))
+            with state.lock:
+                matching = [
+                    event for event in state.events
+                    if start <= event["attributes"]["attributes"]["timestamp"] <= end
+                ]
+            meta = {"page": {"after": str(offset + limit)}} if offset + limit < len(matching) else {}
+            return self._send({"data": matching[offset:offset + limit], "meta": meta}, headers=headers)
+
+        if parts.path == "/api/v1/downtime":
+            headers = self._gate("GET /api/v1/downtime")
+            if headers is None:
+                return
+            now = time.time()
+            current = params.get("current_only", "false") == "true"
+            return self._send([
+                downtime for downtime in state.downtimes
+                if not current or downtime["start"] <= now < (downtime["end"] or math.inf)
+            ], headers=headers)
+
+        if parts.path == "/api/v1/monitor":
+            headers = self._gate("GET /api/v1/monitor")
+            if headers is None:
+                return
+            page = int(params.get("page", 0))
+            page_size = int(params.get("page_size", len(state.monitors) or 1))
+            return self._send(state.monitors[page * page_size:(page + 1) * page_size], headers=headers)
+
+        self._send({"errors": ["Not found"]}, 404)
+
+    def do_POST(self) -> None:
+        parts = urlsplit(self.path)
+        body = self._read_body()
+
+        if parts.path == "/_reset":
+            self.state.reset()
+            return self._send({"ok": True})
+
+        if parts.path == "/_transitions":
+            params = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            self.state.transition(int(params.get("count", 1)), float(params.get("new", 0)))
+            return self._send({"ok": True, "events": len(self.state.events)})
+
+        if parts.path.startswith("/slack/"):
+            channel = parts.path[len("/slack/"):]
+            headers = self._gate(f"POST /slack/{channel}")
+            if headers is None:
+                # Slack signale son rate limit par Retry-After
+                return
+            message = json.loads(body or b"{}")
+            with self.state.lock:
+                self.state.slack_messages.append({
+                    "channel": channel, "bytes": len(body), "blocks": len(message.get("blocks", []))
+                })
+            return self._send(b"ok")
+
+        self._send({"errors": ["Not found"]}, 404)
+
+
+def start_stub(state: StubState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """Démarre le stub dans un thread daemon; l'URL de base est http://host:server.server_port"""
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 = random free port")
+    parser.add_argument("--corpus", help="JSON file from corpus.py (default: generate one)")
+    parser.add_argument("--monitors", type=int, default=2000)
+    parser.add_argument("--alert-ratio", type=float, default=0.1)
+    parser.add_argument("--groups", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency", type=float, default=0.02, help="Injected latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform latency jitter (s)")
+    parser.add_argument("--throttle-ratio", type=float, default=0.0, help="Share of requests answered 429")
+    parser.add_argument("--rate-limit", type=int, default=0, help="Requests per period and endpoint (0 = none)")
+    parser.add_argument("--rate-period", type=float, default=10.0)
+    parser.add_argument("--point-interval", type=float, default=60.0, help="Seconds between /api/v1/query points")
+    parser.add_argument("--downtime-ratio", type=float, default=0.0, help="Share of active monitors with a downtime")
+    args = parser.parse_args()
+
+    if args.corpus:
+        with open(args.corpus) as f:
+            monitors = json.load(f)
+    else:
+        monitors = generate(args.monitors, args.alert_ratio, args.groups, seed=args.seed)
+
+    state = StubState(monitors, args.latency, args.jitter, args.throttle_ratio,
+                      args.rate_limit, args.rate_period, args.seed, args.point_interval, args.downtime_ratio)
+    server = start_stub(state, args.host, args.port)
+    # Première ligne lue par les scripts qui lancent le stub en sous-processus
+    print(f"http://{args.host}:{server.server_port}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+"""
+Classification environnement + service des monitors à partir d'une table de règles (classification_rules.json)
+Les tags sont résolus par clé (env:, service:) puis table de valeurs (dict), de même que les filtres
+de scope de la query analysée; le fallback (scopes, query, nom, métriques) via une regex combinée par champ.
+Résultats mémorisés par (id, modified)
+"""
+
+import hashlib
+import json
+import re
+import threading
+from typing import Any, Dict, List, Optional, Pattern, Sequence, Tuple
+
+from models import MonitorRecord
+from query_parser import parse_query
+
+
+# Champs texte utilisables dans les règles de fallback
+RULE_FIELDS = ("scopes", "query", "name", "metrics")
+# Champs comparés en respectant la casse (noms de métriques)
+CASE_SENSITIVE_FIELDS = ("metrics",)
+# Champs où le premier élément qui matche l'emporte sur l'ordre des règles (premier scope du monitor)
+ITEM_ORDER_FIELDS = ("scopes",)
+
+# À incrémenter à chaque changement de la logique de classification: invalide les résultats mis en cache
+CLASSIFIER_VERSION = 2
+
+
+class RuleSet:
+    """
+    Règles de fallback compilées: une regex par champ, priorité = ordre des règles
+    (sauf dans ITEM_ORDER_FIELDS, où seul le premier élément qui matche est retenu)
+    """
+
+    def __init__(self, rules: List[Dict[str, Any]], default: Optional[str]):
+        self.values = [rule["value"] for rule in rules]
+        self.default = default
+        self.patterns: Dict[str, Pattern] = {}
+
+        for field in RULE_FIELDS:
+            alternatives = [
+                f"(?=(?P<r{index}>{rule['match'][field]}))"
+                for index, rule in enumerate(rules)
+                if field in rule["match"]
+            ]
+            if alternatives:
+                # Lookaheads: aucune règle ne "consomme" le texte d'une règle plus prioritaire
+                flags = 0 if field in CASE_SENSITIVE_FIELDS else re.IGNORECASE
+                self.patterns[field] = re.compile("|".join(alternatives), flags)
+
+    def resolve(self, texts: Dict[str, Sequence[str]]) -> Optional[str]:
+        """Valeur de la règle la plus prioritaire qui matche un des champs"""
+        best = len(self.values)
+        for field, pattern in self.patterns.items():
+            first_item = field in ITEM_ORDER_FIELDS
+            for text in texts.get(field, []):
+                matched = False
+                for match in pattern.finditer(text):
+                    matched = True
+                    index = int(match.lastgroup[1:])
+                    if index < best:
+                        best = index
+                        if best == 0:
+                            return self.values[0]
+                if matched and first_item:
+                    break
+        return self.values[best] if best < len(self.values) else self.default
+
+
+class MonitorClassifier:
+    """Classe environnement et service d'un monitor en une passe sur ses tags et ses champs texte"""
+
+    def __init__(self, rules: Dict[str, Any]):
+        env_rules = rules["environment"]
+        self.env_tag_prefix = f"{env_rules['tag_key'].lower()}:"
+        self.env_tag_values: Dict[str, str] = {k.lower(): v for k, v in env_rules.get("tag_values", {}).items()}
+        self.env_tag_contains: List[Tuple[str, str]] = [(k.lower(), v) for k, v in env_rules.get("tag_contains", [])]
+        self.env_rules = RuleSet(env_rules.get("rules", []), env_rules.get("default"))
+
+        service_rules = rules["service"]
+        self.service_tag_prefix = f"{service_rules['tag_key']}:"
+        self.service_tag_values: Dict[str, RuleSet] = {
+            value: RuleSet(override.get("rules", []), override.get("default"))
+            for value, override in service_rules.get("tag_values", {}).items()
+        }
+        self.service_rules = RuleSet(service_rules.get("rules", []), service_rules.get("default", "OTHER"))
+
+        # Empreinte règles + version du classifieur, stockée avec les résultats dérivés du cache disque
+        canonical = json.dumps(rules, sort_keys=True, separators=(",", ":"))
+        self.fingerprint = f"{CLASSIFIER_VERSION}:{hashlib.sha256(canonical.encode()).hexdigest()}"
+
+        # monitor id -> (modified, environnement, service)
+        self._memo: Dict[Any, Tuple[str, Optional[str], str]] = {}
+        self._lock = threading.Lock()
+
+    def _env_from_tag(self, value: str) -> Optional[str]:
+        env = self.env_tag_values.get(value)
+        if env is None:
+            for needle, candidate in self.env_tag_contains:
+                if needle in value:
+                    return candidate
+        return env
+
+    def classify(self, monitor: MonitorRecord) -> Tuple[Optional[str], str]:
+        """Retourne (environnement, service), mémorisé par monitor id + modified"""
+        monitor_id = monitor.id
+        modified = monitor.modified
+        if monitor_id is not None and modified is not None:
+            with self._lock:
+                cached = self._memo.get(monitor_id)
+            if cached is not None and cached[0] == modified:
+                return cached[1], cached[2]
+
+        result = self._classify(monitor)
+
+        if monitor_id is not None and modified is not None:
+            with self._lock:
+                self._memo[monitor_id] = (modified, result[0], result[1])
+        return result
+
+    def _from_tags(self, tags: Sequence[str], env: Optional[str],
+                   service_tag: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """Complète (env, tag service) en une passe sur des tags (clé env: insensible à la casse, service: telle quelle)"""
+        for tag in tags:
+            if env is not None and service_tag is not None:
+                break
+            tag_lower = tag.lower()
+            if env is None and tag_lower.startswith(self.env_tag_prefix):
+                env = self._env_from_tag(tag_lower[len(self.env_tag_prefix):])
+            elif service_tag is None and tag.startswith(self.service_tag_prefix):
+                service_tag = tag[len(self.service_tag_prefix):]
+        return env, service_tag
+
+    def _classify(self, monitor: MonitorRecord) -> Tuple[Optional[str], str]:
+        # 1. Tags du monitor
+        env, service_tag = self._from_tags(monitor.tags, None, None)
+
+        # 2. Filtres de scope de la query ({env:prod,service:api}), négations exclues, traités comme des tags
+        if env is None or service_tag is None:
+            parsed = parse_query(monitor.query)
+            if parsed is not None:
+                env, service_tag = self._from_tags(parsed.scope_tags(), env, service_tag)
+
+        # 3. Fallback sur les champs texte, seulement si nécessaire
+        texts = None
+        if env is None or service_tag is None or service_tag in self.service_tag_values:
+            texts = {
+                "scopes": monitor.scopes,
+                "query": [monitor.query or ""],
+                "name": [monitor.name or ""],
+                "metrics": monitor.metrics
+            }
+
+        if env is None:
+            env = self.env_rules.resolve(texts)
+
+        if service_tag is None:
+            service = self.service_rules.resolve(texts)
+        elif service_tag in self.service_tag_values:
+            service = self.service_tag_values[service_tag].resolve(texts)
+        else:
+            service = service_tag.upper()
+
+        return env, service
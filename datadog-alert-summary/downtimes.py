@@ -0,0 +1,146 @@
+"""
+Index des downtimes Datadog (actifs et planifiés), chargés en un seul appel par run
+Les intervalles [début, fin) sont rangés par cible (id de monitor, ou tags des monitors visés) puis par
+scope. Chaque liste est triée par début avec le max cumulé des fins: savoir si un instant est couvert
+est une recherche dichotomique (O(log n)) au lieu d'un parcours de tous les downtimes. Les cibles par tags
+sont indexées par un de leurs tags: un monitor ne consulte que celles dont ce tag est l'un des siens
+(une recherche par tag du monitor), et ses scopes actifs sont calculés une fois par run
+"""
+
+from bisect import bisect_right
+from fnmatch import fnmatchcase
+from itertools import accumulate
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from models import MonitorRecord
+
+# Fin des downtimes sans date de fin
+_FOREVER = float("inf")
+
+Scope = FrozenSet[str]
+
+
+def _tags(values: Optional[Iterable[str]]) -> FrozenSet[str]:
+    """Tags d'un scope ou d'une cible de downtime ("*" et vide: tous)"""
+    return frozenset(value.strip() for value in values or () if value and value.strip() != "*")
+
+
+def group_tags(group_name: str) -> FrozenSet[str]:
+    """Tags d'un groupe de monitor ("host:a,device:b" -> {host:a, device:b}, "*" -> aucun)"""
+    return _tags(group_name.split(","))
+
+
+def scope_matches(scope: Scope, tags: FrozenSet[str]) -> bool:
+    """Un scope couvre un groupe si chacun de ses tags (jokers host:web-* compris) est un tag du groupe"""
+    for pattern in scope:
+        if pattern in tags:
+            continue
+        if "*" not in pattern or not any(fnmatchcase(tag, pattern) for tag in tags):
+            return False
+    return True
+
+
+class IntervalSet:
+    """Intervalles d'un même scope: débuts triés et max cumulé des fins"""
+
+    __slots__ = ("starts", "max_ends")
+
+    def __init__(self, intervals: List[Tuple[float, float]]):
+        intervals.sort()
+        self.starts = [start for start, _ in intervals]
+        self.max_ends = list(accumulate((end for _, end in intervals), max))
+
+    def covers(self, instant: float) -> bool:
+        """True si un intervalle commencé avant `instant` n'est pas encore terminé"""
+        index = bisect_right(self.starts, instant)
+        return index > 0 and self.max_ends[index - 1] > instant
+
+
+def _interval(downtime: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """[début, fin) d'un downtime de /api/v1/downtime, None s'il est désactivé ou annulé"""
+    if downtime.get("disabled"):
+        return None
+    start = downtime.get("start")
+    if not isinstance(start, (int, float)):
+        return None
+    end = downtime.get("end")
+    end = end if isinstance(end, (int, float)) else _FOREVER
+    canceled = downtime.get("canceled")
+    if isinstance(canceled, (int, float)):
+        end = min(end, canceled)
+    return (start, end) if end > start else None
+
+
+class DowntimeIndex:
+    """Downtimes indexés par monitor et par scope, interrogés à l'instant du run"""
+
+    def __init__(self, downtimes: Iterable[Dict[str, Any]], now: float):
+        self.now = now
+        by_monitor: Dict[int, Dict[Scope, List[Tuple[float, float]]]] = {}
+        by_tags: Dict[FrozenSet[str], Dict[Scope, List[Tuple[float, float]]]] = {}
+        self.active = 0
+        self.scheduled = 0
+        for downtime in downtimes:
+            interval = _interval(downtime) if isinstance(downtime, dict) else None
+            if interval is None or interval[1] <= now:
+                continue
+            if interval[0] <= now:
+                self.active += 1
+            else:
+                self.scheduled += 1
+            monitor_id = downtime.get("monitor_id")
+            if isinstance(monitor_id, int):
+                target = by_monitor.setdefault(monitor_id, {})
+            else:
+                target = by_tags.setdefault(_tags(downtime.get("monitor_tags")), {})
+            target.setdefault(_tags(downtime.get("scope")), []).append(interval)
+
+        self.by_monitor = {
+            monitor_id: {scope: IntervalSet(intervals) for scope, intervals in scopes.items()}
+            for monitor_id, scopes in by_monitor.items()
+        }
+        # Cibles par tags indexées par leur plus petit tag ("" pour monitor_tags "*": tous les monitors)
+        self.by_tag: Dict[str, List[Tuple[FrozenSet[str], Dict[Scope, IntervalSet]]]] = {}
+        for tags, scopes in by_tags.items():
+            self.by_tag.setdefault(min(tags) if tags else "", []).append(
+                (tags, {scope: IntervalSet(intervals) for scope, intervals in scopes.items()})
+            )
+        # id du monitor -> scopes actifs qui le visent (l'index est interrogé à un instant fixe)
+        self._scopes_memo: Dict[int, Tuple[Scope, ...]] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.by_monitor or self.by_tag)
+
+    def _active_scopes(self, monitor: MonitorRecord) -> Tuple[Scope, ...]:
+        """Scopes des downtimes en cours qui visent le monitor (par id ou par ses tags), mémorisés par monitor"""
+        cached = self._scopes_memo.get(monitor.id)
+        if cached is not None:
+            return cached
+
+        targets = []
+        scopes = self.by_monitor.get(monitor.id)
+        if scopes:
+            targets.append(scopes)
+        for tag in ("", *monitor.tags):
+            for tags, tag_scopes in self.by_tag.get(tag, ()):
+                if tags.issubset(monitor.tags):
+                    targets.append(tag_scopes)
+        active = tuple(
+            scope for target in targets for scope, intervals in target.items() if intervals.covers(self.now)
+        )
+        if monitor.id is not None:
+            self._scopes_memo[monitor.id] = active
+        return active
+
+    def monitor_muted(self, monitor: MonitorRecord) -> bool:
+        """Monitor entièrement couvert par un downtime en cours sans scope"""
+        return any(not scope for scope in self._active_scopes(monitor))
+
+    def scoped(self, monitor: MonitorRecord) -> bool:
+        """True si un downtime en cours couvre une partie des groupes du monitor"""
+        return any(scope for scope in self._active_scopes(monitor))
+
+    def group_muted(self, monitor: MonitorRecord, group_name: str) -> bool:
+        """Groupe couvert par un downtime en cours (sans scope, ou dont le scope correspond au groupe)"""
+        tags = group_tags(group_name)
+        return any(scope_matches(scope, tags) for scope in self._active_scopes(monitor))
@@ -0,0 +1,119 @@
+"""
+Chargement à la demande des groupes actifs des alertes, piloté par le rendu
+Le formatage demande les groupes des alertes qu'il va afficher, dans l'ordre d'affichage: les requêtes
+partent en parallèle (pool borné, dans l'ordre de la demande) et le rendu n'attend chaque alerte qu'au
+moment de l'afficher. Une alerte qui n'est jamais affichée avec ses groupes ne coûte aucune requête,
+pas plus qu'une alerte dont les groupes se déduisent de sa définition (monitor sans group-by)
+Les alertes partiellement couvertes par des downtimes demandent tous leurs groupes (all_groups) au même pool
+"""
+
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from models import GroupSelection, GroupState, MonitorRecord
+
+# (monitor id, tous les groupes) -> (groupes actifs les plus graves ou tous, nombre total, compteurs par clé
+# de tag), None si l'appel a échoué
+GroupFetch = Callable[[int, bool], Optional[GroupSelection]]
+# Mêmes résultats déduits sans appel API, None s'il faut appeler l'API
+LocalGroups = Callable[[MonitorRecord], Optional[GroupSelection]]
+
+
+class GroupStateLoader:
+    """Requêtes group_states lancées à la demande du rendu, résultats rangés sur les records"""
+
+    def __init__(self, fetch: GroupFetch, workers: int, local: Optional[LocalGroups] = None):
+        self.fetch = fetch
+        self.local = local
+        self.workers = workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending: Dict[int, Future] = {}
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Remet à zéro les compteurs du run et abandonne les requêtes d'un run précédent
+        (interrompu avant close() en mode daemon: ses groupes ne doivent pas être servis à ce run)
+        """
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.requests = 0
+        self.skipped = 0
+        self.failures = 0
+        self.waited = 0.0
+        self.latencies: List[float] = []
+
+    def _timed_fetch(self, monitor_id: int, all_groups: bool) -> Tuple[Optional[GroupSelection], float]:
+        start = time.monotonic()
+        result = self.fetch(monitor_id, all_groups)
+        return result, time.monotonic() - start
+
+    def _submit(self, monitor_id: int, all_groups: bool = False) -> Future:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="group-states")
+        self.requests += 1
+        return self._pool.submit(self._timed_fetch, monitor_id, all_groups)
+
+    def _needs_fetch(self, monitor: MonitorRecord, all_groups: bool = False) -> bool:
+        """
+        True si les groupes (tous avec `all_groups`) ne sont ni connus ni déductibles sans appel API
+        (rangés sur le record sinon)
+        """
+        if not monitor.id:
+            return False
+        if monitor.group_count is not None:
+            return all_groups and monitor.group_count > len(monitor.group_states)
+        local = self.local(monitor) if self.local else None
+        if local is None:
+            return True
+        monitor.group_states, monitor.group_count, monitor.group_key_counts = local
+        self.skipped += 1
+        return False
+
+    def request(self, monitors: Iterable[MonitorRecord], all_groups: bool = False) -> None:
+        """
+        Lance (sans attendre) le chargement des monitors dont les groupes ne sont pas encore connus
+        Avec `all_groups`, tous les groupes actifs sont chargés, pas seulement les plus graves
+        """
+        for monitor in monitors:
+            if monitor.id not in self._pending and self._needs_fetch(monitor, all_groups):
+                self._pending[monitor.id] = self._submit(monitor.id, all_groups)
+
+    def get(self, monitor: MonitorRecord) -> Tuple[Tuple[GroupState, ...], int]:
+        """Groupes affichables et nombre total de groupes actifs du monitor, en attendant le chargement si besoin"""
+        if monitor.id in self._pending or self._needs_fetch(monitor):
+            future = self._pending.pop(monitor.id, None) or self._submit(monitor.id)
+            start = time.perf_counter()
+            result, latency = future.result()
+            self.waited += time.perf_counter() - start
+            self.latencies.append(latency)
+            if result is None:
+                # Échec signalé dans le résumé plutôt qu'une alerte silencieusement sans groupes
+                monitor.group_states, monitor.group_count, monitor.group_key_counts = (), 0, ()
+                monitor.group_states_error = True
+                self.failures += 1
+            else:
+                monitor.group_states, monitor.group_count, monitor.group_key_counts = result
+        return monitor.group_states, monitor.group_count or 0
+
+    def summary_line(self, alerts: int) -> Optional[str]:
+        """Requêtes, latences et attente du rendu pour la sortie console (None si aucune requête)"""
+        if not self.latencies:
+            return f"0 requests for {alerts} alerts ({self.skipped} without group-by)" if self.skipped else None
+        latencies = sorted(self.latencies)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return (
+            f"{self.requests} requests for {alerts} alerts ({self.skipped} without group-by, "
+            f"workers={self.workers}, p50={p50 * 1000:.0f}ms, "
+            f"p95={p95 * 1000:.0f}ms, max={latencies[-1] * 1000:.0f}ms), rendering waited {self.waited:.2f}s"
+        )
+
+    def close(self) -> None:
+        """Abandonne les requêtes non consommées et arrête le pool"""
+        self._pending.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
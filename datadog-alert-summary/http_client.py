@@ -0,0 +1,182 @@
+"""
+Couche HTTP partagée par DatadogAlertSummary
+Une session keep-alive par hôte (Datadog, Slack...) avec des pools de connexions dimensionnés,
+HTTP/2 optionnel via httpx si la librairie est installée. Chaque appel peut être observé
+(endpoint, statut, latence, octets) pour les métriques du run
+"""
+
+import re
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+try:
+    import httpx
+except ImportError:  # HTTP/2 optionnel
+    httpx = None
+
+
+# Segments d'URL variables (ids de monitors...) regroupés sous un même endpoint
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+# observer(endpoint, statut HTTP ou None si erreur réseau, latence en s, octets envoyés, octets reçus)
+Observer = Callable[[str, Optional[int], float, int, int], None]
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Nom d'endpoint pour les limites et les métriques: méthode + chemin, ids remplacés par {id}"""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', urlsplit(url).path)}"
+
+
+class HttpClient:
+    """Sessions HTTP poolées, une par hôte, réutilisées par tous les appels d'un run"""
+
+    def __init__(self, pool_size: int = 16, host_pool_sizes: Optional[Dict[str, int]] = None,
+                 timeout: float = 30.0, http2: bool = False, observer: Optional[Observer] = None):
+        self.pool_size = max(1, pool_size)
+        self.host_pool_sizes = host_pool_sizes or {}
+        self.timeout = timeout
+        self.http2 = http2 and httpx is not None
+        if http2 and httpx is None:
+            print("⚠️  HTTP/2 requested but httpx[http2] is not installed, falling back to HTTP/1.1", file=sys.stderr)
+
+        self.observer = observer
+        self._sessions: Dict[str, requests.Session] = {}
+        self._h2_clients: Dict[str, "httpx.Client"] = {}
+        self._lock = threading.Lock()
+
+    def _pool_size_for(self, host: str) -> int:
+        return max(1, self.host_pool_sizes.get(host, self.pool_size))
+
+    def _session_for(self, url: str) -> requests.Session:
+        """Retourne (ou crée) la session keep-alive de l'hôte"""
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        session = self._sessions.get(key)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(key)
+                if session is None:
+                    size = self._pool_size_for(parts.hostname or "")
+                    session = requests.Session()
+                    # Un seul pool par session (un seul hôte), assez grand pour tous les workers
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=True)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._sessions[key] = session
+        return session
+
+    def _h2_client_for(self, url: str) -> "httpx.Client":
+        """Retourne (ou crée) le client HTTP/2 de l'hôte"""
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        client = self._h2_clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._h2_clients.get(key)
+                if client is None:
+                    size = self._pool_size_for(parts.hostname or "")
+                    limits = httpx.Limits(max_connections=size, max_keepalive_connections=size)
+                    client = httpx.Client(http2=True, limits=limits, timeout=self.timeout)
+                    self._h2_clients[key] = client
+        return client
+
+    def request(self, method: str, url: str, endpoint: Optional[str] = None, **kwargs) -> requests.Response:
+        """
+        Envoie une requête via la session de l'hôte (exceptions requests dans tous les cas)
+        endpoint: nom rapporté à l'observer (défaut: méthode + chemin, à fournir pour les URLs secrètes)
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if self.observer is None:
+            return self._send(method, url, **kwargs)
+
+        start = time.monotonic()
+        data = kwargs.get("data")
+        sent = len(data) if isinstance(data, (bytes, str)) else 0
+        try:
+            response = self._send(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.observer(endpoint or endpoint_name(method, url), None, time.monotonic() - start, sent, 0)
+            raise
+        latency = time.monotonic() - start
+        name = endpoint or endpoint_name(method, url)
+        if kwargs.get("stream"):
+            # Corps lu en streaming par l'appelant: rapporté à la fermeture de la réponse
+            self._observe_stream(response, name, latency, sent)
+        else:
+            self.observer(name, response.status_code, latency, sent, len(response.content))
+        return response
+
+    def _observe_stream(self, response: requests.Response, name: str, latency: float, sent: int) -> None:
+        """
+        Compte les octets décompressés que l'appelant lit (iter_content, et donc content/json())
+        et les rapporte une seule fois à la fermeture: ni Content-Length (absent en chunked,
+        taille compressée en gzip) ni le corps non lu ne sont comptés
+        """
+        received = 0
+        reported = False
+        iter_content, close = response.iter_content, response.close
+
+        def counting_iter_content(*args, **kwargs):
+            nonlocal received
+            for chunk in iter_content(*args, **kwargs):
+                received += len(chunk)
+                yield chunk
+
+        def observed_close() -> None:
+            nonlocal reported
+            try:
+                close()
+            finally:
+                if not reported:
+                    reported = True
+                    self.observer(name, response.status_code, latency, sent, received)
+
+        response.iter_content = counting_iter_content
+        response.close = observed_close
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        if self.http2 and url.startswith("https://"):
+            return self._request_h2(method, url, **kwargs)
+        return self._session_for(url).request(method, url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def _request_h2(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Requête HTTP/2 via httpx, convertie en requests.Response pour les appelants"""
+        kwargs.pop("stream", None)
+        try:
+            h2_response = self._h2_client_for(url).request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(str(e)) from e
+
+        response = requests.Response()
+        response.status_code = h2_response.status_code
+        response.headers = CaseInsensitiveDict(h2_response.headers)
+        response.url = str(h2_response.url)
+        response.reason = h2_response.reason_phrase
+        response.encoding = h2_response.encoding
+        response._content = h2_response.content
+        # Corps déjà lu: iter_content() le redécoupe au lieu de lire response.raw
+        response._content_consumed = True
+        return response
+
+    def close(self) -> None:
+        """Ferme toutes les connexions ouvertes"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            for client in self._h2_clients.values():
+                client.close()
+            self._sessions.clear()
+            self._h2_clients.clear()
@@ -0,0 +1,170 @@
+"""
+Parsing JSON en flux des réponses monitors (search et bulk)
+Le document est lu par morceaux (iter_content) et seuls les éléments du tableau de monitors sont
+décodés un par un (json.JSONDecoder.raw_decode), réduits aux champs utilisés par le pipeline puis
+transmis: le document brut n'est jamais entièrement en mémoire
+"""
+
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple
+
+# Champs des monitors lus par le pipeline (classification, agrégation, affichage, cache)
+SEARCH_FIELDS = ("id", "name", "status", "tags", "scopes", "query", "metrics", "modified")
+# L'API bulk expose overall_state et les groupes dans state
+BULK_FIELDS = SEARCH_FIELDS + ("overall_state", "state")
+
+_WHITESPACE = " \t\n\r"
+# Caractères qui prolongent un nombre: s'il en suit un (ou rien) en tampon, le nombre peut être coupé
+_NUMBER_CHARS = "0123456789.eE+-"
+_DECODER = json.JSONDecoder()
+
+
+class _ChunkReader:
+    """Tampon texte alimenté par morceaux, avec décodage d'une valeur JSON à la fois"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Ajoute le morceau suivant au tampon (en jetant la partie déjà lue); False en fin de flux"""
+        if self.eof:
+            return False
+        for chunk in self._chunks:
+            text = self._utf8.decode(chunk)
+            if text:
+                self.buffer = self.buffer[self.pos:] + text
+                self.pos = 0
+                return True
+        self.buffer = self.buffer[self.pos:] + self._utf8.decode(b"", final=True)
+        self.pos = 0
+        self.eof = True
+        return False
+
+    def peek(self) -> str:
+        """Prochain caractère significatif ('' en fin de flux)"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON stream: expected {char!r}, got {found!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Décode la valeur suivante, en lisant d'autres morceaux tant qu'elle est incomplète"""
+        self.peek()
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buffer, self.pos)
+                # Un nombre coupé par le morceau ("1." puis "5e3") est décodé sans sa fin: tant qu'il
+                # touche le bout du tampon ou qu'un caractère de nombre le suit, lire la suite
+                incomplete = (
+                    isinstance(value, (int, float)) and not isinstance(value, bool)
+                    and (end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS)
+                )
+                if not incomplete or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            # Valeur incomplète: au moins doubler ce qui est en tampon avant de réessayer,
+            # pour qu'un gros élément ne soit pas redécodé à chaque morceau
+            target = 2 * (len(self.buffer) - self.pos)
+            while self._fill() and len(self.buffer) - self.pos < target:
+                pass
+
+
+def _select(item: Any, fields: Optional[Sequence[str]]) -> Any:
+    if fields is None or not isinstance(item, dict):
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def _iter_array(reader: _ChunkReader, fields: Optional[Sequence[str]]) -> Iterator[Any]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield _select(reader.value(), fields)
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise ValueError(f"Invalid JSON stream: expected ',' or ']', got {separator!r}")
+
+
+def iter_json_items(chunks: Iterable[bytes], key: Optional[str] = None, fields: Optional[Sequence[str]] = None,
+                    rest: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+    """
+    Produit un à un les éléments d'un tableau JSON lu en flux, réduits à `fields`
+    key=None: le document est le tableau (API bulk); sinon le tableau est le membre `key`
+    de l'objet racine (API search), les autres membres (metadata, counts) sont rangés dans `rest`
+    """
+    reader = _ChunkReader(chunks)
+    if key is None:
+        yield from _iter_array(reader, fields)
+        return
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if name == key and reader.peek() == "[":
+            yield from _iter_array(reader, fields)
+        else:
+            value = reader.value()
+            if rest is not None:
+                rest[name] = value
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Invalid JSON stream: expected ',' or '}}', got {separator!r}")
+
+
+def _iter_members(reader: _ChunkReader, path: Sequence[str]) -> Iterator[Tuple[str, Any]]:
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        name = reader.value()
+        reader.expect(":")
+        if not path:
+            yield name, reader.value()
+        elif name == path[0] and reader.peek() == "{":
+            yield from _iter_members(reader, path[1:])
+        else:
+            # Membre hors du chemin: décodé puis aussitôt libéré
+            reader.value()
+        separator = reader.peek()
+        reader.pos += 1
+        if separator == "}":
+            return
+        if separator != ",":
+            raise ValueError(f"Invalid JSON stream: expected ',' or '}}', got {separator!r}")
+
+
+def iter_json_members(chunks: Iterable[bytes], path: Sequence[str]) -> Iterator[Tuple[str, Any]]:
+    """
+    Produit un à un les membres (nom, valeur) de l'objet situé à `path` dans un document lu en flux
+    (ex: ("state", "groups") d'une réponse /api/v1/monitor/{id}); rien si le chemin est absent
+    """
+    yield from _iter_members(_ChunkReader(chunks), path)
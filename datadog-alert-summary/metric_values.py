@@ -0,0 +1,232 @@
+"""
+Valeurs courantes des métriques des alertes, pour {{value}} dans les noms et les lignes de groupe
+Les queries des monitors sont réduites à leur expression métrique (sans évaluation ni seuil) et
+dédupliquées: des monitors qui ne diffèrent que par le seuil partagent la même série. Les expressions
+sont envoyées par lots à /api/v1/query (séparées par des virgules) sur une fenêtre commune, puis chaque
+monitor réduit les points de sa propre fenêtre avec sa fonction d'évaluation (avg, min, max, sum, last)
+La même fenêtre, élargie à celle des sparklines, fournit la tendance de la série du groupe le plus en alerte
+"""
+
+import sys
+import time
+from bisect import bisect_left
+from concurrent.futures import ThreadPoolExecutor
+from operator import itemgetter
+from statistics import fmean
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import requests
+
+from models import MonitorRecord, Status
+from query_parser import parse_query
+from sparkline import SparklineInput, render_many
+
+# Secondes par unité de fenêtre d'évaluation (last_5m, last_1h...)
+_UNITS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+# Fonctions d'évaluation des monitors reproductibles sur les points de la fenêtre
+REDUCERS: Dict[str, Callable[[List[float]], float]] = {
+    "avg": fmean,
+    "min": min,
+    "max": max,
+    "sum": sum,
+    "last": lambda values: values[-1],
+}
+
+# Groupe unique des monitors sans group-by
+SINGLE_GROUP = "*"
+
+# (expression, fenêtre en secondes, fonction d'évaluation, comparateur)
+Plan = Tuple[str, int, str, Optional[str]]
+# expression -> tags du groupe -> points (timestamp ms, valeur)
+Series = Dict[str, Dict[FrozenSet[str], List[Tuple[float, float]]]]
+
+_TIMESTAMP = itemgetter(0)
+
+
+def window_seconds(window: Optional[str]) -> Optional[int]:
+    """last_5m -> 300 (None si la fenêtre n'est pas reconnue)"""
+    if not window or not window.startswith("last_"):
+        return None
+    amount, unit = window[len("last_"):-1], window[-1:]
+    if not amount.isdigit() or unit not in _UNITS:
+        return None
+    return int(amount) * _UNITS[unit]
+
+
+def group_key(group_name: str) -> FrozenSet[str]:
+    """Nom de groupe de monitor ("host:a,device:b", "*") -> tags comparables au tag_set d'une série"""
+    if group_name == SINGLE_GROUP:
+        return frozenset()
+    return frozenset(tag.strip() for tag in group_name.split(","))
+
+
+def format_value(value: float) -> str:
+    """95.456 -> "95.46", 1000.0 -> "1000\""""
+    rounded = round(value, 2)
+    return str(int(rounded)) if rounded == int(rounded) else str(rounded)
+
+
+class MetricValueLookup:
+    """Valeurs par monitor et par groupe, chargées en lot pour un ensemble d'alertes"""
+
+    def __init__(self, get: Callable[..., requests.Response], url: str, headers: Dict[str, str], workers: int = 4,
+                 max_query_length: int = 2000, max_window: int = 86400, sparkline_window: int = 0,
+                 sparkline_points: int = 20, sparkline_budget: float = 0.5):
+        self.get = get
+        self.url = url
+        self.headers = headers
+        self.workers = workers
+        # Longueur max du paramètre query d'un lot (l'URL complète doit rester sous les limites des proxies)
+        self.max_query_length = max_query_length
+        self.max_window = max_window
+        # Fenêtre des sparklines en secondes (0: désactivées), points par sparkline et budget CPU du rendu
+        self.sparkline_window = sparkline_window
+        self.sparkline_points = sparkline_points
+        self.sparkline_budget = sparkline_budget
+        self.reset()
+
+    def reset(self) -> None:
+        self.values: Dict[int, Dict[FrozenSet[str], float]] = {}
+        self.monitor_values: Dict[int, float] = {}
+        self.sparklines: Dict[int, str] = {}
+        self.sparklines_skipped = 0
+        self.sparkline_time = 0.0
+        self.expressions = 0
+        self.requests = 0
+        self.failures = 0
+
+    @staticmethod
+    def _plan(monitor: MonitorRecord) -> Optional[Plan]:
+        """Expression à interroger pour le monitor, None si sa valeur ne se déduit pas d'une série"""
+        parsed = parse_query(monitor.query)
+        if parsed is None or parsed.kind != "metric" or not parsed.plain or parsed.evaluation not in REDUCERS:
+            return None
+        seconds = window_seconds(parsed.window)
+        if seconds is None:
+            return None
+        return parsed.expression, seconds, parsed.evaluation, parsed.comparator
+
+    def _batches(self, expressions: List[str]) -> List[List[str]]:
+        batches: List[List[str]] = []
+        length = 0
+        for expression in expressions:
+            if batches and length + 1 + len(expression) <= self.max_query_length:
+                batches[-1].append(expression)
+                length += 1 + len(expression)
+            else:
+                batches.append([expression])
+                length = len(expression)
+        return batches
+
+    def _query(self, batch: List[str], start: int, end: int) -> Optional[Series]:
+        """Un appel /api/v1/query pour un lot d'expressions (None si l'appel a échoué)"""
+        params = {"from": start, "to": end, "query": ",".join(batch)}
+        try:
+            response = self.get(self.url, headers=self.headers, params=params)
+            response.raise_for_status()
+            payload = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"   ⚠️  Metric query for {len(batch)} expressions failed: {e}", file=sys.stderr)
+            return None
+
+        series: Series = {}
+        for entry in payload.get("series") or []:
+            index = entry.get("query_index", 0)
+            if not isinstance(index, int) or not 0 <= index < len(batch):
+                continue
+            points = [
+                (point[0], point[1]) for point in entry.get("pointlist") or []
+                if len(point) >= 2 and point[1] is not None
+            ]
+            series.setdefault(batch[index], {})[frozenset(entry.get("tag_set") or ())] = points
+        return series
+
+    def load(self, monitors: Iterable[MonitorRecord], now: Optional[float] = None) -> None:
+        """Interroge les expressions des monitors (dédupliquées, par lots) et réduit leurs séries"""
+        self.reset()
+        plans: Dict[int, Plan] = {}
+        for monitor in monitors:
+            # Un monitor en No Data n'a pas de valeur à afficher
+            plan = self._plan(monitor) if monitor.id and monitor.status != Status.NO_DATA else None
+            if plan is not None:
+                plans[monitor.id] = plan
+        if not plans:
+            return
+
+        expressions = list(dict.fromkeys(plan[0] for plan in plans.values()))
+        end = int(now if now is not None else time.time())
+        start = end - min(self.max_window, max(self.sparkline_window, max(plan[1] for plan in plans.values())))
+        batches = self._batches(expressions)
+        self.expressions = len(expressions)
+        self.requests = len(batches)
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(batches))) as pool:
+            results = list(pool.map(lambda batch: self._query(batch, start, end), batches))
+        series: Series = {}
+        for result in results:
+            if result is None:
+                self.failures += 1
+            else:
+                series.update(result)
+
+        trends: Dict[Tuple[str, FrozenSet[str]], List[int]] = {}
+        for monitor_id, (expression, seconds, evaluation, comparator) in plans.items():
+            since = (end - seconds) * 1000
+            groups = series.get(expression, {})
+            values = {}
+            for tags, points in groups.items():
+                # Points triés par timestamp: la fenêtre du monitor est une fin de liste
+                recent = [value for _, value in points[bisect_left(points, since, key=_TIMESTAMP):]]
+                if recent:
+                    values[tags] = REDUCERS[evaluation](recent)
+            if not values:
+                continue
+            self.values[monitor_id] = values
+            # Valeur du monitor: celle du groupe le plus au-delà du seuil
+            worst = min if comparator in ("<", "<=") else max
+            worst_tags = worst(values, key=values.get)
+            self.monitor_values[monitor_id] = values[worst_tags]
+            trends.setdefault((expression, worst_tags), []).append(monitor_id)
+
+        if self.sparkline_window and trends:
+            self._render_sparklines(trends, series, plans, end)
+
+    def _render_sparklines(self, trends: Dict[Tuple[str, FrozenSet[str]], List[int]], series: Series,
+                           plans: Dict[int, Plan], end: int) -> None:
+        """Sparkline de la série du groupe le plus en alerte, rendue une fois par série partagée"""
+        entries: List[SparklineInput] = []
+        for key, monitor_ids in trends.items():
+            expression, tags = key
+            comparator = plans[monitor_ids[0]][3]
+            entries.append((key, series[expression][tags], "min" if comparator in ("<", "<=") else "max"))
+
+        start = time.perf_counter()
+        sparklines, self.sparklines_skipped = render_many(
+            entries, (end - self.sparkline_window) * 1000, self.sparkline_points, self.sparkline_budget
+        )
+        self.sparkline_time = time.perf_counter() - start
+        for key, sparkline in sparklines.items():
+            for monitor_id in trends[key]:
+                self.sparklines[monitor_id] = sparkline
+
+    def value(self, monitor: MonitorRecord, group_name: Optional[str] = None) -> Optional[float]:
+        """Valeur du monitor (groupe le plus au-delà du seuil) ou d'un de ses groupes, None si inconnue"""
+        if group_name is None:
+            return self.monitor_values.get(monitor.id)
+        values = self.values.get(monitor.id)
+        return values.get(group_key(group_name)) if values else None
+
+    def sparkline(self, monitor: MonitorRecord) -> Optional[str]:
+        """Tendance du monitor sur la fenêtre des sparklines, None si inconnue ou hors budget"""
+        return self.sparklines.get(monitor.id)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "monitors": len(self.values),
+            "expressions": self.expressions,
+            "requests": self.requests,
+            "failures": self.failures,
+            "sparklines": len(self.sparklines),
+            "sparklines_skipped": self.sparklines_skipped,
+        }
@@ -0,0 +1,191 @@
+"""
+Métriques d'un run: durée des phases (fetch, enrichment, classification, formatting, delivery),
+appels HTTP par endpoint (nombre par statut, histogramme de latence, octets, erreurs, 429)
+Écrites en fin de run au format textfile Prometheus (.prom) ou JSON
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Bornes (secondes) de l'histogramme de latence HTTP
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Phases rapportées même quand elles n'ont pas tourné (séries stables pour les alertes)
+PHASES = ("fetch", "enrichment", "classification", "formatting", "delivery")
+
+PREFIX = "alert_summary"
+
+# Description des valeurs ponctuelles du run (set)
+GAUGES = {
+    "run_duration_seconds": "Wall time of the last run",
+    "exit_code": "Exit code of the last run",
+    "monitors": "Monitors fetched in the last run",
+    "monitors_unclassified": "Monitors outside the tracked environments",
+    "active_alerts": "Monitors in Alert, Warn or No Data",
+    "paused_monitors": "Monitors muted by an active downtime (excluded from uptime)",
+    "group_state_failures": "Monitors whose group states could not be fetched",
+    "monitor_events": "Monitor transition events applied in incremental mode",
+    "full_resync": "1 if the run fetched every monitor in incremental mode, 0 if it applied events",
+}
+
+
+class EndpointStats:
+    """Compteurs HTTP d'un endpoint"""
+
+    def __init__(self):
+        self.statuses: Counter = Counter()
+        self.buckets = [0] * len(LATENCY_BUCKETS)
+        self.latency_sum = 0.0
+        self.count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.errors = 0
+        self.throttled = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.count,
+            "statuses": dict(self.statuses),
+            "errors": self.errors,
+            "throttled": self.throttled,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "latency_sum": self.latency_sum,
+            "latency_buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS], self.buckets)),
+        }
+
+
+class RunMetrics:
+    """Métriques du run en cours, remises à zéro par reset() au début de chaque run"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started = time.time()
+            self.phases: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+            self.endpoints: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+            self.gauges: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Chronomètre un bloc; les durées d'une même phase s'additionnent"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def add_time(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def set(self, name: str, value: float) -> None:
+        """Valeur ponctuelle du run (monitors, alertes, code de sortie...)"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe_request(self, endpoint: str, status: Optional[int], latency: float, sent: int, received: int) -> None:
+        """Observer de HttpClient: un appel HTTP terminé (status None: erreur réseau)"""
+        with self._lock:
+            stats = self.endpoints[endpoint]
+            stats.count += 1
+            stats.statuses[str(status) if status is not None else "error"] += 1
+            stats.latency_sum += latency
+            for index, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.buckets[index] += 1
+                    break
+            stats.bytes_sent += sent
+            stats.bytes_received += received
+            if status == 429:
+                stats.throttled += 1
+            elif status is None or status >= 400:
+                stats.errors += 1
+
+    def summary_line(self) -> str:
+        """Durées des phases pour la sortie console"""
+        return " | ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "timestamp": self.started,
+                "phases": dict(self.phases),
+                "gauges": dict(self.gauges),
+                "http": {endpoint: stats.to_dict() for endpoint, stats in self.endpoints.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Format textfile Prometheus (collecteur textfile de node_exporter)"""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> str:
+            metric = f"{PREFIX}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            return metric
+
+        with self._lock:
+            metric = family("last_run_timestamp_seconds", "gauge", "Start time of the last run")
+            lines.append(f"{metric} {self.started:.3f}")
+
+            metric = family(
+                "phase_duration_seconds", "gauge",
+                "Duration of each phase of the last run (classification also counts in fetch, enrichment in formatting)"
+            )
+            for name, seconds in self.phases.items():
+                lines.append(f'{metric}{{phase="{name}"}} {seconds:.6f}')
+
+            for name, value in sorted(self.gauges.items()):
+                metric = family(name, "gauge", GAUGES.get(name, name.replace("_", " ")))
+                lines.append(f"{metric} {value:g}")
+
+            endpoints = sorted(self.endpoints.items())
+            metric = family("http_requests_total", "counter", "HTTP calls of the last run by endpoint and status")
+            for endpoint, stats in endpoints:
+                for status, count in sorted(stats.statuses.items()):
+                    lines.append(f'{metric}{{endpoint="{_escape(endpoint)}",status="{status}"}} {count}')
+
+            for name, attribute, help_text in [
+                ("http_errors_total", "errors", "HTTP errors (network or 4xx/5xx except 429) by endpoint"),
+                ("http_throttled_total", "throttled", "HTTP 429 responses by endpoint"),
+                ("http_sent_bytes_total", "bytes_sent", "Request body bytes sent by endpoint"),
+                ("http_received_bytes_total", "bytes_received", "Response body bytes received by endpoint"),
+            ]:
+                metric = family(name, "counter", help_text)
+                for endpoint, stats in endpoints:
+                    lines.append(f'{metric}{{endpoint="{_escape(endpoint)}"}} {getattr(stats, attribute)}')
+
+            metric = family("http_request_duration_seconds", "histogram", "HTTP call latency by endpoint")
+            for endpoint, stats in endpoints:
+                label = f'endpoint="{_escape(endpoint)}"'
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, stats.buckets):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {stats.count}')
+                lines.append(f"{metric}_sum{{{label}}} {stats.latency_sum:.6f}")
+                lines.append(f"{metric}_count{{{label}}} {stats.count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """Écrit les métriques (Prometheus si le fichier finit par .prom, JSON sinon) de façon atomique"""
+        content = self.to_prometheus() if path.endswith(".prom") else json.dumps(self.to_dict(), indent=2)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(content)
+        # Le collecteur textfile ne doit jamais lire un fichier à moitié écrit
+        os.replace(tmp_path, path)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
@@ -0,0 +1,205 @@
+"""
+Modèle compact des monitors et de leurs groupes, produit par les fetchers et lu par toutes les étapes
+Objets à __slots__ (pas de dict par instance), statuts en enum (une seule instance par statut),
+tags, scopes, métriques et noms de groupes internés (partagés entre monitors)
+"""
+
+import heapq
+import sys
+from enum import Enum
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+class Status(str, Enum):
+    """Statut Datadog d'un monitor ou d'un groupe (compare égal à sa chaîne: Status.ALERT == "Alert")"""
+
+    OK = "OK"
+    ALERT = "Alert"
+    WARN = "Warn"
+    NO_DATA = "No Data"
+    IGNORED = "Ignored"
+    SKIPPED = "Skipped"
+    UNKNOWN = "Unknown"
+
+    # Affichage et JSON identiques à la chaîne Datadog
+    __str__ = str.__str__
+    __format__ = str.__format__
+
+    @classmethod
+    def parse(cls, value: Any) -> "Status":
+        return _STATUSES.get(value, cls.UNKNOWN)
+
+
+_STATUSES = {status.value: status for status in Status}
+
+ACTIVE_STATUSES = (Status.ALERT, Status.WARN, Status.NO_DATA)
+
+# Rang des statuts actifs pour choisir les groupes affichés (le plus grave d'abord)
+SEVERITY = {Status.ALERT: 3, Status.WARN: 2, Status.NO_DATA: 1}
+
+# Groupes actifs par clé de tag et par statut: (("pod_name", ((Status.ALERT, 312), ...)), ...)
+KeyCounts = Tuple[Tuple[str, Tuple[Tuple[Status, int], ...]], ...]
+# (groupes retenus, nombre total de groupes actifs, compteurs par clé de tag)
+GroupSelection = Tuple[Tuple["GroupState", ...], int, KeyCounts]
+
+
+def _interned(values: Optional[Iterable[Any]]) -> Tuple[str, ...]:
+    if not values:
+        return ()
+    return tuple(sys.intern(value) if isinstance(value, str) else value for value in values)
+
+
+class GroupState:
+    """Groupe actif d'un monitor (ex: pod_name:api-1 en Alert)"""
+
+    __slots__ = ("name", "status", "last_triggered_ts", "last_nodata_ts")
+
+    def __init__(self, name: str, status: Status, last_triggered_ts: Optional[int] = None,
+                 last_nodata_ts: Optional[int] = None):
+        self.name = sys.intern(name)
+        self.status = status
+        self.last_triggered_ts = last_triggered_ts
+        self.last_nodata_ts = last_nodata_ts
+
+    def __repr__(self) -> str:
+        return f"GroupState({self.name!r}, {self.status.value!r})"
+
+
+def _group_keys(group_name: str) -> Iterable[str]:
+    """Clés de tag d'un nom de groupe ("pod_name:api-1,host:a" -> pod_name, host; "*" -> aucune)"""
+    if group_name == "*":
+        return ()
+    return (tag.partition(":")[0].strip() for tag in group_name.split(","))
+
+
+def alerting_groups(groups: Iterable[Tuple[str, Any]], limit: Optional[int] = None) -> GroupSelection:
+    """
+    Groupes en Alert/Warn/No Data parmi les paires (nom, données) de state.groups d'une réponse monitor
+    Retourne les groupes du plus grave au moins grave (puis du plus récent au plus ancien), le nombre
+    total de groupes actifs et leurs compteurs par clé de tag. Avec `limit`, seuls les `limit` premiers
+    sont gardés, dans un tas borné alimenté en flux: la mémoire reste en O(limit) quel que soit le
+    nombre de groupes
+    """
+    # (rang, groupe), tas min borné à `limit`: la racine est le groupe retenu le moins prioritaire
+    selected: List[Tuple[Tuple[int, float, int], GroupState]] = []
+    counts: Dict[str, Dict[Status, int]] = {}
+    total = 0
+    for group_name, group_data in groups:
+        if not isinstance(group_data, dict):
+            continue
+        status = Status.parse(group_data.get("status"))
+        if status not in ACTIVE_STATUSES:
+            continue
+        total += 1
+        for key in _group_keys(group_name):
+            by_status = counts.setdefault(key, {})
+            by_status[status] = by_status.get(status, 0) + 1
+
+        last_triggered_ts = group_data.get("last_triggered_ts")
+        last_nodata_ts = group_data.get("last_nodata_ts")
+        recency = last_nodata_ts if status == Status.NO_DATA else last_triggered_ts
+        # À gravité et date égales, l'ordre de l'API départage (-total: le premier vu l'emporte)
+        rank = (SEVERITY[status], recency if isinstance(recency, (int, float)) else 0, -total)
+        if limit is not None and len(selected) >= limit and (not selected or rank <= selected[0][0]):
+            continue
+        entry = (rank, GroupState(group_name, status, last_triggered_ts, last_nodata_ts))
+        if limit is None:
+            selected.append(entry)
+        elif len(selected) < limit:
+            heapq.heappush(selected, entry)
+        else:
+            heapq.heapreplace(selected, entry)
+
+    key_counts = tuple(
+        (sys.intern(key), tuple(sorted(by_status.items(), key=lambda item: -SEVERITY[item[0]])))
+        for key, by_status in counts.items()
+    )
+    return tuple(group for _, group in sorted(selected, reverse=True)), total, key_counts
+
+
+def _state_groups(state: Any) -> Iterable[Tuple[str, Any]]:
+    groups = state.get("groups") if isinstance(state, dict) else None
+    return groups.items() if isinstance(groups, dict) else ()
+
+
+# Champs de définition d'un monitor (repris du cache quand la réponse ne les contient pas)
+DEFINITION_FIELDS = ("name", "tags", "scopes", "query", "metrics", "modified")
+_SEQUENCE_FIELDS = ("tags", "scopes", "metrics")
+
+
+class MonitorRecord:
+    """Monitor tel qu'utilisé par le pipeline: définition, statut, groupes actifs et résultats dérivés"""
+
+    __slots__ = (
+        "id", "name", "status", "tags", "scopes", "query", "metrics", "modified",
+        "group_states", "group_count", "group_key_counts", "group_states_error", "derived"
+    )
+
+    def __init__(self, id: Optional[int], name: Optional[str] = None, status: Status = Status.UNKNOWN,
+                 tags: Tuple[str, ...] = (), scopes: Tuple[str, ...] = (), query: Optional[str] = None,
+                 metrics: Tuple[str, ...] = (), modified: Optional[str] = None,
+                 group_states: Tuple[GroupState, ...] = (), group_count: Optional[int] = None,
+                 group_key_counts: KeyCounts = ()):
+        self.id = id
+        self.name = name
+        self.status = status
+        self.tags = tags
+        self.scopes = scopes
+        self.query = query
+        self.metrics = metrics
+        self.modified = modified
+        self.group_states = group_states
+        # Nombre total de groupes actifs (group_states peut n'en garder que les premiers);
+        # None tant que les groupes n'ont pas été chargés
+        self.group_count = group_count
+        # Groupes actifs par clé de tag et par statut (résumé des multi-alertes au-delà des groupes gardés)
+        self.group_key_counts = group_key_counts
+        # True si les groupes n'ont pas pu être récupérés (signalé dans le résumé)
+        self.group_states_error = False
+        # Entrée du cache (environnement, service, noms nettoyés), calculée une seule fois
+        self.derived: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any], group_limit: Optional[int] = None) -> "MonitorRecord":
+        """
+        Construit le record depuis un monitor de l'API (search, par id ou bulk)
+        L'API bulk expose overall_state là où l'API search expose status; les groupes actifs
+        sont extraits de state quand il est présent (les `group_limit` plus graves, tous si None)
+        """
+        status = Status.parse(data["status"] if "status" in data else data.get("overall_state"))
+        group_states, group_count, group_key_counts = (), None, ()
+        if status in ACTIVE_STATUSES and "state" in data:
+            group_states, group_count, group_key_counts = alerting_groups(_state_groups(data["state"]), group_limit)
+        return cls(
+            data.get("id"),
+            data.get("name"),
+            status,
+            _interned(data.get("tags")),
+            _interned(data.get("scopes")),
+            data.get("query"),
+            _interned(data.get("metrics")),
+            data.get("modified"),
+            group_states,
+            group_count,
+            group_key_counts
+        )
+
+    def definition(self) -> Dict[str, Any]:
+        """Champs de définition sérialisables (cache local)"""
+        definition = {}
+        for field in DEFINITION_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                definition[field] = list(value) if field in _SEQUENCE_FIELDS else value
+        return definition
+
+    def fill_definition(self, definition: Dict[str, Any]) -> None:
+        """Complète les champs absents de la réponse avec une définition mise en cache"""
+        for field in DEFINITION_FIELDS:
+            if field not in definition or getattr(self, field):
+                continue
+            value = definition[field]
+            setattr(self, field, _interned(value) if field in _SEQUENCE_FIELDS else value)
+
+    def __repr__(self) -> str:
+        return f"MonitorRecord({self.id!r}, {self.name!r}, {self.status.value!r})"
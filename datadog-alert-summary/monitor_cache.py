@@ -0,0 +1,139 @@
+"""
+Cache local (SQLite) des définitions de monitors
+Clé: id du monitor + timestamp modified. Chaque entrée garde la définition (nom, tags, query, scopes...)
+et les résultats dérivés (environnement, service, noms nettoyés par statut) pour ne pas les recalculer
+Les résultats dérivés dépendent des règles de classification: le cache est vidé quand leur empreinte change
+"""
+
+import json
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Optional, Set
+
+from models import MonitorRecord
+
+
+class MonitorCache:
+    """Cache SQLite des définitions de monitors, invalidé par le champ modified"""
+
+    def __init__(self, path: str, fingerprint: str = ""):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Dict[str, Any]] = {}
+        self._dirty: Set[int] = set()
+        self._seen: Set[int] = set()
+        self.hits = 0
+        self.misses = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS monitors ("
+            " id INTEGER PRIMARY KEY,"
+            " modified TEXT NOT NULL,"
+            " definition TEXT NOT NULL,"
+            " environment TEXT,"
+            " service TEXT,"
+            " clean_names TEXT NOT NULL DEFAULT '{}'"
+            ")"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        if row is None or row[0] != fingerprint:
+            # Règles ou classifieur modifiés: environnement, service et noms cachés ne sont plus valides
+            if row is not None:
+                print("   💾 Classification rules changed, monitor cache cleared")
+            self._conn.execute("DELETE FROM monitors")
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+        self._conn.commit()
+        self._load()
+
+    def _load(self) -> None:
+        """Charge toutes les entrées en mémoire (une seule requête par run)"""
+        rows = self._conn.execute(
+            "SELECT id, modified, definition, environment, service, clean_names FROM monitors"
+        ).fetchall()
+        for monitor_id, modified, definition, environment, service, clean_names in rows:
+            self._entries[monitor_id] = {
+                "modified": modified,
+                "definition": json.loads(definition),
+                "environment": environment,
+                "service": service,
+                "clean_names": json.loads(clean_names)
+            }
+
+    def get(self, monitor_id: int, modified: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Retourne l'entrée si la définition n'a pas changé depuis sa mise en cache"""
+        with self._lock:
+            self._seen.add(monitor_id)
+            entry = self._entries.get(monitor_id)
+            if entry is not None and modified is not None and entry["modified"] == modified:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            return None
+
+    def put(self, monitor: MonitorRecord, environment: Optional[str], service: str) -> Dict[str, Any]:
+        """Ajoute (ou remplace) la définition d'un monitor et ses résultats dérivés"""
+        entry = {
+            "modified": monitor.modified,
+            "definition": monitor.definition(),
+            "environment": environment,
+            "service": service,
+            "clean_names": {}
+        }
+        with self._lock:
+            self._entries[monitor.id] = entry
+            self._seen.add(monitor.id)
+            self._dirty.add(monitor.id)
+        return entry
+
+    def set_clean_name(self, monitor_id: int, status: str, clean_name: str) -> None:
+        """Mémorise le nom nettoyé d'un monitor pour un statut donné"""
+        with self._lock:
+            entry = self._entries.get(monitor_id)
+            if entry is not None and entry["clean_names"].get(status) != clean_name:
+                entry["clean_names"][status] = clean_name
+                self._dirty.add(monitor_id)
+
+    def flush(self, prune: bool = True) -> None:
+        """Écrit les entrées modifiées et supprime les monitors absents de ce run"""
+        with self._lock:
+            rows = []
+            for monitor_id in self._dirty:
+                entry = self._entries[monitor_id]
+                rows.append((
+                    monitor_id,
+                    entry["modified"],
+                    json.dumps(entry["definition"], separators=(",", ":")),
+                    entry["environment"],
+                    entry["service"],
+                    json.dumps(entry["clean_names"], separators=(",", ":"))
+                ))
+
+            # Pas de purge si rien n'a été vu (fetch en échec)
+            stale = []
+            if prune and self._seen:
+                stale = [(monitor_id,) for monitor_id in self._entries if monitor_id not in self._seen]
+
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO monitors (id, modified, definition, environment, service, clean_names)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.executemany("DELETE FROM monitors WHERE id = ?", stale)
+                self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not write monitor cache {self.path}: {e}", file=sys.stderr)
+                return
+
+            for (monitor_id,) in stale:
+                del self._entries[monitor_id]
+            self._dirty.clear()
+            self._seen.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        self._conn.close()
@@ -0,0 +1,198 @@
+"""
+État local des monitors pour le mode incrémental (id -> définition, statut, groupes actifs)
+Rempli par une resynchronisation complète, puis mis à jour run après run par les événements de
+transition des monitors (flux d'événements Datadog) lus depuis le curseur. Chaque événement fixe
+le statut d'un groupe: rejouer une suite d'événements dans l'ordre donne toujours le même état, ce
+qui permet de relire une marge avant le curseur (événements indexés en retard) sans dédoublonnage
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+from models import ACTIVE_STATUSES, SEVERITY, GroupSelection, MonitorRecord, Status, alerting_groups
+
+# Statut d'un événement de monitor quand la transition n'est pas détaillée
+_EVENT_STATUSES = {"error": Status.ALERT, "warn": Status.WARN, "warning": Status.WARN,
+                   "ok": Status.OK, "success": Status.OK}
+
+# Groupes déduits d'un record sans appel API (monitor sans group-by), None si inconnus
+LocalGroups = Callable[[MonitorRecord], Optional[GroupSelection]]
+
+
+def canonical_group(tags: Iterable[str]) -> str:
+    """Nom de groupe indépendant de l'ordre des tags (["host:a", "device:b"] -> "device:b,host:a"; aucun -> "*")"""
+    tags = sorted(tag.strip() for tag in tags if tag and tag.strip() != "*")
+    return ",".join(tags) if tags else "*"
+
+
+class MonitorEvent:
+    """Transition d'un groupe de monitor lue dans le flux d'événements"""
+
+    __slots__ = ("timestamp", "monitor_id", "group", "status")
+
+    def __init__(self, timestamp: int, monitor_id: int, group: str, status: Status):
+        # Millisecondes
+        self.timestamp = timestamp
+        self.monitor_id = monitor_id
+        self.group = group
+        self.status = status
+
+    def __repr__(self) -> str:
+        return f"MonitorEvent({self.timestamp}, {self.monitor_id}, {self.group!r}, {self.status.value!r})"
+
+
+def _event_timestamp(attributes: Dict[str, Any], inner: Dict[str, Any]) -> Optional[int]:
+    timestamp = inner.get("timestamp")
+    if isinstance(timestamp, (int, float)):
+        return int(timestamp)
+    try:
+        return int(datetime.fromisoformat(str(attributes.get("timestamp")).replace("Z", "+00:00")).timestamp() * 1000)
+    except ValueError:
+        return None
+
+
+def parse_monitor_event(event: Dict[str, Any]) -> Optional[MonitorEvent]:
+    """Événement /api/v2/events -> transition de groupe, None si ce n'est pas une transition de monitor"""
+    attributes = event.get("attributes") or {}
+    inner = attributes.get("attributes") or {}
+    monitor = inner.get("monitor") or {}
+    monitor_id = inner.get("monitor_id") or monitor.get("id")
+    if not isinstance(monitor_id, int):
+        return None
+
+    status = Status.parse((monitor.get("transition") or {}).get("destination_state"))
+    if status == Status.UNKNOWN:
+        status = _EVENT_STATUSES.get(str(inner.get("status", "")).lower(), Status.UNKNOWN)
+    timestamp = _event_timestamp(attributes, inner)
+    if status == Status.UNKNOWN or timestamp is None:
+        return None
+    return MonitorEvent(timestamp, monitor_id, canonical_group(monitor.get("groups") or ()), status)
+
+
+class MonitorStateStore:
+    """Store JSON de l'état des monitors, du curseur d'événements et de la dernière resynchronisation"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.cursor: Optional[int] = None
+        self.last_resync_ts = 0.0
+        # id (str) -> {"definition": {...}, "status": "Alert", "groups": {nom: [statut, last_triggered_ts, last_nodata_ts]}}
+        # groups vaut None quand les groupes actifs d'une alerte ne sont pas connus (resync via search)
+        self.monitors: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(path):
+            try:
+                with open(path) as f:
+                    state = json.load(f)
+                self.cursor = state.get("cursor")
+                self.last_resync_ts = state.get("last_resync_ts", 0.0)
+                self.monitors = state.get("monitors", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  Could not read monitor state {path}, full resync: {e}", file=sys.stderr)
+
+    def resync_reason(self, now: float, interval: float, max_gap: float) -> Optional[str]:
+        """Raison de repartir d'une récupération complète, None si les événements suffisent"""
+        if self.cursor is None or not self.monitors:
+            return "no local state"
+        if now - self.last_resync_ts >= interval:
+            return f"last resync {now - self.last_resync_ts:.0f}s ago"
+        gap = now - self.cursor / 1000
+        if gap > max_gap:
+            return f"cursor gap {gap:.0f}s above {max_gap:.0f}s"
+        return None
+
+    @staticmethod
+    def _groups(record: MonitorRecord, local: Optional[LocalGroups]) -> Optional[Dict[str, List[Any]]]:
+        """Groupes actifs complets du record, None s'ils ne sont pas connus"""
+        if record.status not in ACTIVE_STATUSES:
+            return {}
+        selection = None
+        if record.group_count is not None and record.group_count == len(record.group_states):
+            selection = record.group_states
+        elif local is not None:
+            resolved = local(record)
+            selection = resolved[0] if resolved else None
+        if selection is None:
+            return None
+        return {
+            canonical_group(group.name.split(",")): [group.status.value, group.last_triggered_ts, group.last_nodata_ts]
+            for group in selection
+        }
+
+    def put(self, record: MonitorRecord, local: Optional[LocalGroups] = None) -> None:
+        self.monitors[str(record.id)] = {
+            "definition": record.definition(),
+            "status": record.status.value,
+            "groups": self._groups(record, local),
+        }
+
+    def remove(self, monitor_id: int) -> None:
+        self.monitors.pop(str(monitor_id), None)
+
+    def replace(self, records: Iterable[MonitorRecord], cursor: int, local: Optional[LocalGroups] = None) -> None:
+        """Remplace tout l'état par celui d'une récupération complète commencée à `cursor` (ms)"""
+        self.monitors = {}
+        for record in records:
+            if record.id:
+                self.put(record, local)
+        self.cursor = cursor
+        self.last_resync_ts = time.time()
+
+    def apply(self, events: Iterable[MonitorEvent]) -> Set[int]:
+        """
+        Applique les transitions dans l'ordre chronologique
+        Retourne les monitors à relire: inconnus (créés depuis la resync) ou dont les groupes ne sont pas connus
+        """
+        stale: Set[int] = set()
+        for event in sorted(events, key=lambda event: event.timestamp):
+            entry = self.monitors.get(str(event.monitor_id))
+            if entry is None or entry["groups"] is None:
+                stale.add(event.monitor_id)
+                continue
+            groups = entry["groups"]
+            if event.status in ACTIVE_STATUSES:
+                previous = groups.get(event.group) or [None, None, None]
+                seconds = event.timestamp // 1000
+                groups[event.group] = [
+                    event.status.value,
+                    seconds if event.status != Status.NO_DATA else previous[1],
+                    seconds if event.status == Status.NO_DATA else previous[2],
+                ]
+            else:
+                groups.pop(event.group, None)
+            # Statut du monitor: celui de son groupe le plus grave
+            active = [Status.parse(group[0]) for group in groups.values()]
+            entry["status"] = max(active, key=SEVERITY.get).value if active else Status.OK.value
+        return stale
+
+    def records(self, group_limit: Optional[int] = None) -> Iterator[MonitorRecord]:
+        """Records reconstruits depuis l'état local (groupes triés et comptés comme à la récupération)"""
+        for monitor_id, entry in self.monitors.items():
+            record = MonitorRecord(int(monitor_id), status=Status.parse(entry["status"]))
+            record.fill_definition(entry["definition"])
+            groups = entry["groups"]
+            if groups is not None and record.status in ACTIVE_STATUSES:
+                record.group_states, record.group_count, record.group_key_counts = alerting_groups(
+                    (
+                        (name, {"status": status, "last_triggered_ts": triggered, "last_nodata_ts": nodata})
+                        for name, (status, triggered, nodata) in groups.items()
+                    ),
+                    group_limit
+                )
+            yield record
+
+    def save(self) -> None:
+        """Écriture atomique du store"""
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {"cursor": self.cursor, "last_resync_ts": self.last_resync_ts, "monitors": self.monitors},
+                    f, separators=(",", ":")
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"⚠️  Could not write monitor state {self.path}: {e}", file=sys.stderr)
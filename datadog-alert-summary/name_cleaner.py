@@ -0,0 +1,59 @@
+"""
+Nettoyage des noms de monitors Datadog (templates {{#is_alert}}, {{value}}...)
+Patterns précompilés, normalisation espaces/tirets en trois passes au lieu de cinq,
+et cache LRU borné sur (nom, statut): les noms se répètent d'un run à l'autre
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, Optional
+
+
+_IS_ALERT = re.compile(r'\{\{#is_alert\}\}(.*?)\{\{/is_alert\}\}', re.DOTALL)
+_IS_WARNING = re.compile(r'\{\{#is_warning\}\}(.*?)\{\{/is_warning\}\}', re.DOTALL)
+_TEMPLATE = re.compile(r'\{\{[^}]+\}\}')
+_DOUBLE_DASH = re.compile(r'\s*-\s*-\s*')
+# Réduit aussi les " - " entourés de plusieurs espaces
+_WHITESPACE = re.compile(r'\s+')
+# Tiret isolé en début ou en fin de nom (espaces déjà réduits)
+_EDGE_DASH = re.compile(r'^ ?- ?| ?- ?$')
+# Variable simple {{value}}, {{threshold}}... (pas les sections {{#...}} ni les {{host.name}})
+_VARIABLE = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+
+
+def fill_templates(name: str, variables: Dict[str, str]) -> str:
+    """Remplace les variables connues ({{value}} -> "95.2"); les autres restent pour NameCleaner.clean"""
+    return _VARIABLE.sub(lambda match: variables.get(match.group(1), match.group(0)), name)
+
+
+class NameCleaner:
+    """Nettoie les noms de monitors, avec cache LRU borné sur (nom, statut)"""
+
+    def __init__(self, cache_size: int = 4096):
+        self.clean = lru_cache(maxsize=cache_size)(self._clean)
+
+    @staticmethod
+    def _clean(name: str, status: str) -> str:
+        # Extraire la bonne section selon le statut
+        if "{{#is_alert}}" in name:
+            match: Optional[re.Match] = None
+            if status == "Warn":
+                match = _IS_WARNING.search(name) or _IS_ALERT.search(name)
+            elif status in ("Alert", "No Data"):
+                match = _IS_ALERT.search(name)
+            if match:
+                name = match.group(1)
+
+        # Supprimer tous les templates {{xxx}} puis normaliser espaces et tirets
+        if "{{" in name:
+            name = _TEMPLATE.sub('', name)
+        if '-' in name:
+            name = _DOUBLE_DASH.sub(' - ', name)
+        name = _WHITESPACE.sub(' ', name)
+        if '-' in name:
+            name = _EDGE_DASH.sub('', name)
+
+        return name.strip()
+
+    def cache_info(self):
+        return self.clean.cache_info()
@@ -0,0 +1,211 @@
+"""
+Parser des queries de monitors Datadog (metric/query alert et service checks)
+Produit un petit AST: évaluation (avg(last_5m)), termes métriques (agrégation, métrique, filtres de
+scope, group-by), comparateur et seuil. Les autres sources (logs, events, composites...) ne sont pas
+analysées: parse_query renvoie None et les appelants gardent leur comportement par défaut
+Résultats mis en cache (LRU) par texte de query: les queries se répètent d'un monitor et d'un run à l'autre
+"""
+
+import re
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+# avg(last_5m):... / change(avg(last_5m),last_5m):... -> fonction d'évaluation et fenêtre
+_EVALUATION = re.compile(r'^\s*(?P<function>[a-z_]+)\((?P<args>[^:]*?)\):')
+_WINDOW = re.compile(r'last_\w+')
+_THRESHOLD = re.compile(r'\s*(?P<comparator>>=|<=|==|!=|>|<)\s*(?P<value>-?\d+(?:\.\d+)?(?:e[+-]?\d+)?)\s*$', re.IGNORECASE)
+# avg:system.cpu.user{env:prod,!host:a} by {host}.as_count() (agrégation optionnelle, méthodes chaînées)
+_METRIC_TERM = re.compile(
+    r'(?:(?P<aggregation>[a-z][a-z0-9_]*):)?(?P<metric>[A-Za-z][\w.]*)\{(?P<scope>[^}]*)\}'
+    r'(?:\.\w+\([^)]*\))*(?:\s*by\s*\{(?P<group_by>[^}]*)\})?(?:\.\w+\([^)]*\))*'
+)
+# Ce qui reste d'une expression "plate" une fois les termes retirés: opérateurs et constantes
+_ARITHMETIC = re.compile(r'^[\s\d.+\-*/()]*$')
+# "http.can_connect".over("env:prod").exclude("host:a").by("host").last(3).count_by_status()
+_SERVICE_CHECK = re.compile(r'^\s*"(?P<check>[^"]+)"\.over\((?P<over>[^)]*)\)(?P<rest>.*)$')
+_CALL = re.compile(r'\.(?P<method>over|exclude|by)\((?P<args>[^)]*)\)')
+_QUOTED = re.compile(r'"([^"]*)"')
+# Autres sources de données: logs("..."), events("..."), rum("...")...
+_OTHER_SOURCE = re.compile(r'^\s*[\w-]+\("')
+# Scopes booléens: seules les conjonctions (virgule, AND) sont réduites à des filtres
+_DISJUNCTION = re.compile(r'\b(?:OR|IN)\b')
+_SCOPE_TOKEN = re.compile(r'\bNOT\s+|[^\s,()]+')
+
+
+class ScopeFilter:
+    """Filtre de scope (env:prod, !host:a, tag sans valeur)"""
+
+    __slots__ = ("key", "value", "negated")
+
+    def __init__(self, key: str, value: Optional[str], negated: bool = False):
+        self.key = key
+        self.value = value
+        self.negated = negated
+
+    @property
+    def tag(self) -> str:
+        return self.key if self.value is None else f"{self.key}:{self.value}"
+
+    def __repr__(self) -> str:
+        return f"ScopeFilter({'!' if self.negated else ''}{self.tag!r})"
+
+
+class MetricTerm:
+    """Terme métrique d'une query: agrégation d'espace, métrique, scope et clés de group-by"""
+
+    __slots__ = ("aggregation", "metric", "scope", "group_by")
+
+    def __init__(self, aggregation: Optional[str], metric: str, scope: Tuple[ScopeFilter, ...],
+                 group_by: Tuple[str, ...]):
+        self.aggregation = aggregation
+        self.metric = metric
+        self.scope = scope
+        self.group_by = group_by
+
+    def __repr__(self) -> str:
+        return f"MetricTerm({self.aggregation!r}, {self.metric!r}, {self.scope!r}, {self.group_by!r})"
+
+
+class MonitorQuery:
+    """Query de monitor analysée"""
+
+    __slots__ = ("kind", "evaluation", "window", "terms", "comparator", "threshold", "expression", "plain")
+
+    def __init__(self, kind: str, evaluation: Optional[str], window: Optional[str], terms: Tuple[MetricTerm, ...],
+                 comparator: Optional[str], threshold: Optional[float], expression: Optional[str] = None,
+                 plain: bool = False):
+        # "metric" ou "service_check"
+        self.kind = kind
+        self.evaluation = evaluation
+        self.window = window
+        self.terms = terms
+        self.comparator = comparator
+        self.threshold = threshold
+        # Expression métrique sans évaluation ni seuil (ex: avg:system.cpu.user{env:prod} by {host})
+        self.expression = expression
+        # True si l'expression ne combine les termes que par de l'arithmétique (pas d'anomalies(), top()...)
+        self.plain = plain
+
+    @property
+    def metrics(self) -> Tuple[str, ...]:
+        return tuple(term.metric for term in self.terms)
+
+    @property
+    def aggregation(self) -> Optional[str]:
+        return self.terms[0].aggregation if self.terms else None
+
+    @property
+    def group_by(self) -> Tuple[str, ...]:
+        """Clés de group-by de tous les termes, sans doublons"""
+        keys = []
+        for term in self.terms:
+            keys.extend(key for key in term.group_by if key not in keys)
+        return tuple(keys)
+
+    @property
+    def grouped(self) -> bool:
+        """Multi-alert: un groupe par combinaison de valeurs des clés de group-by"""
+        return bool(self.group_by)
+
+    def scope_tags(self) -> Tuple[str, ...]:
+        """Filtres de scope positifs (key:value) de tous les termes, dans l'ordre de la query"""
+        tags = []
+        for term in self.terms:
+            tags.extend(scope.tag for scope in term.scope if not scope.negated and scope.tag not in tags)
+        return tuple(tags)
+
+    def __repr__(self) -> str:
+        return (
+            f"MonitorQuery({self.kind!r}, {self.evaluation!r}, {self.window!r}, {self.terms!r}, "
+            f"{self.comparator!r}, {self.threshold!r})"
+        )
+
+
+def _parse_scope(text: str) -> Tuple[ScopeFilter, ...]:
+    """Filtres d'un scope {a:b,!c:d}; vide pour * et les scopes avec OR/IN (non réductibles à des filtres)"""
+    if _DISJUNCTION.search(text):
+        return ()
+    filters = []
+    negate_next = False
+    for token in _SCOPE_TOKEN.findall(text):
+        if token.startswith("NOT"):
+            negate_next = True
+            continue
+        if token in ("AND", "*"):
+            continue
+        negated = negate_next or token[0] in "!-"
+        negate_next = False
+        token = token.lstrip("!-")
+        key, separator, value = token.partition(":")
+        filters.append(ScopeFilter(key, value if separator else None, negated))
+    return tuple(filters)
+
+
+def _parse_service_check(match: "re.Match") -> MonitorQuery:
+    scope = [ScopeFilter(*_split_tag(tag)) for tag in _QUOTED.findall(match.group("over")) if tag != "*"]
+    group_by: Tuple[str, ...] = ()
+    for call in _CALL.finditer(match.group("rest")):
+        args = tuple(arg for arg in _QUOTED.findall(call.group("args")) if arg != "*")
+        if call.group("method") == "exclude":
+            scope.extend(ScopeFilter(*_split_tag(tag), negated=True) for tag in args)
+        elif call.group("method") == "by":
+            group_by = args
+    term = MetricTerm(None, match.group("check"), tuple(scope), group_by)
+    return MonitorQuery("service_check", None, None, (term,), None, None)
+
+
+def _split_tag(tag: str) -> Tuple[str, Optional[str]]:
+    key, separator, value = tag.partition(":")
+    return key, value if separator else None
+
+
+@lru_cache(maxsize=4096)
+def parse_query(query: Optional[str]) -> Optional[MonitorQuery]:
+    """AST de la query d'un monitor, None si elle est vide ou d'une forme non analysée"""
+    if not query:
+        return None
+
+    service_check = _SERVICE_CHECK.match(query)
+    if service_check:
+        return _parse_service_check(service_check)
+    if _OTHER_SOURCE.match(query):
+        return None
+
+    evaluation = _EVALUATION.match(query)
+    if evaluation is None:
+        return None
+    body = query[evaluation.end():]
+
+    comparator = threshold = None
+    threshold_match = _THRESHOLD.search(body)
+    if threshold_match:
+        comparator = threshold_match.group("comparator")
+        threshold = float(threshold_match.group("value"))
+        body = body[:threshold_match.start()]
+
+    matches = list(_METRIC_TERM.finditer(body))
+    if not matches:
+        return None
+    terms = tuple(
+        MetricTerm(
+            match.group("aggregation"),
+            match.group("metric"),
+            _parse_scope(match.group("scope")),
+            tuple(key.strip() for key in (match.group("group_by") or "").split(",") if key.strip())
+        )
+        for match in matches
+    )
+    residue = _METRIC_TERM.sub("", body)
+
+    window = _WINDOW.search(evaluation.group("args"))
+    return MonitorQuery(
+        "metric",
+        evaluation.group("function"),
+        window.group(0) if window else None,
+        terms,
+        comparator,
+        threshold,
+        body.strip(),
+        bool(_ARITHMETIC.match(residue))
+    )
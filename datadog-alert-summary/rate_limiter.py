@@ -0,0 +1,184 @@
+"""
+Ordonnancement des appels Datadog selon les rate limits par endpoint
+Chaque endpoint (chemin, ids remplacés par {id}) a son token bucket et sa limite de concurrence,
+recalés sur les en-têtes X-RateLimit-Limit/Period/Remaining/Reset de chaque réponse.
+Les 429 sont rejoués après la fenêtre de reset et comptés pour le résumé du run
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from http_client import HttpClient, endpoint_name
+
+
+def _header_float(headers: Any, name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class EndpointLimiter:
+    """Token bucket + limite de concurrence (AIMD) d'un endpoint"""
+
+    def __init__(self, name: str, max_concurrency: int):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = self.max_concurrency
+        # Inconnus tant que Datadog n'a pas renvoyé d'en-têtes: pas de pacing
+        self.limit: Optional[float] = None
+        self.period: Optional[float] = None
+        self.tokens = float("inf")
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.in_flight = 0
+
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.waited = 0.0
+
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.limit is not None and self.period:
+            self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.period)
+        self.updated = now
+
+    def acquire(self) -> None:
+        """Attend un slot de concurrence et un jeton (ou la fin d'une fenêtre bloquée)"""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.in_flight >= self.concurrency:
+                    delay = None
+                elif self.tokens < 1 and self.limit:
+                    delay = (1 - self.tokens) * self.period / self.limit
+                else:
+                    break
+                self._cond.wait(delay)
+            self.tokens -= 1
+            self.in_flight += 1
+            self.requests += 1
+            self.waited += time.monotonic() - start
+
+    def release(self, response: Optional[requests.Response], failed: bool = False) -> None:
+        """Libère le slot et recale le bucket sur les en-têtes de la réponse"""
+        with self._cond:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+            if response is not None:
+                self._update(response)
+            self._cond.notify_all()
+
+    def _update(self, response: requests.Response) -> None:
+        headers = response.headers
+        now = time.monotonic()
+        self._refill(now)
+
+        limit = _header_float(headers, "X-RateLimit-Limit")
+        period = _header_float(headers, "X-RateLimit-Period")
+        remaining = _header_float(headers, "X-RateLimit-Remaining")
+        reset = _header_float(headers, "X-RateLimit-Reset")
+        if limit and period:
+            self.limit, self.period = limit, period
+        if remaining is not None and self.limit:
+            # Les requêtes en vol ont déjà pris leur jeton: ne garder que le plus prudent
+            self.tokens = min(self.tokens, remaining)
+
+        if response.status_code == 429:
+            self.throttled += 1
+            retry_after = _header_float(headers, "Retry-After")
+            wait = reset if reset is not None else retry_after if retry_after is not None else 1.0
+            self.blocked_until = max(self.blocked_until, now + wait)
+            if self.limit:
+                self.tokens = min(self.tokens, 0)
+            # Décroissance multiplicative de la concurrence
+            self.concurrency = max(1, self.concurrency // 2)
+        else:
+            if remaining is not None and remaining < 1 and reset is not None:
+                # Quota épuisé: attendre la fenêtre suivante plutôt que de provoquer un 429
+                self.blocked_until = max(self.blocked_until, now + reset)
+            if remaining is not None and reset:
+                # Pas plus de requêtes en vol que le quota restant sur la fenêtre
+                target = max(1, min(self.max_concurrency, int(remaining)))
+                self.concurrency = min(target, self.concurrency + 1)
+            elif self.concurrency < self.max_concurrency:
+                # Croissance additive
+                self.concurrency += 1
+
+
+class RateLimitScheduler:
+    """Exécute les requêtes Datadog via le limiteur de leur endpoint, avec retry des 429"""
+
+    def __init__(self, http: HttpClient, max_concurrency: int = 16, max_retries: int = 3):
+        self.http = http
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.endpoints: Dict[str, EndpointLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter_for(self, method: str, url: str) -> EndpointLimiter:
+        name = endpoint_name(method, url)
+        limiter = self.endpoints.get(name)
+        if limiter is None:
+            with self._lock:
+                limiter = self.endpoints.setdefault(name, EndpointLimiter(name, self.max_concurrency))
+        return limiter
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Envoie la requête quand l'endpoint a un jeton disponible
+        Un 429 est rejoué après le reset (max_retries fois), la dernière réponse est renvoyée telle quelle
+        """
+        limiter = self.limiter_for(method, url)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            try:
+                response = self.http.request(method, url, endpoint=limiter.name, **kwargs)
+            except requests.exceptions.RequestException:
+                limiter.release(None, failed=True)
+                raise
+
+            final = response.status_code != 429 or attempt == self.max_retries
+            limiter.release(response, failed=final and response.status_code >= 400)
+            if final:
+                return response
+            # Réponse 429 rejouée: rendre la connexion au pool (requêtes en streaming)
+            response.close()
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def reset_stats(self) -> None:
+        """Remet à zéro les compteurs (le pacing appris est conservé entre deux runs du daemon)"""
+        for limiter in self.endpoints.values():
+            limiter.requests = limiter.throttled = limiter.errors = 0
+            limiter.waited = 0.0
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Compteurs par endpoint: requêtes, 429, erreurs, attente cumulée, concurrence finale"""
+        return {
+            name: {
+                "requests": limiter.requests,
+                "throttled": limiter.throttled,
+                "errors": limiter.errors,
+                "waited": limiter.waited,
+                "concurrency": limiter.concurrency,
+                "limit": limiter.limit,
+                "period": limiter.period
+            }
+            for name, limiter in self.endpoints.items()
+        }
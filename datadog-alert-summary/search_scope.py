@@ -0,0 +1,130 @@
+"""
+Périmètre de recherche des monitors (search_query) appliqué côté client
+L'API bulk (/api/v1/monitor) renvoie tout l'inventaire de l'organisation: pour que les statistiques ne
+dépendent pas de la stratégie choisie, la search_query est compilée en prédicat sur les tags du monitor.
+Seule la partie tags de la syntaxe search est reproduite (env:prod, tag:"env:prod", env:(a OR b), jokers,
+AND / OR / NOT / -, parenthèses): pour toute autre requête compile_search_scope renvoie None et la
+stratégie bulk n'est pas choisie automatiquement
+"""
+
+import re
+from fnmatch import fnmatchcase
+from functools import lru_cache
+from typing import Callable, Iterable, List, Optional
+
+from models import MonitorRecord
+
+# (, ), termes avec valeur entre guillemets (tag:"env:prod"), mots
+_TOKEN = re.compile(r'\(|\)|[^\s()"]*"[^"]*"|[^\s()]+')
+# Facettes search qui ne sont pas des tags du monitor (statut, type, id, créateur...)
+_RESERVED_KEYS = frozenset({
+    "status", "type", "id", "priority", "muted", "notification", "creator", "metric", "scope",
+    "group_status", "title", "name", "downtime"
+})
+
+Predicate = Callable[[Iterable[str]], bool]
+
+
+class UnsupportedQuery(ValueError):
+    """Requête search non reproductible côté client"""
+
+
+def _tag_matcher(pattern: str) -> Predicate:
+    if "*" in pattern:
+        return lambda tags: any(fnmatchcase(tag, pattern) for tag in tags)
+    return lambda tags: pattern in tags
+
+
+def _any(predicates: List[Predicate]) -> Predicate:
+    return predicates[0] if len(predicates) == 1 else lambda tags: any(predicate(tags) for predicate in predicates)
+
+
+def _all(predicates: List[Predicate]) -> Predicate:
+    return predicates[0] if len(predicates) == 1 else lambda tags: all(predicate(tags) for predicate in predicates)
+
+
+class _Parser:
+    """Descente récursive: expr := and (OR and)* ; and := unary ([AND] unary)* ; unary := [NOT|-] primary"""
+
+    def __init__(self, query: str):
+        self.tokens = _TOKEN.findall(query)
+        self.position = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.peek()
+        if token is None:
+            raise UnsupportedQuery("unexpected end of query")
+        self.position += 1
+        return token
+
+    def expression(self) -> Predicate:
+        alternatives = [self.conjunction()]
+        while self.peek() == "OR":
+            self.take()
+            alternatives.append(self.conjunction())
+        return _any(alternatives)
+
+    def conjunction(self) -> Predicate:
+        terms = [self.unary()]
+        while self.peek() not in (None, "OR", ")"):
+            if self.peek() == "AND":
+                self.take()
+            terms.append(self.unary())
+        return _all(terms)
+
+    def unary(self) -> Predicate:
+        token = self.peek()
+        if token == "NOT":
+            self.take()
+            inner = self.unary()
+            return lambda tags: not inner(tags)
+        if token is not None and token.startswith("-") and len(token) > 1:
+            self.tokens[self.position] = token[1:]
+            inner = self.unary()
+            return lambda tags: not inner(tags)
+        return self.primary()
+
+    def primary(self) -> Predicate:
+        token = self.take()
+        if token == "(":
+            inner = self.expression()
+            if self.take() != ")":
+                raise UnsupportedQuery("unbalanced parentheses")
+            return inner
+        key, separator, value = token.partition(":")
+        if not separator or not key or key in _RESERVED_KEYS:
+            raise UnsupportedQuery(f"term {token!r} is not a monitor tag")
+        if not value:
+            # env:(prod OR preprod)
+            if self.take() != "(":
+                raise UnsupportedQuery(f"term {token!r} has no value")
+            values = [self.take()]
+            while self.peek() == "OR":
+                self.take()
+                values.append(self.take())
+            if self.take() != ")":
+                raise UnsupportedQuery(f"unsupported values for {key}")
+        else:
+            values = [value]
+        values = [value.strip('"') for value in values]
+        if key == "tag":
+            return _any([_tag_matcher(value) for value in values])
+        return _any([_tag_matcher(f"{key}:{value}") for value in values])
+
+
+@lru_cache(maxsize=32)
+def compile_search_scope(query: str) -> Optional[Callable[[MonitorRecord], bool]]:
+    """Prédicat "le monitor est dans le périmètre de `query`", None si la requête n'est pas reproductible"""
+    if not query.strip():
+        return lambda monitor: True
+    parser = _Parser(query)
+    try:
+        predicate = parser.expression()
+        if parser.peek() is not None:
+            raise UnsupportedQuery(f"unexpected {parser.peek()!r}")
+    except UnsupportedQuery:
+        return None
+    return lambda monitor: predicate(monitor.tags)
@@ -0,0 +1,113 @@
+"""
+Livraison des messages Slack
+Tous les webhooks sont servis en parallèle, les messages d'un même webhook partent dans l'ordre
+(messages de continuation), avec retries en backoff exponentiel jitteré qui respectent le
+Retry-After des réponses 429
+"""
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from http_client import HttpClient
+
+
+class DeliveryReport:
+    """Résultat de l'envoi d'un message: statut, tentatives, latence totale"""
+
+    def __init__(self, key: str, index: int, size: int, blocks: int):
+        self.key = key
+        self.index = index
+        self.size = size
+        self.blocks = blocks
+        self.ok = False
+        self.attempts = 0
+        self.latency = 0.0
+        self.error: Optional[str] = None
+
+
+class SlackDelivery:
+    """Envoie des messages sur des webhooks Slack, en parallèle par webhook, avec retries"""
+
+    def __init__(self, http: HttpClient, max_retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0):
+        self.http = http
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def _retry_delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        """Retry-After si Slack l'indique (429), sinon backoff exponentiel avec full jitter"""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return float(retry_after) + random.uniform(0, self.base_delay)
+                except ValueError:
+                    pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def post(self, webhook_url: str, body: bytes, report: DeliveryReport) -> DeliveryReport:
+        """Poste un message avec retries sur 429, 5xx et erreurs réseau"""
+        start = time.monotonic()
+        for attempt in range(self.max_retries + 1):
+            report.attempts = attempt + 1
+            response = None
+            try:
+                # L'URL du webhook est un secret: jamais utilisée comme nom d'endpoint
+                response = self.http.post(
+                    webhook_url, data=body, headers={"Content-Type": "application/json"}, endpoint="POST slack webhook"
+                )
+                if response.status_code != 429 and response.status_code < 500:
+                    response.raise_for_status()
+                    report.ok = True
+                    break
+                report.error = f"HTTP {response.status_code}"
+            except requests.exceptions.HTTPError as e:
+                # 4xx (hors 429): inutile de réessayer
+                report.error = str(e)
+                break
+            except requests.exceptions.RequestException as e:
+                report.error = str(e)
+
+            if attempt < self.max_retries:
+                time.sleep(self._retry_delay(attempt, response))
+
+        report.latency = time.monotonic() - start
+        return report
+
+    def _deliver_webhook(self, webhook_url: str, messages: List[Tuple[str, int, bytes, int]]) -> List[DeliveryReport]:
+        """Envoie dans l'ordre les messages d'un webhook (suites d'un message en échec abandonnées)"""
+        reports = []
+        failed = set()
+        for key, index, body, blocks in messages:
+            if key in failed:
+                continue
+            report = self.post(webhook_url, body, DeliveryReport(key, index, len(body), blocks))
+            reports.append(report)
+            if not report.ok:
+                failed.add(key)
+        return reports
+
+    def deliver(self, jobs: Dict[str, Tuple[str, List[Tuple[bytes, int]]]]) -> Dict[str, List[DeliveryReport]]:
+        """
+        jobs: clé (environnement) -> (webhook, [(message JSON encodé, nb de blocs), ...])
+        Retourne les rapports d'envoi par clé
+        """
+        by_webhook: Dict[str, List[Tuple[str, int, bytes, int]]] = {}
+        for key, (webhook_url, messages) in jobs.items():
+            for index, (body, blocks) in enumerate(messages, start=1):
+                by_webhook.setdefault(webhook_url, []).append((key, index, body, blocks))
+
+        reports: Dict[str, List[DeliveryReport]] = {key: [] for key in jobs}
+        if not by_webhook:
+            return reports
+
+        with ThreadPoolExecutor(max_workers=len(by_webhook)) as pool:
+            futures = [pool.submit(self._deliver_webhook, url, messages) for url, messages in by_webhook.items()]
+            for future in futures:
+                for report in future.result():
+                    reports[report.key].append(report)
+        return reports
@@ -0,0 +1,105 @@
+"""
+Découpage des messages Slack selon les limites de l'API
+Slack refuse plus de 50 blocs par message et plus de 3000 caractères par champ texte:
+les sections mrkdwn consécutives sont regroupées dans le moins de blocs possible,
+puis le résultat est réparti en messages de continuation si nécessaire
+"""
+
+from typing import Any, Dict, List
+
+
+MAX_BLOCKS = 50
+MAX_TEXT_LENGTH = 3000
+
+
+def _is_mergeable(block: Dict[str, Any]) -> bool:
+    """Section mrkdwn simple (pas de fields ni d'accessory): son texte peut être fusionné"""
+    return (
+        block.get("type") == "section"
+        and set(block) <= {"type", "text"}
+        and block.get("text", {}).get("type") == "mrkdwn"
+    )
+
+
+def _split_text(text: str, max_length: int) -> List[str]:
+    """Coupe un texte trop long par lignes (et une ligne trop longue en morceaux)"""
+    if len(text) <= max_length:
+        return [text]
+
+    chunks = []
+    current = ""
+    for line in text.split("\n"):
+        while len(line) > max_length:
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(line[:max_length])
+            line = line[max_length:]
+        if current and len(current) + 1 + len(line) > max_length:
+            chunks.append(current)
+            current = line
+        else:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def pack_blocks(blocks: List[Dict[str, Any]], max_text_length: int = MAX_TEXT_LENGTH) -> List[Dict[str, Any]]:
+    """
+    Regroupe les sections mrkdwn consécutives (next-fit dans l'ordre des alertes: optimal
+    quand l'ordre est imposé) sans dépasser max_text_length par bloc
+    """
+    packed: List[Dict[str, Any]] = []
+    current = None
+
+    def flush():
+        nonlocal current
+        if current is not None:
+            packed.append({"type": "section", "text": {"type": "mrkdwn", "text": current}})
+            current = None
+
+    for block in blocks:
+        if not _is_mergeable(block):
+            flush()
+            packed.append(block)
+            continue
+
+        for chunk in _split_text(block["text"]["text"], max_text_length):
+            if current is not None and len(current) + 1 + len(chunk) <= max_text_length:
+                current = f"{current}\n{chunk}"
+            else:
+                flush()
+                current = chunk
+    flush()
+
+    return packed
+
+
+def split_messages(blocks: List[Dict[str, Any]], max_blocks: int = MAX_BLOCKS) -> List[Dict[str, Any]]:
+    """Répartit les blocs en messages d'au plus max_blocks, les suites étant marquées (i/n)"""
+    if len(blocks) <= max_blocks:
+        return [{"blocks": blocks}]
+
+    # Chaque suite réserve un bloc pour son marqueur de continuation
+    parts = [blocks[:max_blocks]]
+    remaining = blocks[max_blocks:]
+    while remaining:
+        parts.append(remaining[:max_blocks - 1])
+        remaining = remaining[max_blocks - 1:]
+
+    messages = [{"blocks": parts[0]}]
+    for index, part in enumerate(parts[1:], start=2):
+        marker = {
+            "type": "context",
+            "elements": [{"type": "mrkdwn", "text": f"↪ Continued ({index}/{len(parts)})"}]
+        }
+        messages.append({"blocks": [marker] + part})
+    return messages
+
+
+def pack_message(message: Dict[str, Any], max_blocks: int = MAX_BLOCKS,
+                 max_text_length: int = MAX_TEXT_LENGTH) -> List[Dict[str, Any]]:
+    """Message Slack -> liste de messages respectant les limites de blocs et de texte"""
+    blocks = pack_blocks(message.get("blocks", []), max_text_length)
+    return split_messages(blocks, max_blocks)
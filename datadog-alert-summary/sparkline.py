@@ -0,0 +1,73 @@
+"""
+Sparklines unicode de la tendance des alertes (▁▂▃▄▅▆▇█)
+Chaque série est réduite à ~20 points par un bucketer min/max: la série est coupée en buckets de même
+taille et chaque bucket garde son extrême (max pour un seuil haut, min pour un seuil bas), pour que les
+pics qui ont déclenché l'alerte restent visibles. Réduction en Python pur: max/min sur des tranches de
+liste tournent en C, et les points arrivent en listes Python (les convertir en tableaux NumPy coûte
+plus cher que toute la réduction)
+Le rendu s'arrête une fois le budget CPU épuisé: les séries restantes n'ont pas de sparkline
+"""
+
+import time
+from bisect import bisect_left
+from operator import itemgetter
+from typing import Dict, Hashable, List, Sequence, Tuple
+
+BARS = "▁▂▃▄▅▆▇█"
+
+# Séries réduites par lot (le budget CPU est vérifié entre deux lots)
+CHUNK_SIZE = 64
+
+# (clé, points (timestamp ms, valeur), "max" ou "min")
+SparklineInput = Tuple[Hashable, Sequence[Tuple[float, float]], str]
+
+_TIMESTAMP = itemgetter(0)
+
+
+def downsample(series: List[List[float]], points: int = 20, peak: str = "max") -> List[List[float]]:
+    """Réduit chaque série à `points` buckets gardant leur max (ou min); les séries courtes restent telles quelles"""
+    reduce = max if peak == "max" else min
+    result = []
+    for values in series:
+        length = len(values)
+        if length <= points:
+            result.append(values)
+            continue
+        bounds = [index * length // points for index in range(points)] + [length]
+        result.append([reduce(values[bounds[index]:bounds[index + 1]]) for index in range(points)])
+    return result
+
+
+def render(values: Sequence[float]) -> str:
+    """Valeurs -> barres unicode, de la plus basse à la plus haute valeur de la série"""
+    if not values:
+        return ""
+    low, high = min(values), max(values)
+    if high - low <= 1e-9 * max(1.0, abs(high)):
+        # Série plate: barre médiane
+        return BARS[len(BARS) // 2 - 1] * len(values)
+    scale = (len(BARS) - 1) / (high - low)
+    return "".join(BARS[int((value - low) * scale + 0.5)] for value in values)
+
+
+def render_many(entries: List[SparklineInput], since: float, points: int = 20,
+                cpu_budget: float = 0.5) -> Tuple[Dict[Hashable, str], int]:
+    """
+    Sparklines des points postérieurs à `since` (ms) de chaque entrée, par lots de CHUNK_SIZE séries
+    S'arrête quand le temps CPU du thread dépasse `cpu_budget` secondes; retourne (clé -> sparkline, séries non rendues)
+    """
+    start = time.thread_time()
+    sparklines: Dict[Hashable, str] = {}
+    for chunk_start in range(0, len(entries), CHUNK_SIZE):
+        if time.thread_time() - start > cpu_budget:
+            return sparklines, len(entries) - chunk_start
+        chunk = entries[chunk_start:chunk_start + CHUNK_SIZE]
+        for peak in ("max", "min"):
+            selected = [(key, pts) for key, pts, mode in chunk if mode == peak]
+            if not selected:
+                continue
+            series = [[value for _, value in pts[bisect_left(pts, since, key=_TIMESTAMP):]] for _, pts in selected]
+            for (key, _), values in zip(selected, downsample(series, points, peak)):
+                if len(values) >= 2:
+                    sparklines[key] = render(values)
+    return sparklines, 0